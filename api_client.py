@@ -0,0 +1,53 @@
+"""Client helpers for the prediction API, for the dashboard and batch jobs.
+
+    from api_client import predict, predict_frame
+    result = predict(project_dict)                       # one project, JSON
+    results = predict_frame(projects_df, url=API_URL)    # a table, Arrow IPC
+
+``predict_frame`` posts the table to ``/predict_batch_arrow`` in chunks of
+``chunk_size`` rows and returns the results in input order, with the same
+columns as ``score.py`` writes: invalid rows carry an ``error`` message
+instead of failing the whole call.
+"""
+
+import os
+
+import httpx
+import pandas as pd
+
+from columnar import ARROW_STREAM, read_ipc, write_ipc
+from model_utils import FEATURES
+
+API_URL = os.getenv('POWERGRID_API_URL', 'http://localhost:8000')
+DEFAULT_CHUNK_ROWS = 50_000
+DEFAULT_TIMEOUT_SECONDS = 120.0
+
+
+def predict(project: dict, url: str = API_URL, client: httpx.Client | None = None) -> dict:
+    """``POST /predict`` for one project; raises ``httpx.HTTPStatusError`` on 4xx/5xx."""
+    response = (client or httpx).post(f'{url}/predict', json=project, timeout=DEFAULT_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return response.json()
+
+
+def predict_arrow_chunk(frame: pd.DataFrame, url: str = API_URL, client: httpx.Client | None = None,
+                        timeout: float = DEFAULT_TIMEOUT_SECONDS) -> pd.DataFrame:
+    """Score one table in a single ``/predict_batch_arrow`` call."""
+    columns = FEATURES + [col for col in ('project_id',) if col in frame]
+    response = (client or httpx).post(
+        f'{url}/predict_batch_arrow',
+        content=write_ipc(frame[columns]),
+        headers={'Content-Type': ARROW_STREAM, 'Accept': ARROW_STREAM},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    return read_ipc(response.content)
+
+
+def predict_frame(frame: pd.DataFrame, url: str = API_URL, chunk_size: int = DEFAULT_CHUNK_ROWS,
+                  timeout: float = DEFAULT_TIMEOUT_SECONDS) -> pd.DataFrame:
+    """Score a DataFrame of projects over Arrow IPC, ``chunk_size`` rows per request."""
+    with httpx.Client() as client:
+        parts = [predict_arrow_chunk(frame.iloc[start:start + chunk_size], url, client, timeout)
+                 for start in range(0, len(frame), chunk_size)]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
@@ -0,0 +1,206 @@
+"""Append-only, non-blocking audit log of scored requests.
+
+Request handlers only enqueue ``(endpoint, request, response)``; a background
+thread serializes records and appends them to a JSONL file in batches. The
+active file is rotated by size and/or age, optionally gzip-compressed on
+rotation. With ``policy='drop'`` a full queue drops records (counted in
+``stats()``); with ``policy='block'`` the caller waits for space. ``close()``
+drains the queue and flushes before returning.
+"""
+
+import glob
+import gzip
+import json
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from collections.abc import Iterator
+from datetime import datetime, timezone
+
+_STOP = object()
+# Rotated files are named <base>.<UTC timestamp><ext>[.gz] (see AuditLogger._rotate).
+_STAMP_FORMAT = '%Y%m%dT%H%M%S%fZ'
+_STAMP_PATTERN = r'\d{8}T\d{12}Z'
+
+
+class AuditLogger:
+    def __init__(
+        self,
+        path: str,
+        max_queue: int = 10_000,
+        policy: str = 'drop',
+        batch_size: int = 512,
+        flush_interval: float = 1.0,
+        max_bytes: int = 100 * 1024 * 1024,
+        rotate_seconds: float | None = 3600.0,
+        compress: bool = False,
+    ):
+        if policy not in ('drop', 'block'):
+            raise ValueError("policy must be 'drop' or 'block'")
+        self.path = path
+        self.policy = policy
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds or None
+        self.compress = compress
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        self._file = None
+        self._opened_at = 0.0
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.rotations = 0
+        self.write_errors = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+        self._thread.start()
+
+    def try_log(self, endpoint: str, request, response) -> bool:
+        """Enqueue without ever blocking; False when the queue is full."""
+        try:
+            self._queue.put_nowait((time.time(), endpoint, request, response))
+        except queue.Full:
+            return False
+        self.enqueued += 1
+        return True
+
+    def log(self, endpoint: str, request, response) -> bool:
+        """Enqueue according to the configured policy; False when the record was dropped."""
+        if self.try_log(endpoint, request, response):
+            return True
+        if self.policy == 'block':
+            self._queue.put((time.time(), endpoint, request, response))
+            self.enqueued += 1
+            return True
+        self.dropped += 1
+        return False
+
+    def close(self, timeout: float | None = 30.0):
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            'path': self.path,
+            'policy': self.policy,
+            'queue_depth': self._queue.qsize(),
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'rotations': self.rotations,
+            'write_errors': self.write_errors,
+        }
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if _STOP in batch:
+                batch.remove(_STOP)
+                stopping = True
+                # Drain whatever was enqueued before close().
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+            try:
+                self._write(batch)
+            except Exception:
+                # The batch is lost, but the writer must outlive it: with policy='block'
+                # a dead writer would leave every audited request waiting for queue space.
+                self.write_errors += 1
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, batch: list):
+        if self._file is not None and self._should_rotate():
+            self._rotate()
+        if not batch:
+            return
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+            self._opened_at = time.time()
+        lines = []
+        for ts, endpoint, request, response in batch:
+            try:
+                lines.append(json.dumps(
+                    {'ts': ts, 'endpoint': endpoint, 'request': _plain(request), 'response': response}
+                ))
+            except (TypeError, ValueError):
+                # Not JSON-serializable: skipped and counted, the rest of the batch is written.
+                self.write_errors += 1
+        if not lines:
+            return
+        self._file.write('\n'.join(lines) + '\n')
+        self._file.flush()
+        self.written += len(lines)
+
+    def _should_rotate(self) -> bool:
+        if self._file.tell() >= self.max_bytes:
+            return True
+        return self.rotate_seconds is not None and time.time() - self._opened_at >= self.rotate_seconds
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        stamp = datetime.now(timezone.utc).strftime(_STAMP_FORMAT)
+        base, ext = os.path.splitext(self.path)
+        rotated = f'{base}.{stamp}{ext}'
+        os.replace(self.path, rotated)
+        if self.compress:
+            with open(rotated, 'rb') as src, gzip.open(f'{rotated}.gz', 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(rotated)
+        self.rotations += 1
+
+
+def _plain(request):
+    if isinstance(request, list):
+        return [_plain(r) for r in request]
+    return request.model_dump() if hasattr(request, 'model_dump') else request
+
+
+def log_files(path: str) -> list[str]:
+    """Rotated files (oldest first) followed by the active file.
+
+    Only the rotation timestamp suffix matches, so other logs next to this one
+    (e.g. ``requests.w1.jsonl`` of another worker) are not included.
+    """
+    base, ext = os.path.splitext(path)
+    pattern = re.compile(f'{re.escape(base)}\\.{_STAMP_PATTERN}{re.escape(ext)}(\\.gz)?')
+    rotated = sorted(f for f in glob.glob(f'{glob.escape(base)}.*') if pattern.fullmatch(f))
+    return rotated + ([path] if os.path.exists(path) else [])
+
+
+def read_records(path: str) -> Iterator[dict]:
+    """Yield audit records in write order from a log file or the whole rotated set of a log path."""
+    files = log_files(path) if not path.endswith('.gz') else [path]
+    for fname in files:
+        opener = gzip.open if fname.endswith('.gz') else open
+        with opener(fname, 'rt', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
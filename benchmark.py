@@ -0,0 +1,359 @@
+"""Reproducible performance benchmarks with a regression gate.
+
+    python benchmark.py run [--suites train,load,predict,batch,http] [--quick] [--output bench.json]
+    python benchmark.py compare BASELINE.json CURRENT.json [--threshold 0.10]
+
+``run`` measures training wall time and peak memory at several dataset sizes
+(each in a fresh interpreter), artifact load and compile time, single-row
+``_predict`` latency percentiles, ``_score_batch`` throughput from 1 to 100k
+rows, and end-to-end HTTP throughput against a locally launched uvicorn. The
+result is JSON: environment metadata plus ``metrics``, each with a value, a
+unit and whether lower or higher is better. ``compare`` exits with status 1
+when any metric present in both files is worse than the baseline by more than
+the threshold (relative), so it can gate model and code changes.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SUITES = ('train', 'load', 'predict', 'batch', 'http')
+DEFAULT_THRESHOLD = 0.10
+SEED = 42
+
+FULL = {
+    'train_rows': (2_000, 20_000, 100_000),
+    'load_repeats': 5,
+    'predict_calls': 2_000,
+    'batch_sizes': (1, 10, 100, 1_000, 10_000, 100_000),
+    'http_seconds': 10.0,
+    'http_concurrency': 16,
+}
+QUICK = {
+    'train_rows': (2_000,),
+    'load_repeats': 3,
+    'predict_calls': 300,
+    'batch_sizes': (1, 100, 1_000),
+    'http_seconds': 3.0,
+    'http_concurrency': 8,
+}
+
+
+def _metric(value: float, unit: str, better: str = 'lower') -> dict:
+    return {'value': float(value), 'unit': unit, 'better': better}
+
+
+def _percentiles_ms(seconds: list[float]) -> dict:
+    p50, p95, p99 = np.percentile(np.array(seconds) * 1000, [50, 95, 99])
+    return {'p50_ms': _metric(p50, 'ms'), 'p95_ms': _metric(p95, 'ms'), 'p99_ms': _metric(p99, 'ms')}
+
+
+def _payloads(n: int) -> list:
+    from generate_synthetic_data import generate
+    from model_utils import FEATURES
+    from serve_model_fastapi import ProjectIn
+
+    frames = [chunk[FEATURES] for chunk in generate(n, seed=SEED)]
+    records = [r for frame in frames for r in frame.to_dict('records')]
+    return [ProjectIn(**r) for r in records[:n]]
+
+
+def _train_once(data: str) -> dict:
+    """Runs in a fresh interpreter so peak RSS belongs to training alone."""
+    import pandas as pd
+
+    from train_model import train_and_evaluate
+
+    started = time.perf_counter()
+    df = pd.read_csv(data)
+    with contextlib.redirect_stdout(io.StringIO()):
+        train_and_evaluate(df, report_path=None)
+    return {
+        'wall_seconds': time.perf_counter() - started,
+        # Linux reports KiB; include the forked per-target training workers.
+        'peak_rss_mb': max(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        ) / 1024,
+    }
+
+
+def bench_train(config: dict) -> dict:
+    from generate_synthetic_data import generate, write_chunks
+
+    metrics = {}
+    with tempfile.TemporaryDirectory(prefix='powergrid-bench-') as tmp:
+        for rows in config['train_rows']:
+            data = os.path.join(tmp, f'projects_{rows}.csv')
+            write_chunks(generate(rows, seed=SEED), data)
+            code = f'import json, benchmark; print(json.dumps(benchmark._train_once({data!r})))'
+            out = subprocess.run(
+                [sys.executable, '-c', code], cwd=REPO_DIR, check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            metrics[f'train.rows_{rows}.wall_seconds'] = _metric(result['wall_seconds'], 's')
+            metrics[f'train.rows_{rows}.peak_rss_mb'] = _metric(result['peak_rss_mb'], 'MiB')
+    return metrics
+
+
+def bench_load(config: dict) -> dict:
+    import serve_model_fastapi as server
+    from compiled_model import compile_pipelines
+
+    load_times, compile_times = [], []
+    for _ in range(config['load_repeats']):
+        started = time.perf_counter()
+        models = server._read_artifacts()
+        loaded = time.perf_counter()
+        compile_pipelines(*models)
+        load_times.append(loaded - started)
+        compile_times.append(time.perf_counter() - loaded)
+    return {
+        'load.load_models_seconds': _metric(statistics.median(load_times), 's'),
+        'load.compile_seconds': _metric(statistics.median(compile_times), 's'),
+    }
+
+
+def bench_predict(config: dict) -> dict:
+    import serve_model_fastapi as server
+
+    payloads = _payloads(config['predict_calls'])
+    cache, server._prediction_cache = server._prediction_cache, None
+    try:
+        for payload in payloads[:50]:
+            server._predict(payload)
+        latencies = []
+        for payload in payloads:
+            started = time.perf_counter()
+            server._predict(payload)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        server._prediction_cache = cache
+    return {f'predict.{name}': metric for name, metric in _percentiles_ms(latencies).items()}
+
+
+def bench_batch(config: dict) -> dict:
+    import serve_model_fastapi as server
+
+    sizes = config['batch_sizes']
+    payloads = _payloads(max(sizes))
+    version = server._model_version()
+    server._score_batch(payloads[:100], version)
+    metrics = {}
+    for size in sizes:
+        batch = payloads[:size]
+        # Repeat small batches so each measurement covers a meaningful amount of work.
+        repeats = max(3, min(200, 20_000 // size))
+        best = float('inf')
+        for _ in range(repeats):
+            started = time.perf_counter()
+            server._score_batch(batch, version)
+            best = min(best, time.perf_counter() - started)
+        metrics[f'batch.size_{size}.rows_per_second'] = _metric(size / best, 'rows/s', 'higher')
+    return metrics
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def _http_load(url: str, payloads: list[dict], seconds: float, concurrency: int) -> tuple[list[float], int]:
+    import httpx
+
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=30.0, limits=limits) as client:
+        deadline = time.perf_counter() + seconds
+
+        async def worker(offset: int):
+            nonlocal errors
+            i = offset
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.post('/predict', json=payloads[i % len(payloads)])
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+                i += concurrency
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return latencies, errors
+
+
+def bench_http(config: dict) -> dict:
+    import httpx
+
+    port = _free_port()
+    url = f'http://127.0.0.1:{port}'
+    # The cache is disabled so the benchmark measures scoring, not dictionary lookups.
+    env = {**os.environ, 'POWERGRID_CACHE_SIZE': '0'}
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'serve_model_fastapi:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=REPO_DIR, env=env,
+    )
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                if httpx.get(f'{url}/health', timeout=1.0).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline or server.poll() is not None:
+                raise RuntimeError('uvicorn did not become healthy')
+            time.sleep(0.2)
+
+        payloads = [p.model_dump() for p in _payloads(1_000)]
+        asyncio.run(_http_load(url, payloads, 1.0, config['http_concurrency']))
+        seconds = config['http_seconds']
+        latencies, errors = asyncio.run(_http_load(url, payloads, seconds, config['http_concurrency']))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    metrics = {
+        'http.predict.requests_per_second': _metric(len(latencies) / seconds, 'req/s', 'higher'),
+        'http.predict.errors': _metric(errors, 'count'),
+    }
+    metrics.update({f'http.predict.{name}': m for name, m in _percentiles_ms(latencies).items()})
+    return metrics
+
+
+BENCHMARKS = {
+    'train': bench_train,
+    'load': bench_load,
+    'predict': bench_predict,
+    'batch': bench_batch,
+    'http': bench_http,
+}
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(suites: list[str], quick: bool = False) -> dict:
+    import sklearn
+    import xgboost
+
+    config = QUICK if quick else FULL
+    metrics = {}
+    for suite in suites:
+        started = time.perf_counter()
+        metrics.update(BENCHMARKS[suite](config))
+        print(f'{suite}: {time.perf_counter() - started:.1f}s', file=sys.stderr)
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'xgboost': xgboost.__version__,
+            'scikit-learn': sklearn.__version__,
+            'suites': suites,
+            'quick': quick,
+            'config': config,
+        },
+        'metrics': metrics,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """Rows for every metric in both results; ``regressed`` when worse by more than threshold."""
+    rows = []
+    for name, base in baseline['metrics'].items():
+        if name not in current['metrics']:
+            continue
+        value = current['metrics'][name]['value']
+        if base['value'] == 0:
+            change = 0.0 if value == 0 else float('inf')
+        else:
+            change = (value - base['value']) / abs(base['value'])
+        worse = change if base['better'] == 'lower' else -change
+        rows.append({
+            'metric': name,
+            'baseline': base['value'],
+            'current': value,
+            'unit': base['unit'],
+            'change': change,
+            'regressed': worse > threshold,
+        })
+    return rows
+
+
+def print_comparison(rows: list[dict]):
+    width = max((len(r['metric']) for r in rows), default=6)
+    for r in rows:
+        flag = 'REGRESSION' if r['regressed'] else ''
+        print(f"{r['metric']:<{width}}  {r['baseline']:>12.4g}  {r['current']:>12.4g} {r['unit']:<6} "
+              f"{r['change']:+8.1%}  {flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run or compare POWERGRID performance benchmarks.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    run_parser = sub.add_parser('run', help='run benchmarks and write JSON results')
+    run_parser.add_argument('--suites', default=','.join(SUITES), help=f'comma-separated subset of {SUITES}')
+    run_parser.add_argument('--quick', action='store_true', help='smaller sizes and shorter runs')
+    run_parser.add_argument('--output', default='bench.json')
+    run_parser.add_argument('--baseline', default=None, help='compare against this result file afterwards')
+    run_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    compare_parser = sub.add_parser('compare', help='fail when CURRENT regresses against BASELINE')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help='allowed relative slowdown per metric (default 0.10)')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        suites = [s for s in args.suites.split(',') if s]
+        unknown = set(suites) - set(SUITES)
+        if unknown:
+            parser.error(f'unknown suites: {sorted(unknown)}')
+        current = run(suites, args.quick)
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f'Wrote {len(current["metrics"])} metrics to {args.output}')
+        if not args.baseline:
+            return
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+
+    rows = compare(baseline, current, args.threshold)
+    print_comparison(rows)
+    regressions = [r for r in rows if r['regressed']]
+    if regressions:
+        print(f'{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
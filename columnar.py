@@ -0,0 +1,118 @@
+"""Column-at-a-time scoring, shared by score.py and the Arrow batch endpoint.
+
+``score_columns`` validates a table of projects against the ProjectIn
+constraints, encodes the valid rows straight into the model matrix and
+evaluates the risk-rule table over whole columns; no per-row objects are
+built. Invalid rows are kept, with an ``error`` message and empty predictions.
+
+Over HTTP the table travels as an Arrow IPC stream (``ARROW_STREAM``) in both
+directions; ``read_ipc`` and ``write_ipc`` convert between that and pandas.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from compiled_model import CompiledPredictor
+from model_utils import FEATURES, validate_frame
+from project_store import to_store_table
+from risk_rules import RiskRules
+from vendor_stats import VendorStats
+
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+# Input columns copied to the results, so callers can join them back.
+PASSTHROUGH_COLUMNS = ['project_id']
+RESULT_COLUMNS = [
+    'cost_overrun_probability',
+    'cost_overrun_predicted',
+    'time_overrun_probability',
+    'time_overrun_predicted',
+    'key_risk_factors',
+    'vendor_rating_band',
+    'vendor_cohort_risk',
+    'error',
+]
+
+
+def score_columns(
+    chunk: pd.DataFrame,
+    predictors: tuple[CompiledPredictor, CompiledPredictor],
+    vendor_stats: VendorStats,
+    rules: RiskRules,
+) -> pd.DataFrame:
+    """Passthrough columns followed by ``RESULT_COLUMNS``, one row per input row."""
+    predictor_cost, predictor_time = predictors
+    chunk = chunk.reset_index(drop=True)
+    errors = validate_frame(chunk)
+    valid = errors == ''
+    n = len(chunk)
+
+    out = pd.DataFrame({col: chunk[col] for col in PASSTHROUGH_COLUMNS if col in chunk})
+    cost_probs = np.full(n, np.nan)
+    time_probs = np.full(n, np.nan)
+    factors = np.full(n, None, dtype=object)
+    bands = np.full(n, None, dtype=object)
+    cohorts = np.full(n, None, dtype=object)
+
+    if valid.any():
+        rows = chunk.loc[valid, FEATURES] if not valid.all() else chunk[FEATURES]
+        X = predictor_cost.encoder.encode_columns(rows)
+        X_time = X if predictor_time.encoder is predictor_cost.encoder else predictor_time.encoder.encode_columns(rows)
+        cost_probs[valid] = predictor_cost.positive_proba(X)
+        time_probs[valid] = predictor_time.positive_proba(X_time)
+
+        row_factors = rules.key_risk_factors(rows, cost_probs[valid], time_probs[valid], vendor_stats)
+        for i, labels in zip(np.flatnonzero(valid), row_factors):
+            factors[i] = labels
+        bands[valid] = rules.band_names(rows['vendor_rating'])
+        cohorts[valid] = [vendor_stats.cohort_risk(vendor) for vendor in rows['vendor']]
+
+    out['cost_overrun_probability'] = cost_probs
+    out['cost_overrun_predicted'] = _predicted(cost_probs, valid)
+    out['time_overrun_probability'] = time_probs
+    out['time_overrun_predicted'] = _predicted(time_probs, valid)
+    out['key_risk_factors'] = factors
+    out['vendor_rating_band'] = bands
+    out['vendor_cohort_risk'] = cohorts
+    out['error'] = errors
+    return out
+
+
+def _predicted(probs: np.ndarray, valid: np.ndarray) -> pd.arrays.IntegerArray:
+    predicted = pd.array((probs > 0.5).astype(np.int8), dtype='Int8')
+    predicted[~valid] = pd.NA
+    return predicted
+
+
+def records(frame: pd.DataFrame) -> list[dict]:
+    """JSON-ready row dicts: missing values become None and numpy scalars Python ones."""
+    return [{k: _json_value(v) for k, v in record.items()} for record in frame.to_dict('records')]
+
+
+def _json_value(value):
+    if value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def read_ipc(data: bytes) -> pd.DataFrame:
+    """An Arrow IPC stream as a DataFrame with the project store's column types.
+
+    Categories outside the vocabulary and uncastable numbers are kept as sent,
+    so ``validate_frame`` reports them per row.
+    """
+    with pa.ipc.open_stream(data) as reader:
+        table = reader.read_all()
+    return to_store_table(table).to_pandas()
+
+
+def write_ipc(frame: pd.DataFrame, metadata: dict[str, str] | None = None) -> bytes:
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    if metadata:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,240 @@
+"""Pandas-free inference for fitted ``build_pipeline`` pipelines.
+
+The ColumnTransformer/OneHotEncoder step is replaced by a direct mapping from
+category value to output column, and the booster is called with
+``inplace_predict`` on a float64 matrix laid out exactly like the
+ColumnTransformer output, so probabilities match ``pipe.predict_proba``
+bit for bit.
+"""
+
+import threading
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+import xgboost as xgb
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder
+
+
+class CompiledEncoder:
+    def __init__(self, preproc: ColumnTransformer):
+        self.feature_names = [str(c) for c in preproc.feature_names_in_]
+        self.categorical: list[tuple[str, dict[str, int]]] = []
+        self.categories: dict[str, np.ndarray] = {}
+        self.offsets: dict[str, int] = {}
+        self.numerical: list[tuple[str, int]] = []
+
+        for name, transformer, columns in preproc.transformers_:
+            if transformer == 'drop' or len(columns) == 0:
+                continue
+            out = preproc.output_indices_[name]
+            if isinstance(transformer, OneHotEncoder):
+                _check_encoder(transformer)
+                offset = out.start
+                for column, cats in zip(columns, transformer.categories_):
+                    column = self._column_name(column)
+                    self.categories[column] = np.asarray(cats).astype(str)
+                    self.offsets[column] = offset
+                    self.categorical.append(
+                        (column, {str(v): offset + j for j, v in enumerate(cats)})
+                    )
+                    offset += len(cats)
+            elif name == 'remainder' and _is_passthrough(transformer):
+                for j, column in enumerate(columns):
+                    self.numerical.append((self._column_name(column), out.start + j))
+            else:
+                raise ValueError(f'Cannot compile transformer {name!r}: {transformer!r}')
+
+        self.n_features = len(preproc.get_feature_names_out())
+        self._local = threading.local()
+
+        # Sums per-column contributions (plus the trailing bias column) back
+        # into one column per input feature, in feature_names order, plus bias.
+        feature_index = {name: i for i, name in enumerate(self.feature_names)}
+        self.contribution_matrix = np.zeros(
+            (self.n_features + 1, len(self.feature_names) + 1), dtype=np.float32
+        )
+        for name, index in self.categorical:
+            self.contribution_matrix[list(index.values()), feature_index[name]] = 1.0
+        for name, col in self.numerical:
+            self.contribution_matrix[col, feature_index[name]] = 1.0
+        self.contribution_matrix[-1, -1] = 1.0
+
+    def same_layout(self, other: 'CompiledEncoder') -> bool:
+        return (
+            self.n_features == other.n_features
+            and self.categorical == other.categorical
+            and self.numerical == other.numerical
+        )
+
+    def _column_name(self, column) -> str:
+        if isinstance(column, str):
+            return column
+        return self.feature_names[int(column)]
+
+    def _row_buffer(self) -> np.ndarray:
+        row = getattr(self._local, 'row', None)
+        if row is None:
+            row = self._local.row = np.zeros((1, self.n_features), dtype=np.float64)
+        else:
+            row.fill(0.0)
+        return row
+
+    def encode_one(self, record) -> np.ndarray:
+        """Encode one record (any object exposing the feature attributes).
+
+        Returns a per-thread preallocated ``(1, n_features)`` row that is
+        overwritten by the next call on the same thread.
+        """
+        row = self._row_buffer()
+        values = row[0]
+        for name, index in self.categorical:
+            col = index.get(getattr(record, name))
+            if col is not None:
+                values[col] = 1.0
+        for name, col in self.numerical:
+            values[col] = getattr(record, name)
+        return row
+
+    def encode(self, records: Sequence) -> np.ndarray:
+        X = np.zeros((len(records), self.n_features), dtype=np.float64)
+        for name, index in self.categorical:
+            for i, record in enumerate(records):
+                col = index.get(getattr(record, name))
+                if col is not None:
+                    X[i, col] = 1.0
+        for name, col in self.numerical:
+            X[:, col] = [getattr(record, name) for record in records]
+        return X
+
+    def encode_columns(self, columns: Mapping) -> np.ndarray:
+        """Encode column arrays (DataFrame, dict of arrays, ...) without per-row work."""
+        n = len(columns[self.feature_names[0]])
+        X = np.zeros((n, self.n_features), dtype=np.float64)
+        rows = np.arange(n)
+        for name, _ in self.categorical:
+            cats = self.categories[name]
+            values = columns[name]
+            codes = None
+            if hasattr(values, 'cat'):
+                # pandas categorical column: look each category up once and gather by code (-1 is missing).
+                values, codes = values.cat.categories, values.cat.codes.to_numpy()
+            values = np.asarray(values).astype(str)
+            # categories_ are sorted, so a binary search gives the one-hot position.
+            pos = np.minimum(np.searchsorted(cats, values), len(cats) - 1)
+            known = cats[pos] == values
+            if codes is not None:
+                pos, known = pos[codes], known[codes] & (codes >= 0)
+            X[rows[known], self.offsets[name] + pos[known]] = 1.0
+        for name, col in self.numerical:
+            X[:, col] = np.asarray(columns[name], dtype=np.float64)
+        return X
+
+    def encode_variants(self, record, overrides: Mapping[str, Sequence]) -> np.ndarray:
+        """Encode n copies of ``record`` with some features replaced by per-row values.
+
+        Each override holds n values. Only the overridden columns are written
+        per row, so a what-if grid costs one row encode plus a few vectorized
+        column assignments.
+        """
+        n = len(next(iter(overrides.values())))
+        X = np.repeat(self.encode_one(record), n, axis=0)
+        categorical = dict(self.categorical)
+        numerical = dict(self.numerical)
+        rows = np.arange(n)
+        for name, values in overrides.items():
+            if name in categorical:
+                cats = self.categories[name]
+                offset = self.offsets[name]
+                values = np.asarray(values).astype(str)
+                pos = np.minimum(np.searchsorted(cats, values), len(cats) - 1)
+                known = cats[pos] == values
+                X[:, offset:offset + len(cats)] = 0.0
+                X[rows[known], offset + pos[known]] = 1.0
+            elif name in numerical:
+                X[:, numerical[name]] = np.asarray(values, dtype=np.float64)
+            else:
+                raise KeyError(f'Unknown feature {name!r}')
+        return X
+
+
+class CompiledPredictor:
+    def __init__(self, encoder: CompiledEncoder, clf):
+        if getattr(clf, 'objective', None) != 'binary:logistic':
+            raise ValueError(f'Cannot compile objective {getattr(clf, "objective", None)!r}')
+        self.encoder = encoder
+        self.booster = clf.get_booster()
+        self.iteration_range = clf._get_iteration_range(None)
+        self.missing = clf.missing
+
+    def positive_proba(self, X: np.ndarray) -> np.ndarray:
+        return self.booster.inplace_predict(
+            X,
+            iteration_range=self.iteration_range,
+            predict_type='value',
+            missing=self.missing,
+            validate_features=False,
+        )
+
+    def contributions(self, X: np.ndarray | xgb.DMatrix, approximate: bool = False) -> np.ndarray:
+        """Per-feature SHAP contributions in log-odds, shape (n, len(feature_names) + 1).
+
+        Computed natively by XGBoost (exact TreeSHAP via ``pred_contribs``, or
+        the faster Saabas approximation with ``approximate=True``); one-hot
+        columns are summed back into their source feature and the last column
+        is the bias, so each row sums to the model margin. Pass a DMatrix to
+        reuse it across models that share an encoder.
+        """
+        if not isinstance(X, xgb.DMatrix):
+            X = xgb.DMatrix(X, missing=self.missing)
+        contribs = self.booster.predict(
+            X,
+            pred_contribs=True,
+            approx_contribs=approximate,
+            iteration_range=self.iteration_range,
+            validate_features=False,
+        )
+        return contribs @ self.encoder.contribution_matrix
+
+    def predict_one(self, record) -> float:
+        return float(self.positive_proba(self.encoder.encode_one(record))[0])
+
+    def predict_proba(self, records: Sequence) -> np.ndarray:
+        prob = self.positive_proba(self.encoder.encode(records))
+        return np.vstack((1.0 - prob, prob)).T
+
+
+def compile_pipeline(pipe: Pipeline, encoder: CompiledEncoder | None = None) -> CompiledPredictor:
+    if encoder is None:
+        encoder = CompiledEncoder(pipe.named_steps['pre'])
+    return CompiledPredictor(encoder, pipe.named_steps['clf'])
+
+
+def compile_pipelines(*pipes: Pipeline) -> list[CompiledPredictor]:
+    """Compile several pipelines, sharing one encoder between those whose
+    preprocessors produce the same column layout so callers encode once."""
+    encoders: list[CompiledEncoder] = []
+    predictors = []
+    for pipe in pipes:
+        encoder = CompiledEncoder(pipe.named_steps['pre'])
+        shared = next((e for e in encoders if e.same_layout(encoder)), None)
+        if shared is None:
+            encoders.append(encoder)
+            shared = encoder
+        predictors.append(compile_pipeline(pipe, shared))
+    return predictors
+
+
+def _check_encoder(ohe: OneHotEncoder):
+    if ohe.drop_idx_ is not None or getattr(ohe, '_infrequent_enabled', False):
+        raise ValueError('Cannot compile OneHotEncoder with drop or infrequent categories')
+    if ohe.handle_unknown not in ('ignore', 'infrequent_if_exist'):
+        raise ValueError('Cannot compile OneHotEncoder that errors on unknown categories')
+
+
+def _is_passthrough(transformer) -> bool:
+    # Fitted remainder='passthrough' is stored as an identity FunctionTransformer.
+    return transformer == 'passthrough' or (
+        isinstance(transformer, FunctionTransformer) and transformer.func is None
+    )
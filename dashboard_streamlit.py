@@ -1,8 +1,16 @@
 import streamlit as st
 import pandas as pd
 import requests
-import plotly.express as px
-import plotly.graph_objects as go
+
+from project_store import default_history_path, read_history
+
+# plotly is imported next to the charts that use it, so the header and form render before it loads.
+
+
+@st.cache_data
+def load_history(path: str) -> pd.DataFrame:
+    return read_history(path)
+
 
 # --- Page Config ---
 st.set_page_config(
@@ -92,19 +100,19 @@ with st.sidebar.form("prediction_form"):
 
 # --- Main Content ---
 
+payload = {
+    'project_type': project_type,
+    'terrain': terrain,
+    'planned_days': int(planned_days),
+    'planned_cost': float(planned_cost),
+    'regulatory_risk': regulatory_risk,
+    'season': season,
+    'vendor': vendor,
+    'vendor_rating': float(vendor_rating),
+    'market_condition': market_condition
+}
+
 if submit_btn:
-    payload = {
-        'project_type': project_type,
-        'terrain': terrain,
-        'planned_days': int(planned_days),
-        'planned_cost': float(planned_cost),
-        'regulatory_risk': regulatory_risk,
-        'season': season,
-        'vendor': vendor,
-        'vendor_rating': float(vendor_rating),
-        'market_condition': market_condition
-    }
-    
     try:
         res = requests.post('http://localhost:8000/predict', json=payload)
         if res.status_code == 200:
@@ -119,6 +127,8 @@ if submit_btn:
             # --- Results Display ---
             st.markdown("### 📊 Prediction Analysis")
             
+            import plotly.graph_objects as go
+
             # Gauge Chart for Risk Probability
             fig_gauge = go.Figure(go.Indicator(
                 mode = "gauge+number",
@@ -173,11 +183,95 @@ if submit_btn:
         st.error(f"Connection Error: {e}")
         st.info("Make sure the FastAPI server is running: `python serve_model_fastapi.py`")
 
+st.markdown("---")
+st.markdown("### 🎛️ What-if Sensitivity Sweep")
+st.caption("Varies one or two fields of the project in the sidebar and scores every combination in one request.")
+
+# Numeric fields sweep their full valid range; categorical fields sweep every level.
+SWEEP_FIELDS = {
+    'vendor_rating': {'start': 1.0, 'stop': 5.0},
+    'planned_days': {'start': 10, 'stop': 2000},
+    'planned_cost': {'start': 1_000_000.0, 'stop': 100_000_000.0},
+    'season': {'values': ['Summer', 'Winter', 'Monsoon']},
+    'vendor': {'values': [f'vendor_{i}' for i in range(1, 21)]},
+    'terrain': {'values': ['plains', 'hilly', 'forest', 'urban']},
+    'regulatory_risk': {'values': ['Low', 'Medium', 'High']},
+    'market_condition': {'values': ['Stable', 'Volatile']},
+}
+
+with st.form("sweep_form"):
+    col_sw1, col_sw2, col_sw3 = st.columns(3)
+    with col_sw1:
+        x_field = st.selectbox('Sweep field', list(SWEEP_FIELDS))
+    with col_sw2:
+        y_field = st.selectbox('Second field (optional)', ['(none)'] + list(SWEEP_FIELDS))
+    with col_sw3:
+        sweep_points = st.slider('Points per numeric field', 5, 100, 40)
+    sweep_target = st.radio('Heatmap target', ['cost_overrun', 'time_overrun'], horizontal=True)
+    sweep_btn = st.form_submit_button("📐 Run Sweep")
+
+if sweep_btn:
+    fields = [x_field] + ([y_field] if y_field not in ('(none)', x_field) else [])
+    axes = [
+        {'field': f, **SWEEP_FIELDS[f]} if 'values' in SWEEP_FIELDS[f]
+        else {'field': f, **SWEEP_FIELDS[f], 'num': sweep_points}
+        for f in fields
+    ]
+    try:
+        res = requests.post('http://localhost:8000/sweep', json={'base': payload, 'axes': axes})
+        if res.status_code == 200:
+            sweep = res.json()
+            if len(fields) == 1:
+                import plotly.graph_objects as go
+
+                x_values = sweep['axes'][0]['values']
+                fig_sweep = go.Figure()
+                fig_sweep.add_trace(go.Scatter(x=x_values, y=sweep['cost_overrun_probability'], name='Cost overrun'))
+                fig_sweep.add_trace(go.Scatter(x=x_values, y=sweep['time_overrun_probability'], name='Time overrun'))
+                fig_sweep.update_layout(xaxis_title=fields[0], yaxis_title='Probability', yaxis_range=[0, 1])
+            else:
+                import plotly.express as px
+
+                fig_sweep = px.imshow(
+                    sweep[f'{sweep_target}_probability'],
+                    x=[str(v) for v in sweep['axes'][1]['values']],
+                    y=[str(v) for v in sweep['axes'][0]['values']],
+                    labels={'x': fields[1], 'y': fields[0], 'color': 'Probability'},
+                    zmin=0, zmax=1, color_continuous_scale='RdYlGn_r', aspect='auto',
+                )
+            st.plotly_chart(fig_sweep, use_container_width=True)
+            st.caption(f"{sweep_target if len(fields) == 2 else 'Both targets'} · model {sweep['model_version']}")
+        else:
+            st.error(f"Sweep failed: {res.json().get('detail', res.status_code)}")
+    except Exception as e:
+        st.error(f"Connection Error: {e}")
+
+st.markdown("---")
+st.markdown("### 📦 Batch Scoring")
+st.caption("Upload a CSV or Parquet file of projects; it is sent to the API as Arrow IPC and scored column by column.")
+
+batch_file = st.file_uploader('Projects file', type=['csv', 'parquet'])
+if batch_file is not None:
+    try:
+        from api_client import predict_frame
+
+        projects = pd.read_parquet(batch_file) if batch_file.name.endswith('.parquet') else pd.read_csv(batch_file)
+        scored = predict_frame(projects, url='http://localhost:8000')
+        n_invalid = int((scored['error'] != '').sum())
+        st.markdown(f"Scored **{len(scored) - n_invalid}** projects ({n_invalid} invalid rows).")
+        scored = scored.assign(key_risk_factors=scored['key_risk_factors'].map(
+            lambda f: '; '.join(f) if f is not None else None
+        ))
+        st.dataframe(scored, use_container_width=True)
+        st.download_button('Download results (CSV)', scored.to_csv(index=False), file_name='scored_projects.csv')
+    except Exception as e:
+        st.error(f"Batch scoring failed: {e}")
+
 st.markdown("---")
 st.markdown("### 📈 Historical Data Insights")
 
 try:
-    df = pd.read_csv('synthetic_projects.csv')
+    df = load_history(default_history_path())
     
     tab1, tab2 = st.tabs(["Dataset Preview", "Risk Distribution"])
     
@@ -185,6 +279,8 @@ try:
         st.dataframe(df.sample(10), use_container_width=True)
         
     with tab2:
+        import plotly.express as px
+
         col_chart1, col_chart2 = st.columns(2)
         
         with col_chart1:
@@ -0,0 +1,266 @@
+"""Drift of live traffic against the data the models were trained on.
+
+    python drift_monitor.py build        # reference profile from the replay buffer (train_model.py does this)
+    python drift_monitor.py show
+
+A reference profile is built when the models are trained, from the replay
+buffer's uniform sample of the history and the models' predictions on it,
+and saved to ``artifacts/drift_reference.json``. Every feature is binned: one
+bin per vocabulary value for the categorical features; for the numeric
+features and both predicted probabilities, the reference deciles plus one bin
+below the smallest and one above the largest reference value, so traffic
+outside the training range is counted on its own.
+
+The server's ``DriftMonitor`` counts requests into the same bins. As in
+service_metrics, counts are sharded per thread, so recording a request is a
+dozen list increments without a lock: O(1) per request, and memory is fixed by
+the number of bins, threads and windows. Counts go into tumbling time windows;
+a report merges the most recent ones and scores every feature with the
+population stability index (PSI) and, for ordered features, the
+Kolmogorov-Smirnov distance between the binned distributions.
+"""
+
+import argparse
+import json
+import threading
+import time
+from bisect import bisect_right
+from collections.abc import Mapping, Sequence
+from operator import attrgetter
+
+import numpy as np
+
+from compiled_model import CompiledPredictor, compile_pipelines
+from model_utils import (
+    CATEGORICAL,
+    CATEGORY_VALUES,
+    DRIFT_REFERENCE_PATH,
+    NUMERICAL,
+    REPLAY_BUFFER_PATH,
+    load_models,
+    replace_file,
+)
+
+PROBABILITIES = ('cost_overrun_probability', 'time_overrun_probability')
+REFERENCE_QUANTILES = np.linspace(0.1, 0.9, 9)
+# Share given to empty bins on either side, so PSI stays finite.
+SMOOTHING = 1e-4
+# Usual PSI reading: below 0.1 stable, 0.1-0.25 worth watching, above 0.25 drifted.
+PSI_WATCH = 0.1
+PSI_DRIFT = 0.25
+
+
+def build_reference(frame, predictors: Sequence[CompiledPredictor]) -> dict:
+    """Bins and reference counts for every feature and both predicted probabilities."""
+    predictor_cost, predictor_time = predictors
+    X = predictor_cost.encoder.encode_columns(frame)
+    X_time = X if predictor_time.encoder is predictor_cost.encoder else predictor_time.encoder.encode_columns(frame)
+    numeric = {col: np.asarray(frame[col], dtype=float) for col in NUMERICAL}
+    numeric[PROBABILITIES[0]] = predictor_cost.positive_proba(X).astype(float)
+    numeric[PROBABILITIES[1]] = predictor_time.positive_proba(X_time).astype(float)
+
+    features = {}
+    for col in CATEGORICAL:
+        values = list(CATEGORY_VALUES[col])
+        index = {value: i for i, value in enumerate(values)}
+        codes = np.fromiter((index.get(v, -1) for v in np.asarray(frame[col], dtype=object)), np.int64, len(frame))
+        counts = np.bincount(codes[codes >= 0], minlength=len(values))
+        features[col] = {'kind': 'categorical', 'values': values, 'counts': counts.tolist()}
+    for col, values in numeric.items():
+        cuts = np.unique(np.concatenate([
+            [values.min()], np.quantile(values, REFERENCE_QUANTILES), [np.nextafter(values.max(), np.inf)],
+        ]))
+        counts = np.bincount(np.searchsorted(cuts, values, side='right'), minlength=len(cuts) + 1)
+        features[col] = {'kind': 'numeric', 'cuts': cuts.tolist(), 'counts': counts.tolist()}
+    return {'rows': len(frame), 'created_at': time.time(), 'features': features}
+
+
+def save_reference(reference: dict, path: str = DRIFT_REFERENCE_PATH):
+    # Same write-then-rename as the model artifacts.
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(reference, f)
+    replace_file(tmp, path)
+
+
+def load_reference(path: str = DRIFT_REFERENCE_PATH) -> dict | None:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def psi(reference: np.ndarray, observed: np.ndarray) -> float:
+    expected = np.maximum(reference / reference.sum(), SMOOTHING)
+    actual = np.maximum(observed / observed.sum(), SMOOTHING)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks(reference: np.ndarray, observed: np.ndarray) -> float:
+    """Largest gap between the two CDFs at the bin edges (a lower bound of the exact statistic)."""
+    return float(np.abs(np.cumsum(reference) / reference.sum() - np.cumsum(observed) / observed.sum()).max())
+
+
+def _status(score: float) -> str:
+    return 'drift' if score >= PSI_DRIFT else 'watch' if score >= PSI_WATCH else 'stable'
+
+
+class DriftMonitor:
+    def __init__(self, reference: dict, window_seconds: float = 300.0, windows: int = 12):
+        self.reference = reference
+        self.window_seconds = window_seconds
+        self.windows = windows
+        self._slices = {}
+        size = 0
+        for name, spec in reference['features'].items():
+            self._slices[name] = slice(size, size + len(spec['counts']))
+            size += len(spec['counts'])
+        self._size = size
+        features = reference['features']
+        self._categorical = [
+            (name, {value: self._slices[name].start + i for i, value in enumerate(features[name]['values'])})
+            for name in features if features[name]['kind'] == 'categorical'
+        ]
+        self._numeric = [(name, features[name]['cuts'], self._slices[name].start)
+                         for name in features if features[name]['kind'] == 'numeric' and name not in PROBABILITIES]
+        self._probabilities = [(features[name]['cuts'], self._slices[name].start) for name in PROBABILITIES]
+        # One attrgetter call fetches every field a request is counted on.
+        self._fields = attrgetter(*(name for name, _ in self._categorical), *(name for name, _, _ in self._numeric))
+        self._indexes = [index for _, index in self._categorical]
+        self._cuts = [(cuts, offset) for _, cuts, offset in self._numeric]
+        self._local = threading.local()
+        self._shards: list[dict[int, list[int]]] = []
+        self._lock = threading.Lock()
+
+    def _counts(self) -> list[int]:
+        """This thread's counts for the current window."""
+        window = int(time.time() // self.window_seconds)
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        counts = shard.get(window)
+        if counts is None:
+            for old in [w for w in shard if w <= window - self.windows]:
+                del shard[old]
+            counts = shard[window] = [0] * self._size
+        return counts
+
+    def observe(self, record, cost_prob: float, time_prob: float):
+        """Count one validated request (any object with the ProjectIn attributes)."""
+        counts = self._counts()
+        values = self._fields(record)
+        n_categorical = len(self._indexes)
+        for index, value in zip(self._indexes, values):
+            counts[index[value]] += 1
+        for (cuts, offset), value in zip(self._cuts, values[n_categorical:]):
+            counts[offset + bisect_right(cuts, value)] += 1
+        (cost_cuts, cost_offset), (time_cuts, time_offset) = self._probabilities
+        counts[cost_offset + bisect_right(cost_cuts, cost_prob)] += 1
+        counts[time_offset + bisect_right(time_cuts, time_prob)] += 1
+
+    def observe_columns(self, columns: Mapping, cost_probs, time_probs):
+        """Count a batch of validated rows given as columns (DataFrame or dict of arrays)."""
+        parts = []
+        for name, index in self._categorical:
+            values = columns[name]
+            if hasattr(values, 'cat'):
+                # Categories no selected row uses (e.g. rejected values) map to -1.
+                lookup = np.array([index.get(v, -1) for v in values.cat.categories], dtype=np.int64)
+                parts.append(lookup[values.cat.codes.to_numpy()])
+            else:
+                parts.append(np.fromiter((index[v] for v in values), np.int64, len(values)))
+        for name, cuts, offset in self._numeric:
+            parts.append(offset + np.searchsorted(cuts, np.asarray(columns[name], dtype=float), side='right'))
+        for (cuts, offset), probs in zip(self._probabilities, (cost_probs, time_probs)):
+            parts.append(offset + np.searchsorted(cuts, np.asarray(probs, dtype=float), side='right'))
+        added = np.bincount(np.concatenate(parts), minlength=self._size)
+        counts = self._counts()
+        for i in np.flatnonzero(added).tolist():
+            counts[i] += int(added[i])
+
+    def counts(self, windows: int | None = None) -> np.ndarray:
+        """Counts of the last ``windows`` windows (the current, partial one included), summed over threads."""
+        newest = int(time.time() // self.window_seconds)
+        oldest = newest - min(windows or self.windows, self.windows) + 1
+        with self._lock:
+            shards = list(self._shards)
+        total = np.zeros(self._size, dtype=np.int64)
+        for shard in shards:
+            for window, counts in list(shard.items()):
+                if oldest <= window <= newest:
+                    total += counts
+        return total
+
+    def report(self, windows: int | None = None, min_rows: int = 100) -> dict:
+        """PSI (and KS for ordered features) of recent traffic against the reference, per feature."""
+        windows = min(windows or self.windows, self.windows)
+        total = self.counts(windows)
+        features = {}
+        for name, spec in self.reference['features'].items():
+            observed = total[self._slices[name]]
+            expected = np.asarray(spec['counts'], dtype=np.int64)
+            rows = int(observed.sum())
+            entry = {'kind': spec['kind'], 'rows': rows}
+            if spec['kind'] == 'categorical':
+                entry['share'] = {
+                    value: {'reference': ref / expected.sum(), 'current': obs / rows if rows else None}
+                    for value, ref, obs in zip(spec['values'], expected.tolist(), observed.tolist())
+                }
+            else:
+                entry['reference_range'] = [spec['cuts'][0], spec['cuts'][-1]]
+                entry['out_of_range'] = (int(observed[0] + observed[-1]) / rows) if rows else None
+            if rows >= min_rows:
+                entry['psi'] = psi(expected, observed)
+                if spec['kind'] == 'numeric':
+                    entry['ks'] = ks(expected, observed)
+                entry['status'] = _status(entry['psi'])
+            else:
+                entry['psi'] = None
+                entry['status'] = 'insufficient data'
+            features[name] = entry
+        return {
+            'window_seconds': self.window_seconds,
+            'windows': windows,
+            'rows': int(total[self._slices[CATEGORICAL[0]]].sum()),
+            'reference_rows': self.reference['rows'],
+            'reference_created_at': self.reference['created_at'],
+            'drifted': [name for name, entry in features.items() if entry['status'] == 'drift'],
+            'features': features,
+        }
+
+
+def build_reference_from_artifacts(buffer_path: str = REPLAY_BUFFER_PATH) -> dict:
+    # Imported here: replay_buffer pulls in train_model.
+    from replay_buffer import ReplayBuffer
+
+    return build_reference(ReplayBuffer.load(buffer_path).frame, compile_pipelines(*load_models()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or show the drift reference profile.')
+    parser.add_argument('--path', default=DRIFT_REFERENCE_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='profile the replay buffer with the saved models')
+    build.add_argument('--buffer', default=REPLAY_BUFFER_PATH)
+    sub.add_parser('show', help='print the bins of every feature')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        reference = build_reference_from_artifacts(args.buffer)
+        save_reference(reference, args.path)
+        print(f"Saved a drift reference of {reference['rows']} projects to {args.path}")
+    else:
+        reference = load_reference(args.path)
+        if reference is None:
+            raise SystemExit(f'No drift reference at {args.path}')
+        for name, spec in reference['features'].items():
+            counts = np.asarray(spec['counts'])
+            bins = spec['values'] if spec['kind'] == 'categorical' else [f'{c:.4g}' for c in spec['cuts']]
+            print(f"{name}: {len(counts)} bins, {bins}")
+
+
+if __name__ == '__main__':
+    main()
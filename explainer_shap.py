@@ -1,23 +1,71 @@
-import shap
-import pandas as pd
-from model_utils import load_model
+"""Offline global feature importance over the whole project history.
 
-model = load_model('artifacts/model.pkl')
+Streams the dataset in chunks, computes SHAP values for both models with
+XGBoost's native TreeSHAP (``pred_contribs``), aggregates one-hot columns back
+to the original features, and writes mean |SHAP| / mean SHAP per feature.
+"""
 
-# load data
+import argparse
+import json
 
-df = pd.read_csv('synthetic_projects.csv')
-X = df.drop(['project_id','actual_cost','actual_days','cost_overrun_pct','time_overrun_pct','cost_overrun','time_overrun'], axis=1)
+import numpy as np
 
-# prepare a small sample
-X_sample = X.sample(200, random_state=42)
+from compiled_model import compile_pipelines
+from model_utils import FEATURES, load_models
+from project_store import default_history_path, iter_data_chunks
 
-# shap explain: use TreeExplainer on xgboost
-explainer = shap.Explainer(model.named_steps['clf'])
-# Need transformed features
-X_trans = model.named_steps['pre'].transform(X_sample)
-shap_values = explainer(X_trans)
+OUTPUT_PATH = 'artifacts/global_importance.json'
 
-# global importance
-shap.summary_plot(shap_values, X_trans, show=False)
-print('Generated SHAP summary (display locally)')
+
+def global_importance(data: str, chunk_size: int = 50_000, approximate: bool = False) -> dict:
+    predictors = dict(zip(('cost_overrun', 'time_overrun'), compile_pipelines(*load_models())))
+    n_columns = len(FEATURES) + 1
+    abs_sums = {target: np.zeros(n_columns) for target in predictors}
+    sums = {target: np.zeros(n_columns) for target in predictors}
+    rows = 0
+
+    for chunk in iter_data_chunks(data, chunk_size, FEATURES):
+        encoded = {}
+        for target, predictor in predictors.items():
+            encoder = predictor.encoder
+            if id(encoder) not in encoded:
+                encoded[id(encoder)] = encoder.encode_columns(chunk)
+            contribs = predictor.contributions(encoded[id(encoder)], approximate=approximate)
+            abs_sums[target] += np.abs(contribs).sum(axis=0, dtype=np.float64)
+            sums[target] += contribs.sum(axis=0, dtype=np.float64)
+        rows += len(chunk)
+
+    result = {'rows': rows, 'units': 'log_odds', 'method': 'saabas' if approximate else 'tree_shap'}
+    for target, predictor in predictors.items():
+        names = predictor.encoder.feature_names
+        features = {
+            name: {'mean_abs': abs_sums[target][i] / rows, 'mean': sums[target][i] / rows}
+            for i, name in enumerate(names)
+        }
+        result[target] = {
+            'base_value': sums[target][-1] / rows,
+            'features': dict(sorted(features.items(), key=lambda kv: kv[1]['mean_abs'], reverse=True)),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write global SHAP feature importance for both models.')
+    parser.add_argument('--data', default=default_history_path(),
+                        help='project history: Parquet/Arrow store or CSV (default: the store if built)')
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    parser.add_argument('--chunk-size', type=int, default=50_000)
+    parser.add_argument('--approximate', action='store_true', help='use Saabas contributions (faster)')
+    args = parser.parse_args()
+
+    result = global_importance(args.data, args.chunk_size, args.approximate)
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f'Wrote global importance for {result["rows"]} projects to {args.output}')
+    for target in ('cost_overrun', 'time_overrun'):
+        top = ', '.join(f'{name} ({v["mean_abs"]:.3f})' for name, v in list(result[target]['features'].items())[:3])
+        print(f'{target}: {top}')
+
+
+if __name__ == '__main__':
+    main()
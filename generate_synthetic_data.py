@@ -1,104 +1,181 @@
+import argparse
+import os
+from collections.abc import Iterator
+
 import numpy as np
 import pandas as pd
 
-np.random.seed(42)
-N = 2000
-
-project_types = ['substation', 'overhead_line', 'underground_cable']
-terrains = ['plains', 'hilly', 'forest', 'urban']
-regulatory_risks = ['Low', 'Medium', 'High']
-seasons = ['Summer', 'Winter', 'Monsoon']
-market_conditions = ['Stable', 'Volatile']
-vendors = [f'vendor_{i}' for i in range(1, 21)]
-
-rows = []
-for i in range(N):
-    pid = f'P{i+1:05d}'
-    ptype = np.random.choice(project_types, p=[0.4, 0.45, 0.15])
-    terrain = np.random.choice(terrains, p=[0.5, 0.2, 0.15, 0.15])
-    
-    # Base parameters
-    if ptype == 'substation':
-        base_days = 180
-        base_cost = 50e6
-    elif ptype == 'underground_cable':
-        base_days = 150
-        base_cost = 20e6
-    else:
-        base_days = 120
-        base_cost = 10e6
-        
-    planned_days = int(np.random.normal(base_days, 20))
-    planned_cost = base_cost
-    
-    # Risk Factors (Features known BEFORE project starts)
-    regulatory_risk = np.random.choice(regulatory_risks, p=[0.6, 0.3, 0.1])
-    season = np.random.choice(seasons, p=[0.4, 0.4, 0.2])
-    vendor = np.random.choice(vendors)
-    vendor_rating = np.round(np.random.uniform(2.5, 5.0), 1) # Historical rating
-    market_condition = np.random.choice(market_conditions, p=[0.7, 0.3])
-    
-    # Generate Actual Outcomes based on Risks (Hidden logic)
-    
-    # 1. Regulatory Delay
-    if regulatory_risk == 'High':
-        actual_delay = int(np.random.exponential(20)) # Avg 20 days delay
-    elif regulatory_risk == 'Medium':
-        actual_delay = int(np.random.exponential(10))
-    else:
-        actual_delay = int(np.random.exponential(2))
-        
-    # 2. Weather Impact (Monsoon is bad)
-    weather_factor = 1.0
-    if season == 'Monsoon':
-        if np.random.random() < 0.6: # 60% chance of rain delay
-            weather_factor = 1.15
-    elif season == 'Winter':
-        weather_factor = 1.02 # Slight delay due to fog/cold?
-        
+project_types = np.array(['substation', 'overhead_line', 'underground_cable'])
+terrains = np.array(['plains', 'hilly', 'forest', 'urban'])
+regulatory_risks = np.array(['Low', 'Medium', 'High'])
+seasons = np.array(['Summer', 'Winter', 'Monsoon'])
+market_conditions = np.array(['Stable', 'Volatile'])
+vendors = np.array([f'vendor_{i}' for i in range(1, 21)])
+
+# Base parameters per project type (same order as project_types)
+BASE_DAYS = np.array([180, 120, 150])
+BASE_COST = np.array([50e6, 10e6, 20e6])
+# Mean regulatory delay in days per risk level (same order as regulatory_risks)
+REGULATORY_DELAY_MEAN = np.array([2.0, 10.0, 20.0])
+
+# Rows are drawn in fixed-size blocks, each from its own RNG stream derived
+# from (seed, block index). Output chunks are cut from those blocks, so the
+# data for a given seed does not depend on the chunk size.
+BLOCK_ROWS = 65_536
+
+
+def outcome_mechanics(planned_days, planned_cost, regulatory_risk, season, vendor_rating, market_condition,
+                      delay_draw, rain_draw, vendor_noise, volatile_noise, stable_noise):
+    """Actual delay, days and cost for projects given their random draws.
+
+    Categorical inputs are positions in the vocabularies above. The draws are
+    standard exponential, uniform [0, 1) and standard normal; they broadcast
+    against the project arrays, so a (scenarios, projects) block of draws
+    gives a block of outcomes.
+    """
+    # 1. Regulatory Delay (High: avg 20 days, Medium: 10, Low: 2)
+    actual_delay = (delay_draw * REGULATORY_DELAY_MEAN[regulatory_risk]).astype(np.int64)
+
+    # 2. Weather Impact (Monsoon is bad: 60% chance of rain delay; winter fog/cold)
+    rain = rain_draw < 0.6
+    weather_factor = np.where((season == 2) & rain, 1.15, np.where(season == 1, 1.02, 1.0))
+
     # 3. Vendor Performance (Rating affects outcome)
     # Higher rating -> better performance (factor < 1 means faster/cheaper)
-    vendor_perf_factor = 1.0 + (3.5 - vendor_rating) * 0.05 # 5.0 -> 0.925 (good), 2.5 -> 1.05 (bad)
-    vendor_perf_factor += np.random.normal(0, 0.05) # Random variance
-    
-    # 4. Market Impact
-    cost_inflation = 1.0
-    if market_condition == 'Volatile':
-        cost_inflation = 1.0 + np.abs(np.random.normal(0.1, 0.05)) # 10% inflation avg
-    else:
-        cost_inflation = 1.0 + np.abs(np.random.normal(0.02, 0.01)) # 2% normal inflation
-        
+    vendor_perf_factor = 1.0 + (3.5 - vendor_rating) * 0.05  # 5.0 -> 0.925 (good), 2.5 -> 1.05 (bad)
+    vendor_perf_factor = vendor_perf_factor + 0.05 * vendor_noise  # Random variance
+
+    # 4. Market Impact (Volatile: 10% inflation avg, Stable: 2% normal inflation)
+    volatile = market_condition == 1
+    cost_inflation = 1.0 + np.abs(np.where(
+        volatile,
+        0.1 + 0.05 * volatile_noise,
+        0.02 + 0.01 * stable_noise,
+    ))
+
     # Calculate Actuals
     # Time: Planned * Weather * Vendor + Delay
-    actual_days = int(planned_days * weather_factor * vendor_perf_factor + actual_delay)
-    
+    actual_days = (planned_days * weather_factor * vendor_perf_factor + actual_delay).astype(np.int64)
+
     # Cost: Planned * Inflation * Vendor + (Delay cost ~ 0.5% per day)
     delay_cost_penalty = actual_delay * (0.005 * planned_cost)
     actual_cost = (planned_cost * cost_inflation * vendor_perf_factor) + delay_cost_penalty
-    
-    rows.append({
-        'project_id': pid,
-        'project_type': ptype,
+    return actual_delay, actual_days, actual_cost
+
+
+def generate_block(rng: np.random.Generator, start: int, n: int) -> pd.DataFrame:
+    ptype = rng.choice(len(project_types), size=n, p=[0.4, 0.45, 0.15])
+    terrain = rng.choice(terrains, size=n, p=[0.5, 0.2, 0.15, 0.15])
+
+    planned_days = rng.normal(BASE_DAYS[ptype], 20).astype(np.int64)
+    planned_cost = BASE_COST[ptype]
+
+    # Risk Factors (Features known BEFORE project starts)
+    regulatory_risk = rng.choice(len(regulatory_risks), size=n, p=[0.6, 0.3, 0.1])
+    season = rng.choice(len(seasons), size=n, p=[0.4, 0.4, 0.2])
+    vendor = rng.integers(0, len(vendors), size=n)
+    vendor_rating = np.round(rng.uniform(2.5, 5.0, size=n), 1)  # Historical rating
+    market_condition = rng.choice(len(market_conditions), size=n, p=[0.7, 0.3])
+
+    # Generate Actual Outcomes based on Risks (Hidden logic)
+    actual_delay, actual_days, actual_cost = outcome_mechanics(
+        planned_days, planned_cost, regulatory_risk, season, vendor_rating, market_condition,
+        delay_draw=rng.standard_exponential(n),
+        rain_draw=rng.random(n),
+        vendor_noise=rng.standard_normal(n),
+        volatile_noise=rng.standard_normal(n),
+        stable_noise=rng.standard_normal(n),
+    )
+
+    ids = np.arange(start + 1, start + n + 1).astype(str)
+    df = pd.DataFrame({
+        'project_id': np.char.add('P', np.char.zfill(ids, 5)),
+        'project_type': project_types[ptype],
         'terrain': terrain,
         'planned_days': planned_days,
         'planned_cost': planned_cost,
-        'regulatory_risk': regulatory_risk,
-        'season': season,
-        'vendor': vendor,
+        'regulatory_risk': regulatory_risks[regulatory_risk],
+        'season': seasons[season],
+        'vendor': vendors[vendor],
         'vendor_rating': vendor_rating,
-        'market_condition': market_condition,
+        'market_condition': market_conditions[market_condition],
         'actual_days': actual_days,
-        'actual_cost': actual_cost
+        'actual_cost': actual_cost,
     })
 
-df = pd.DataFrame(rows)
+    # Create Targets
+    df['cost_overrun_pct'] = (df['actual_cost'] - df['planned_cost']) / df['planned_cost']
+    df['time_overrun_pct'] = (df['actual_days'] - df['planned_days']) / df['planned_days']
+
+    df['cost_overrun'] = (df['cost_overrun_pct'] > 0.10).astype(int)
+    df['time_overrun'] = (df['time_overrun_pct'] > 0.10).astype(int)
+    return df
+
+
+def generate(n: int, seed: int = 42, chunk_size: int = 100_000) -> Iterator[pd.DataFrame]:
+    """Yield ``n`` synthetic projects as DataFrames of ``chunk_size`` rows (the last may be shorter)."""
+    if n < 1 or chunk_size < 1:
+        raise ValueError('n and chunk_size must be >= 1')
+    buffer: pd.DataFrame | None = None
+    offset = 0
+    for block, start in enumerate(range(0, n, BLOCK_ROWS)):
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(block,)))
+        rows = generate_block(rng, start, min(BLOCK_ROWS, n - start))
+        if buffer is None or offset >= len(buffer):
+            buffer = rows
+        else:
+            buffer = pd.concat([buffer.iloc[offset:], rows], ignore_index=True)
+        offset = 0
+        while len(buffer) - offset >= chunk_size:
+            yield buffer.iloc[offset:offset + chunk_size].reset_index(drop=True)
+            offset += chunk_size
+    if buffer is not None and offset < len(buffer):
+        yield buffer.iloc[offset:].reset_index(drop=True)
+
+
+def write_chunks(chunks: Iterator[pd.DataFrame], output: str, fmt: str = 'auto') -> int:
+    if fmt == 'auto':
+        fmt = (
+            'parquet' if output.endswith(('.parquet', '.pq'))
+            else 'arrow' if output.endswith('.arrow')
+            else 'csv'
+        )
+    if fmt in ('parquet', 'arrow'):
+        from project_store import HistoryWriter
+
+        writer = HistoryWriter(output, fmt)
+        committed = False
+        try:
+            for chunk in chunks:
+                writer.write(chunk)
+            committed = True
+        finally:
+            writer.close(commit=committed)
+        return writer.rows
+    if fmt != 'csv':
+        raise ValueError(f'Unsupported format: {fmt}')
+
+    tmp = f'{output}.tmp'
+    total = 0
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(tmp, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        total += len(chunk)
+    os.replace(tmp, output)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic POWERGRID project history.')
+    parser.add_argument('-n', '--rows', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('-o', '--output', default='synthetic_projects.csv')
+    parser.add_argument('--format', choices=['auto', 'csv', 'parquet', 'arrow'], default='auto')
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    args = parser.parse_args()
 
-# Create Targets
-df['cost_overrun_pct'] = (df['actual_cost'] - df['planned_cost']) / df['planned_cost']
-df['time_overrun_pct'] = (df['actual_days'] - df['planned_days']) / df['planned_days']
+    total = write_chunks(generate(args.rows, args.seed, args.chunk_size), args.output, args.format)
+    print(f'Wrote {args.output} ({total} rows)')
 
-df['cost_overrun'] = (df['cost_overrun_pct'] > 0.10).astype(int)
-df['time_overrun'] = (df['time_overrun_pct'] > 0.10).astype(int)
 
-df.to_csv('synthetic_projects.csv', index=False)
-print('Wrote synthetic_projects.csv', df.shape)
+if __name__ == '__main__':
+    main()
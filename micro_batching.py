@@ -0,0 +1,148 @@
+"""Asyncio micro-batcher that coalesces concurrent single-item requests.
+
+Callers ``await batcher.submit(item)``. The first queued item opens a
+collection window of ``window_ms``; everything that arrives before the window
+closes (or until ``max_batch_size`` items are collected) is passed to
+``predict_batch`` as one list, and each caller's future is resolved with its
+own element of the returned list. Batches run one at a time on a dedicated
+thread so the model never competes with itself for cores; while a batch is
+running the next one keeps filling, so batch size grows with load.
+"""
+
+import asyncio
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        predict_batch: Callable[[list], list],
+        window_ms: float = 2.0,
+        max_batch_size: int = 64,
+    ):
+        if window_ms < 0:
+            raise ValueError('window_ms must be >= 0')
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be >= 1')
+        self.predict_batch = predict_batch
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        # Entries taken off the queue and not yet resolved: collecting or running.
+        self._inflight: list = []
+
+        self.batches = 0
+        self.items = 0
+        self.last_batch_size = 0
+        self.max_seen_batch_size = 0
+        self.queue_wait_seconds = 0.0
+        # Power-of-two buckets: 1, 2, 4, ... max_batch_size.
+        self.batch_size_counts: dict[int, int] = {}
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='microbatch')
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # Fail everything still waiting, including a batch that was cancelled
+        # while collecting or running; its result, if any, is discarded.
+        pending = self._inflight
+        self._inflight = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future, _ in pending:
+            if not future.done():
+                future.set_exception(RuntimeError('Micro-batcher stopped'))
+        # Wait for a running batch off the event loop, so the failed callers can resume meanwhile.
+        await asyncio.to_thread(self._executor.shutdown, wait=True)
+        self._executor = None
+
+    async def submit(self, item):
+        if self._task is None:
+            raise RuntimeError('Micro-batcher is not running')
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = self._inflight
+        batch.append(await self._queue.get())
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._inflight = []
+            batch = await self._collect()
+            self._inflight = batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            self._record(batch, started)
+            items = [item for item, _, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.predict_batch, items)
+            except Exception as exc:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def _record(self, batch: list, started: float):
+        size = len(batch)
+        self.batches += 1
+        self.items += size
+        self.last_batch_size = size
+        self.max_seen_batch_size = max(self.max_seen_batch_size, size)
+        self.queue_wait_seconds += sum(started - enqueued for _, _, enqueued in batch)
+        bucket = 1 << (size - 1).bit_length()
+        self.batch_size_counts[bucket] = self.batch_size_counts.get(bucket, 0) + 1
+
+    def stats(self) -> dict:
+        return {
+            'window_ms': self.window * 1000.0,
+            'max_batch_size': self.max_batch_size,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': self.items / self.batches if self.batches else 0.0,
+            'last_batch_size': self.last_batch_size,
+            'max_seen_batch_size': self.max_seen_batch_size,
+            'mean_queue_wait_ms': 1000.0 * self.queue_wait_seconds / self.items if self.items else 0.0,
+            'batch_size_histogram': {
+                f'le_{bucket}': count for bucket, count in sorted(self.batch_size_counts.items())
+            },
+        }
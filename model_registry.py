@@ -0,0 +1,238 @@
+"""Versioned in-memory model registry with background hot reload.
+
+A version is one loaded, compiled and canary-validated pair of predictors,
+together with the vendor statistics index built alongside them, identified
+by the fingerprint of the artifact files it came from. Requests
+read ``registry.current`` once and use that object for their whole lifetime,
+so swapping in a new version is a single attribute assignment: in-flight
+requests finish on the version they started with. New artifacts are picked up
+by a watcher thread (or an explicit ``refresh()``), loaded, compiled and
+validated off the request path, and only then activated. The previous
+versions stay in memory, so ``rollback()`` is another assignment.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+
+from compiled_model import CompiledPredictor, compile_pipelines
+from vendor_stats import VendorStats
+
+logger = logging.getLogger(__name__)
+# _swap's default: activate whatever version is current.
+_ANY = object()
+
+
+class CanaryError(RuntimeError):
+    """A candidate version failed validation and was not activated."""
+
+
+class ModelVersion:
+    def __init__(self, version: str, models: tuple, predictors: tuple[CompiledPredictor, CompiledPredictor],
+                 load_seconds: float, vendor_stats: VendorStats | None = None):
+        self.version = version
+        self.models = models
+        self.predictors = predictors
+        self.load_seconds = load_seconds
+        self.vendor_stats = vendor_stats if vendor_stats is not None else VendorStats()
+        self.loaded_at = time.time()
+        self.canary: dict = {}
+
+    def describe(self) -> dict:
+        return {
+            'version': self.version,
+            'loaded_at': self.loaded_at,
+            'load_seconds': self.load_seconds,
+            'vendor_stats_projects': self.vendor_stats.rows,
+            'canary': self.canary,
+        }
+
+
+class ModelRegistry:
+    def __init__(
+        self,
+        load: Callable[[], tuple],
+        fingerprint: Callable[[], str],
+        validate: Callable[[ModelVersion, ModelVersion | None], dict] | None = None,
+        history: int = 3,
+        check_seconds: float = 1.0,
+        on_swap: Callable[[ModelVersion], None] | None = None,
+        load_vendor_stats: Callable[[], VendorStats] | None = None,
+    ):
+        self.load = load
+        self.load_vendor_stats = load_vendor_stats
+        self.fingerprint = fingerprint
+        self.validate = validate
+        self.check_seconds = check_seconds
+        self.on_swap = on_swap
+
+        self._current: ModelVersion | None = None
+        self._history: deque[ModelVersion] = deque(maxlen=history)
+        # Fingerprints not to load again unless forced: failed loads, rejected
+        # canaries and versions that were rolled back.
+        self._skipped: dict[str, str] = {}
+        # Lock order: _load_lock, then _swap_lock, then _skip_lock. Rollback
+        # takes only the last two, so it never waits for a background load.
+        self._load_lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        self._skip_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: threading.Thread | None = None
+
+        self.loads = 0
+        self.failures = 0
+        self.swaps = 0
+        self.rollbacks = 0
+        self.last_error: str | None = None
+
+    @property
+    def current(self) -> ModelVersion | None:
+        return self._current
+
+    def ensure_current(self) -> ModelVersion:
+        """The active version, loading it synchronously if nothing is loaded yet."""
+        current = self._current
+        if current is not None:
+            return current
+        self.refresh(force=True)
+        return self._current
+
+    def refresh(self, force: bool = False) -> ModelVersion | None:
+        """Load, validate and activate the artifacts on disk if they are new.
+
+        Returns the activated version, or None when there was nothing to do.
+        Raises when loading or validation fails; the fingerprint is then
+        skipped by later non-forced refreshes until the files change again.
+        """
+        with self._load_lock:
+            fingerprint = self.fingerprint()
+            current = self._current
+            if current is not None and fingerprint == current.version:
+                return None
+            with self._skip_lock:
+                if not force and fingerprint in self._skipped:
+                    return None
+            # The files may have gone back to a version that is still in memory.
+            candidate = next((v for v in self._history if v.version == fingerprint), None)
+            if candidate is None:
+                try:
+                    candidate = self._load(fingerprint)
+                    if self.validate is not None:
+                        candidate.canary = self.validate(candidate, current)
+                except Exception as exc:
+                    self.failures += 1
+                    self.last_error = f'{fingerprint}: {type(exc).__name__}: {exc}'
+                    with self._skip_lock:
+                        self._skipped[fingerprint] = self.last_error
+                    raise
+            if not self._swap(candidate, expected=current):
+                # A rollback ran while this version was loading; it wins over the files.
+                with self._skip_lock:
+                    self._skipped.setdefault(fingerprint, 'rolled back while loading')
+                return None
+            return candidate
+
+    def _load(self, fingerprint: str) -> ModelVersion:
+        started = time.perf_counter()
+        models = self.load()
+        vendor_stats = self.load_vendor_stats() if self.load_vendor_stats is not None else None
+        if self.fingerprint() != fingerprint:
+            raise RuntimeError('artifacts changed while loading')
+        predictors = compile_pipelines(*models)
+        self.loads += 1
+        return ModelVersion(fingerprint, models, predictors, time.perf_counter() - started, vendor_stats)
+
+    def _swap(self, version: ModelVersion, expected=_ANY) -> bool:
+        """Activate ``version``; with ``expected``, only if that is still the current version."""
+        with self._swap_lock:
+            if expected is not _ANY and self._current is not expected:
+                return False
+            changed = self._activate(version)
+        if changed:
+            self._swapped(version)
+        return True
+
+    def _activate(self, version: ModelVersion) -> bool:
+        # Caller holds _swap_lock.
+        previous = self._current
+        with self._skip_lock:
+            self._skipped.pop(version.version, None)
+        if previous is version:
+            return False
+        if version in self._history:
+            self._history.remove(version)
+        if previous is not None:
+            self._history.appendleft(previous)
+        self._current = version
+        self.swaps += 1
+        return True
+
+    def _swapped(self, version: ModelVersion):
+        logger.info('Serving model version %s', version.version)
+        if self.on_swap is not None:
+            self.on_swap(version)
+
+    def rollback(self, version: str | None = None) -> ModelVersion:
+        """Re-activate the previous (or the named) in-memory version, without waiting for a load in progress."""
+        with self._swap_lock:
+            candidates = [v for v in self._history if version is None or v.version == version]
+            if not candidates:
+                raise LookupError(f'no in-memory model version {version or "to roll back to"}')
+            rolled_back = self._current
+            self._activate(candidates[0])
+            if rolled_back is not None:
+                # Keep the watcher from re-loading the files we just rolled away from.
+                with self._skip_lock:
+                    self._skipped[rolled_back.version] = 'rolled back'
+            self.rollbacks += 1
+        self._swapped(candidates[0])
+        return candidates[0]
+
+    def start(self):
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name='model-registry-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        if self._watcher is None:
+            return
+        self._stop.set()
+        self._watcher.join()
+        self._watcher = None
+
+    def _watch(self):
+        while not self._stop.wait(self.check_seconds):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception('Model reload failed; still serving %s',
+                                 self._current.version if self._current else None)
+
+    def loaded(self) -> list[ModelVersion]:
+        """The active version, if any, followed by the rollback history."""
+        current = self._current
+        return ([current] if current is not None else []) + list(self._history)
+
+    def versions(self) -> list[dict]:
+        current = self._current
+        return [{**v.describe(), 'active': v is current} for v in self.loaded()]
+
+    def stats(self) -> dict:
+        current = self._current
+        with self._skip_lock:
+            skipped = dict(self._skipped)
+        return {
+            'current_version': current.version if current is not None else None,
+            'in_memory_versions': len(self._history) + (current is not None),
+            'loads': self.loads,
+            'failures': self.failures,
+            'swaps': self.swaps,
+            'rollbacks': self.rollbacks,
+            'last_error': self.last_error,
+            'skipped': skipped,
+        }
+
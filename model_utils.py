@@ -1,4 +1,11 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
 import joblib
+import numpy as np
+import pandas as pd
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder
@@ -13,32 +20,218 @@ CATEGORICAL = [
     'market_condition',
 ]
 NUMERICAL = ['planned_days', 'planned_cost', 'vendor_rating']
+# Hyperparameters used unless tune_model.py has written a tuned config.
+DEFAULT_PARAMS = {
+    'max_depth': 5,
+    'learning_rate': 0.05,
+    'subsample': 0.9,
+    'colsample_bytree': 0.9,
+}
+TUNED_PARAMS_PATH = 'artifacts/best_params.json'
+MODEL_COST_PATH = 'artifacts/model_cost.pkl'
+MODEL_TIME_PATH = 'artifacts/model_time.pkl'
+# Both pipelines pickled together so they share one fitted preprocessor.
+MODEL_BUNDLE_PATH = 'artifacts/model_bundle.pkl'
+# Historical outcome statistics per vendor (see vendor_stats.py).
+VENDOR_STATS_PATH = 'artifacts/vendor_stats.npz'
+# Reservoir sample of the history replayed by incremental updates (see update_model.py).
+REPLAY_BUFFER_PATH = 'artifacts/replay_buffer.parquet'
+# Training-time feature and prediction distributions for drift monitoring (see drift_monitor.py).
+DRIFT_REFERENCE_PATH = 'artifacts/drift_reference.json'
+# Model input columns, in the order ProjectIn declares them.
+FEATURES = [
+    'project_type',
+    'terrain',
+    'planned_days',
+    'planned_cost',
+    'regulatory_risk',
+    'season',
+    'vendor',
+    'vendor_rating',
+    'market_condition',
+]
+# The full category vocabulary accepted by the API (see ProjectIn).
+CATEGORY_VALUES = {
+    'project_type': ['substation', 'overhead_line', 'underground_cable'],
+    'terrain': ['plains', 'hilly', 'forest', 'urban'],
+    'vendor': [f'vendor_{i}' for i in range(1, 21)],
+    'regulatory_risk': ['Low', 'Medium', 'High'],
+    'season': ['Summer', 'Winter', 'Monsoon'],
+    'market_condition': ['Stable', 'Volatile'],
+}
+
+# Inclusive (min, max) bounds from ProjectIn; planned_cost must be > 0.
+NUMERIC_BOUNDS = {
+    'planned_days': (10, 2000),
+    'planned_cost': (0.0, float('inf')),
+    'vendor_rating': (1.0, 5.0),
+}
 
 
-def build_pipeline(random_state: int = 42) -> Pipeline:
-    ohe = OneHotEncoder(handle_unknown='ignore', sparse_output=False)
-    preproc = ColumnTransformer([
+def validate_frame(df) -> np.ndarray:
+    """Vectorized ProjectIn validation of a column table (DataFrame or dict of arrays).
+
+    Returns an object array with one entry per row: '' when the row is valid,
+    otherwise a '; '-separated list of the failed constraints.
+    """
+    missing = [col for col in FEATURES if col not in df]
+    if missing:
+        raise ValueError(f'Missing required columns: {missing}')
+    n = len(df[FEATURES[0]])
+    errors = np.full(n, '', dtype=object)
+
+    def fail(mask, message):
+        mask = np.asarray(mask, dtype=bool)
+        errors[mask] = errors[mask] + f'{message}; '
+
+    for col, allowed in CATEGORY_VALUES.items():
+        values = df[col]
+        if not isinstance(values, pd.Series) or not isinstance(values.dtype, pd.CategoricalDtype):
+            values = pd.Series(np.asarray(values, dtype=object))
+        # isin on a categorical column only compares its categories.
+        fail(~values.isin(allowed).to_numpy(), f'invalid {col}')
+    for col, (low, high) in NUMERIC_BOUNDS.items():
+        values = df[col]
+        if isinstance(values, pd.Series) and pd.api.types.is_numeric_dtype(values.dtype):
+            values = values.to_numpy(dtype=float, na_value=np.nan)
+        else:
+            values = pd.to_numeric(pd.Series(np.asarray(values, dtype=object)), errors='coerce').to_numpy(dtype=float)
+        if col == 'planned_cost':
+            bad = ~(values > low)
+        else:
+            bad = ~((values >= low) & (values <= high))
+        if col == 'planned_days':
+            bad |= ~np.isfinite(values) | (values != np.round(values))
+        fail(bad, f'invalid {col}')
+    return pd.Series(errors).str[:-2].to_numpy(dtype=object)
+
+
+def build_preprocessor(fixed_categories: bool = False) -> ColumnTransformer:
+    categories = (
+        [sorted(CATEGORY_VALUES[col]) for col in CATEGORICAL] if fixed_categories else 'auto'
+    )
+    ohe = OneHotEncoder(categories=categories, handle_unknown='ignore', sparse_output=False)
+    return ColumnTransformer([
         ('cat', ohe, CATEGORICAL),
     ], remainder='passthrough')
 
-    clf = XGBClassifier(
-        n_estimators=200,
-        max_depth=5,
-        learning_rate=0.05,
-        subsample=0.9,
-        colsample_bytree=0.9,
+
+def fit_fixed_preprocessor() -> ColumnTransformer:
+    """Preprocessor fitted on the fixed CATEGORY_VALUES vocabulary, without reading any data.
+
+    Its output layout is identical to one fitted on a dataset that contains
+    every category, so chunks can be encoded independently.
+    """
+    width = max(len(values) for values in CATEGORY_VALUES.values())
+    vocab = pd.DataFrame({
+        col: [
+            CATEGORY_VALUES[col][i % len(CATEGORY_VALUES[col])] if col in CATEGORY_VALUES else 0.0
+            for i in range(width)
+        ]
+        for col in FEATURES
+    })
+    return build_preprocessor(fixed_categories=True).fit(vocab)
+
+
+def build_classifier(
+    random_state: int = 42,
+    n_estimators: int = 200,
+    n_jobs: int | None = None,
+    early_stopping_rounds: int | None = None,
+    params: dict | None = None,
+) -> XGBClassifier:
+    return XGBClassifier(
+        **{**DEFAULT_PARAMS, **(params or {})},
+        n_estimators=n_estimators,
+        tree_method='hist',
         eval_metric='logloss',
+        early_stopping_rounds=early_stopping_rounds,
+        n_jobs=n_jobs,
         random_state=random_state,
     )
+
+
+def build_pipeline(random_state: int = 42, params: dict | None = None, n_estimators: int = 200) -> Pipeline:
     return Pipeline([
-        ('pre', preproc),
-        ('clf', clf),
+        ('pre', build_preprocessor()),
+        ('clf', build_classifier(random_state=random_state, n_estimators=n_estimators, params=params)),
     ])
 
 
+def load_tuned_params(fname: str = TUNED_PARAMS_PATH) -> dict:
+    """The best config written by tune_model.py ({'params': ..., 'n_estimators': ...}), or {}."""
+    if not os.path.exists(fname):
+        return {}
+    with open(fname) as f:
+        return json.load(f)
+
+
+def save_bundle(model_cost: Pipeline, model_time: Pipeline, fname: str):
+    # Pickled together, pipelines that share a fitted 'pre' step keep sharing
+    # one preprocessor object when loaded back.
+    save_artifact({'model_cost': model_cost, 'model_time': model_time}, fname)
+
+
+def load_bundle(fname: str, mmap_mode: str | None = None) -> tuple[Pipeline, Pipeline]:
+    bundle = joblib.load(fname, mmap_mode=mmap_mode)
+    return bundle['model_cost'], bundle['model_time']
+
+
+def load_models(
+    bundle_path: str = MODEL_BUNDLE_PATH,
+    cost_path: str = MODEL_COST_PATH,
+    time_path: str = MODEL_TIME_PATH,
+) -> tuple[Pipeline, Pipeline]:
+    if os.path.exists(bundle_path):
+        return load_bundle(bundle_path)
+    return load_artifact(cost_path), load_artifact(time_path)
+
+
 def save_artifact(obj, fname: str):
-    joblib.dump(obj, fname)
+    # Write then rename: a running server never sees a half-written file, and
+    # arrays it has memory-mapped from the old file stay valid.
+    tmp = f'{fname}.tmp'
+    joblib.dump(obj, tmp)
+    replace_file(tmp, fname)
+
+
+_release = threading.local()
+
+
+def replace_file(tmp: str, path: str):
+    """``os.replace(tmp, path)``, deferred to the end of an enclosing ``artifact_release``."""
+    pending = getattr(_release, 'pending', None)
+    if pending is None:
+        os.replace(tmp, path)
+    else:
+        pending[path] = tmp
+
+
+@contextmanager
+def artifact_release():
+    """Publish every artifact saved inside the block together, when the block ends.
+
+    Files are written to their temporary names as usual and only renamed into
+    place, back to back, after the last one is complete, so the server's
+    fingerprint watcher cannot load new models next to old vendor statistics
+    (``ModelRegistry`` rejects a load that straddles the renames). If the block
+    raises, nothing is published.
+    """
+    pending = _release.pending = {}
+    try:
+        yield
+    except BaseException:
+        for tmp in pending.values():
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        raise
+    finally:
+        _release.pending = None
+    for path, tmp in pending.items():
+        os.replace(tmp, path)
 
 
-def load_artifact(fname: str):
-    return joblib.load(fname)
+def load_artifact(fname: str, mmap_mode: str | None = None):
+    # With mmap_mode='r', numpy arrays stored uncompressed in the pickle are
+    # memory-mapped instead of copied; everything else loads as usual.
+    return joblib.load(fname, mmap_mode=mmap_mode)
@@ -0,0 +1,451 @@
+"""Monte Carlo simulation of aggregate overrun exposure for a project portfolio.
+
+    python portfolio_simulation.py PORTFOLIO [--scenarios N] [--workers N] [--seed N] [-o OUT.json]
+
+Each scenario draws one outcome for every project with the outcome mechanics
+of ``generate_synthetic_data`` (regulatory delay, weather, vendor performance,
+market inflation) and sums the cost and schedule overruns across the
+portfolio. Vendor performance noise is shared by projects of the same vendor
+and market inflation noise by all projects, with configurable correlation;
+each project's marginal distribution is unchanged by either.
+
+The fitted models set the level: with calibration on (the default), each
+project's simulated overrun percentages are shifted so that the probability
+of a >10% overrun matches the model's predicted probability, while the
+mechanics supply the shape of the distribution and the correlation.
+
+Scenarios are drawn in (scenarios x projects) blocks of fully vectorized
+NumPy and aggregated on the fly into fixed-bin histograms and per-project
+sums, so memory depends on the portfolio size and not on the scenario count.
+Work is split into fixed-size tasks, each with its own RNG stream derived
+from (seed, task index), and run on a process pool; results for a seed do
+not depend on the number of workers.
+"""
+
+import argparse
+import json
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from generate_synthetic_data import (
+    market_conditions,
+    outcome_mechanics,
+    regulatory_risks,
+    seasons,
+    vendors,
+)
+from model_utils import FEATURES, validate_frame
+
+OVERRUN_THRESHOLD = 0.10
+PERCENTILES = (5, 50, 90, 95, 99)
+# Scenarios per pool task; fixed so the RNG streams do not depend on the worker count.
+TASK_SCENARIOS = 8192
+# Upper bound on the elements of one (scenarios x projects) draw array.
+BLOCK_DRAWS = 1 << 18
+# Draws per project used to calibrate the mechanics against the model.
+CALIBRATION_DRAWS = 2000
+# Scenarios simulated up front to place the histogram bins and the tail threshold.
+PILOT_SCENARIOS = 2000
+HISTOGRAM_BINS = 8192
+TAIL_PERCENTILE = 95
+
+# SeedSequence spawn keys; scenario tasks use (SCENARIO_STREAM, task index).
+SCENARIO_STREAM, CALIBRATION_STREAM, PILOT_STREAM = 0, 1, 2
+
+
+class StreamingHistogram:
+    """Fixed-bin histogram with exact count, sum, min and max; mergeable across workers."""
+
+    def __init__(self, lo: float, hi: float, bins: int = HISTOGRAM_BINS):
+        self.lo = float(lo)
+        self.hi = float(hi)
+        self.counts = np.zeros(bins + 2, dtype=np.int64)  # [underflow, bins..., overflow]
+        self.n = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def bins(self) -> int:
+        return len(self.counts) - 2
+
+    def add(self, values: np.ndarray):
+        if not len(values):
+            return
+        scaled = (values - self.lo) * (self.bins / (self.hi - self.lo))
+        index = np.clip(np.floor(scaled), -1, self.bins).astype(np.int64) + 1
+        self.counts += np.bincount(index, minlength=len(self.counts))
+        self.n += len(values)
+        self.total += float(values.sum())
+        self.total_sq += float(np.dot(values, values))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: 'StreamingHistogram'):
+        self.counts += other.counts
+        self.n += other.n
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Value below which a fraction q of the samples fall, interpolated within a bin."""
+        rank = q * self.n
+        cumulative = np.cumsum(self.counts)
+        i = int(np.searchsorted(cumulative, rank, side='left'))
+        if i == 0:
+            return self.min
+        if i == len(self.counts) - 1:
+            return self.max
+        below = cumulative[i - 1]
+        width = (self.hi - self.lo) / self.bins
+        value = self.lo + (i - 1 + (rank - below) / self.counts[i]) * width
+        return float(min(max(value, self.min), self.max))
+
+    def summary(self, percentiles=PERCENTILES) -> dict:
+        mean = self.total / self.n
+        return {
+            'mean': mean,
+            'std': float(np.sqrt(max(self.total_sq / self.n - mean * mean, 0.0))),
+            'min': self.min,
+            'max': self.max,
+            **{f'p{p}': self.quantile(p / 100) for p in percentiles},
+            'out_of_range_fraction': float(self.counts[0] + self.counts[-1]) / self.n,
+        }
+
+
+class Portfolio:
+    """Project arrays in the index form ``outcome_mechanics`` expects, plus calibration shifts."""
+
+    def __init__(self, frame: pd.DataFrame):
+        errors = validate_frame(frame)
+        if (errors != '').any():
+            bad = int(np.flatnonzero(errors != '')[0])
+            raise ValueError(f'Invalid project at row {bad}: {errors[bad]}')
+        frame = frame.reset_index(drop=True)
+        self.n = len(frame)
+        if 'project_id' in frame:
+            self.project_ids = frame['project_id'].astype(str).to_numpy()
+        else:
+            self.project_ids = np.arange(self.n).astype(str)
+        self.features = frame[FEATURES]
+        self.planned_days = frame['planned_days'].to_numpy(dtype=np.float64)
+        self.planned_cost = frame['planned_cost'].to_numpy(dtype=np.float64)
+        self.vendor_rating = frame['vendor_rating'].to_numpy(dtype=np.float64)
+        self.regulatory_risk = _codes(frame['regulatory_risk'], regulatory_risks)
+        self.season = _codes(frame['season'], seasons)
+        self.market_condition = _codes(frame['market_condition'], market_conditions)
+        self.vendor = _codes(frame['vendor'], vendors)
+        self.cost_probability = np.full(self.n, np.nan)
+        self.time_probability = np.full(self.n, np.nan)
+        self.cost_shift = np.zeros(self.n)
+        self.time_shift = np.zeros(self.n)
+
+    def calibrate(self, cost_probability: np.ndarray, time_probability: np.ndarray, seed: int,
+                  draws: int = CALIBRATION_DRAWS):
+        """Shift each project's overrun percentages so P(overrun > 10%) equals the model's probability."""
+        self.cost_probability = np.asarray(cost_probability, dtype=np.float64)
+        self.time_probability = np.asarray(time_probability, dtype=np.float64)
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(CALIBRATION_STREAM,)))
+        step = max(1, BLOCK_DRAWS // draws)
+        for start in range(0, self.n, step):
+            cols = slice(start, min(start + step, self.n))
+            # Correlation does not change the marginals, so independent draws suffice.
+            cost_pct, time_pct = self._overrun_pct(rng, draws, cols, 0.0, 0.0)
+            for pct, prob, shift in ((cost_pct, self.cost_probability, self.cost_shift),
+                                     (time_pct, self.time_probability, self.time_shift)):
+                pct.sort(axis=0)
+                rank = np.clip(np.round((1.0 - prob[cols]) * (draws - 1)), 0, draws - 1).astype(np.int64)
+                shift[cols] = pct[rank, np.arange(pct.shape[1])] - OVERRUN_THRESHOLD
+
+    def _overrun_pct(self, rng: np.random.Generator, scenarios: int, cols: slice,
+                     market_correlation: float, vendor_correlation: float) -> tuple[np.ndarray, np.ndarray]:
+        """Uncalibrated cost and time overrun fractions for a (scenarios, projects) block."""
+        shape = (scenarios, len(self.planned_days[cols]))
+        vendor_noise = rng.standard_normal(shape)
+        if vendor_correlation:
+            shared = rng.standard_normal((scenarios, len(vendors)))
+            vendor_noise *= np.sqrt(1.0 - vendor_correlation)
+            vendor_noise += np.sqrt(vendor_correlation) * shared[:, self.vendor[cols]]
+        market_noise = rng.standard_normal(shape)
+        if market_correlation:
+            shared = rng.standard_normal((scenarios, 1))
+            market_noise *= np.sqrt(1.0 - market_correlation)
+            market_noise += np.sqrt(market_correlation) * shared
+        planned_days, planned_cost = self.planned_days[cols], self.planned_cost[cols]
+        _, actual_days, actual_cost = outcome_mechanics(
+            planned_days, planned_cost, self.regulatory_risk[cols], self.season[cols],
+            self.vendor_rating[cols], self.market_condition[cols],
+            delay_draw=rng.standard_exponential(shape),
+            rain_draw=rng.random(shape),
+            vendor_noise=vendor_noise,
+            # Only one of the two is used per project, so both get the market noise.
+            volatile_noise=market_noise,
+            stable_noise=market_noise,
+        )
+        return (actual_cost - planned_cost) / planned_cost, (actual_days - planned_days) / planned_days
+
+
+class _Accumulator:
+    """Streaming aggregates of one or more scenario tasks."""
+
+    def __init__(self, plan: '_Plan'):
+        n = plan.portfolio.n
+        self.cost = StreamingHistogram(*plan.cost_range)
+        self.days = StreamingHistogram(*plan.days_range)
+        # One unit-width bin per possible count of overrunning projects.
+        self.cost_overruns = StreamingHistogram(-0.5, n + 0.5, n + 1)
+        self.time_overruns = StreamingHistogram(-0.5, n + 0.5, n + 1)
+        self.project_cost = np.zeros(n)
+        self.project_days = np.zeros(n)
+        self.project_cost_exceed = np.zeros(n, dtype=np.int64)
+        self.project_time_exceed = np.zeros(n, dtype=np.int64)
+        self.tail_cost = np.zeros(n)
+        self.tail_scenarios = 0
+
+    def merge(self, other: '_Accumulator'):
+        for name in ('cost', 'days', 'cost_overruns', 'time_overruns'):
+            getattr(self, name).merge(getattr(other, name))
+        self.project_cost += other.project_cost
+        self.project_days += other.project_days
+        self.project_cost_exceed += other.project_cost_exceed
+        self.project_time_exceed += other.project_time_exceed
+        self.tail_cost += other.tail_cost
+        self.tail_scenarios += other.tail_scenarios
+
+
+class _Plan:
+    """Everything a worker needs to simulate any task; inherited by forked workers."""
+
+    def __init__(self, portfolio: Portfolio, seed: int, market_correlation: float, vendor_correlation: float):
+        self.portfolio = portfolio
+        self.seed = seed
+        self.market_correlation = market_correlation
+        self.vendor_correlation = vendor_correlation
+        self.cost_range = (-1.0, 1.0)
+        self.days_range = (-1.0, 1.0)
+        self.tail_threshold = np.inf
+
+    def place_bins(self):
+        """Size the histograms and the tail threshold from a pilot run."""
+        rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(PILOT_STREAM,)))
+        cost, days = [], []
+        for block in self._blocks(rng, PILOT_SCENARIOS):
+            cost.append(block[0].sum(axis=1))
+            days.append(block[1].sum(axis=1))
+        cost, days = np.concatenate(cost), np.concatenate(days)
+        self.cost_range = _padded_range(cost)
+        self.days_range = _padded_range(days)
+        self.tail_threshold = float(np.percentile(cost, TAIL_PERCENTILE))
+
+    def _blocks(self, rng: np.random.Generator, scenarios: int):
+        """Yield calibrated (cost overrun, schedule overrun days, cost pct, time pct) blocks."""
+        p = self.portfolio
+        step = max(1, BLOCK_DRAWS // p.n)
+        everything = slice(None)
+        for start in range(0, scenarios, step):
+            cost_pct, time_pct = p._overrun_pct(
+                rng, min(step, scenarios - start), everything, self.market_correlation, self.vendor_correlation
+            )
+            cost_pct -= p.cost_shift
+            time_pct -= p.time_shift
+            yield cost_pct * p.planned_cost, time_pct * p.planned_days, cost_pct, time_pct
+
+    def run_task(self, task: int, scenarios: int) -> _Accumulator:
+        rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(SCENARIO_STREAM, task)))
+        acc = _Accumulator(self)
+        for cost, days, cost_pct, time_pct in self._blocks(rng, scenarios):
+            total_cost = cost.sum(axis=1)
+            acc.cost.add(total_cost)
+            acc.days.add(days.sum(axis=1))
+            cost_exceed = cost_pct > OVERRUN_THRESHOLD
+            time_exceed = time_pct > OVERRUN_THRESHOLD
+            acc.cost_overruns.add(cost_exceed.sum(axis=1).astype(np.float64))
+            acc.time_overruns.add(time_exceed.sum(axis=1).astype(np.float64))
+            acc.project_cost += cost.sum(axis=0)
+            acc.project_days += days.sum(axis=0)
+            acc.project_cost_exceed += cost_exceed.sum(axis=0)
+            acc.project_time_exceed += time_exceed.sum(axis=0)
+            tail = total_cost >= self.tail_threshold
+            if tail.any():
+                acc.tail_cost += cost[tail].sum(axis=0)
+                acc.tail_scenarios += int(tail.sum())
+        return acc
+
+
+def _codes(values: pd.Series, vocabulary: np.ndarray) -> np.ndarray:
+    return pd.Categorical(values.astype(str), categories=vocabulary).codes.astype(np.int64)
+
+
+def _padded_range(values: np.ndarray) -> tuple[float, float]:
+    lo, hi = float(values.min()), float(values.max())
+    span = max(hi - lo, abs(hi) * 1e-6, 1e-9)
+    return lo - span, hi + span
+
+
+_worker_plan: _Plan | None = None
+
+
+def _init_worker(plan: _Plan):
+    global _worker_plan
+    _worker_plan = plan
+
+
+def _run_worker_task(task: int, scenarios: int) -> _Accumulator:
+    return _worker_plan.run_task(task, scenarios)
+
+
+def simulate(
+    portfolio: pd.DataFrame,
+    scenarios: int = 100_000,
+    seed: int = 0,
+    workers: int = 1,
+    predictors=None,
+    calibrate: bool = True,
+    market_correlation: float = 0.5,
+    vendor_correlation: float = 0.5,
+    top: int = 10,
+) -> dict:
+    """Simulate ``scenarios`` joint outcomes of the portfolio and summarize total exposure.
+
+    ``predictors`` is the (cost, time) pair of compiled predictors used for
+    calibration; when None they are loaded from the artifacts on disk.
+    """
+    if scenarios < 1:
+        raise ValueError('scenarios must be >= 1')
+    if not (0.0 <= market_correlation <= 1.0 and 0.0 <= vendor_correlation <= 1.0):
+        raise ValueError('correlations must be in [0, 1]')
+    started = time.perf_counter()
+    projects = Portfolio(portfolio)
+    if projects.n == 0:
+        raise ValueError('portfolio is empty')
+    if calibrate:
+        if predictors is None:
+            from compiled_model import compile_pipelines
+            from model_utils import load_models
+
+            predictors = compile_pipelines(*load_models())
+        predictor_cost, predictor_time = predictors
+        X = predictor_cost.encoder.encode_columns(projects.features)
+        X_time = X if predictor_time.encoder is predictor_cost.encoder else predictor_time.encoder.encode_columns(
+            projects.features)
+        projects.calibrate(predictor_cost.positive_proba(X), predictor_time.positive_proba(X_time), seed)
+
+    plan = _Plan(projects, seed, market_correlation, vendor_correlation)
+    plan.place_bins()
+    tasks = [(task, min(TASK_SCENARIOS, scenarios - start))
+             for task, start in enumerate(range(0, scenarios, TASK_SCENARIOS))]
+    workers = max(1, min(workers, len(tasks)))
+    total = _Accumulator(plan)
+    if workers == 1:
+        for task, n in tasks:
+            total.merge(plan.run_task(task, n))
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(plan,)) as pool:
+            # Merge in task order with a bounded number of results in flight.
+            pending = deque()
+            for task, n in tasks:
+                pending.append(pool.submit(_run_worker_task, task, n))
+                if len(pending) >= 2 * workers:
+                    total.merge(pending.popleft().result())
+            while pending:
+                total.merge(pending.popleft().result())
+    return _report(plan, total, scenarios, workers, calibrate, top, time.perf_counter() - started)
+
+
+def _report(plan: _Plan, acc: _Accumulator, scenarios: int, workers: int, calibrate: bool, top: int,
+            seconds: float) -> dict:
+    p = plan.portfolio
+    expected_cost = acc.project_cost / scenarios
+    tail_cost = acc.tail_cost / acc.tail_scenarios if acc.tail_scenarios else np.zeros(p.n)
+    tail_total = tail_cost.sum()
+    order = np.argsort(-tail_cost, kind='stable')[:top]
+    return {
+        'projects': p.n,
+        'scenarios': scenarios,
+        'seed': plan.seed,
+        'workers': workers,
+        'calibrated': calibrate,
+        'market_correlation': plan.market_correlation,
+        'vendor_correlation': plan.vendor_correlation,
+        'seconds': seconds,
+        'total_cost_overrun': acc.cost.summary(),
+        'total_schedule_overrun_days': acc.days.summary(),
+        'projects_over_cost_threshold': acc.cost_overruns.summary(),
+        'projects_over_time_threshold': acc.time_overruns.summary(),
+        'tail': {
+            'percentile': TAIL_PERCENTILE,
+            'cost_overrun_threshold': plan.tail_threshold,
+            'scenarios': acc.tail_scenarios,
+        },
+        'top_projects': [
+            {
+                'project_id': str(p.project_ids[i]),
+                'expected_cost_overrun': float(expected_cost[i]),
+                'tail_cost_overrun': float(tail_cost[i]),
+                'tail_share': float(tail_cost[i] / tail_total) if tail_total else 0.0,
+                'expected_schedule_overrun_days': float(acc.project_days[i] / scenarios),
+                'simulated_cost_overrun_rate': float(acc.project_cost_exceed[i] / scenarios),
+                'simulated_time_overrun_rate': float(acc.project_time_exceed[i] / scenarios),
+                'cost_overrun_probability': None if np.isnan(p.cost_probability[i]) else float(p.cost_probability[i]),
+                'time_overrun_probability': None if np.isnan(p.time_probability[i]) else float(p.time_probability[i]),
+            }
+            for i in order
+        ],
+    }
+
+
+def main():
+    from project_store import read_history
+    from train_model import available_cores
+
+    parser = argparse.ArgumentParser(description='Simulate the total overrun exposure of a project portfolio.')
+    parser.add_argument('portfolio', help='CSV, Parquet or JSONL file of projects')
+    parser.add_argument('--scenarios', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help='simulation processes (default: all cores)')
+    parser.add_argument('--market-correlation', type=float, default=0.5)
+    parser.add_argument('--vendor-correlation', type=float, default=0.5)
+    parser.add_argument('--no-calibrate', action='store_true', help='use the mechanics alone, without the models')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('-o', '--output', default=None, help='write the full report as JSON')
+    args = parser.parse_args()
+
+    frame = read_history(args.portfolio)
+    report = simulate(
+        frame[[c for c in FEATURES + ['project_id'] if c in frame]],
+        scenarios=args.scenarios,
+        seed=args.seed,
+        workers=args.workers or available_cores(),
+        calibrate=not args.no_calibrate,
+        market_correlation=args.market_correlation,
+        vendor_correlation=args.vendor_correlation,
+        top=args.top,
+    )
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    cost, days = report['total_cost_overrun'], report['total_schedule_overrun_days']
+    print(f"{report['projects']} projects, {report['scenarios']} scenarios "
+          f"in {report['seconds']:.1f}s on {report['workers']} workers")
+    print('Total cost overrun (INR):   ' + '  '.join(f'p{p}={cost[f"p{p}"]:,.0f}' for p in PERCENTILES))
+    print('Total schedule overrun (d): ' + '  '.join(f'p{p}={days[f"p{p}"]:,.0f}' for p in PERCENTILES))
+    print(f'Top projects by contribution to the p{TAIL_PERCENTILE} cost tail:')
+    for row in report['top_projects']:
+        print(f"  {row['project_id']}: {row['tail_share']:.1%} of tail, "
+              f"expected {row['expected_cost_overrun']:,.0f} INR")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+"""Columnar project-history store and the one loader every entry point uses.
+
+    python project_store.py synthetic_projects.csv synthetic_projects.parquet
+
+History is stored as Parquet (compressed, with row-group statistics for
+predicate pushdown) or as an uncompressed Arrow IPC file (``.arrow``,
+zero-copy memory-mapped reads). Both use one schema: the categorical columns
+are dictionary-encoded over the fixed API vocabulary with int8 indices, so
+every file and every chunk maps to the same pandas categories; integer
+columns are downcast to the narrowest type that holds any valid value.
+Floats stay float64, since float32 would change model inputs such as
+``vendor_rating``.
+
+``read_history`` and ``iter_data_chunks`` accept CSV and JSONL too, and
+return the same dtypes for them, so callers never branch on the format.
+"""
+
+import argparse
+import os
+import time
+from collections.abc import Iterator
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+from model_utils import CATEGORY_VALUES
+
+DEFAULT_CSV_PATH = 'synthetic_projects.csv'
+DEFAULT_STORE_PATH = 'synthetic_projects.parquet'
+
+# Narrowest types that hold every valid value; anything else is left as read.
+INTEGER_TYPES = {
+    'planned_days': pa.int16(),
+    'actual_days': pa.int32(),
+    'cost_overrun': pa.int8(),
+    'time_overrun': pa.int8(),
+}
+FLOAT_COLUMNS = ['planned_cost', 'vendor_rating', 'actual_cost', 'cost_overrun_pct', 'time_overrun_pct']
+ROW_GROUP_ROWS = 65_536
+
+_DICTIONARIES = {col: pa.array(values, pa.string()) for col, values in CATEGORY_VALUES.items()}
+_LOCAL = fs.LocalFileSystem(use_mmap=True)
+
+
+def default_history_path() -> str:
+    """The columnar store when it has been built, else the CSV it is built from."""
+    return DEFAULT_STORE_PATH if os.path.exists(DEFAULT_STORE_PATH) else DEFAULT_CSV_PATH
+
+
+def _format(path: str) -> str:
+    if path.endswith(('.parquet', '.pq')):
+        return 'parquet'
+    if path.endswith(('.arrow', '.feather', '.ipc')):
+        return 'ipc'
+    if path.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return 'csv'
+
+
+def _expression(filters) -> pc.Expression | None:
+    """Accept a pyarrow expression or DNF tuples like ``[('season', '==', 'Monsoon')]``."""
+    if filters is None or isinstance(filters, pc.Expression):
+        return filters
+    return pq.filters_to_expression(filters)
+
+
+def to_store_table(table: pa.Table | pd.DataFrame, strict: bool = False) -> pa.Table:
+    """Cast a table to the store schema.
+
+    With ``strict`` (used when writing), a category outside the vocabulary or
+    an integer that does not fit its type raises ValueError. Otherwise such
+    columns are kept: unknown categories are appended to the dictionary and
+    columns that cannot be cast are left as read, so invalid rows can still
+    be reported by validation.
+    """
+    if isinstance(table, pd.DataFrame):
+        table = _from_pandas(table)
+    for i, name in enumerate(table.column_names):
+        column = table.column(i)
+        if name in _DICTIONARIES:
+            column = _encode_categories(name, column, strict)
+        elif name in INTEGER_TYPES or name in FLOAT_COLUMNS:
+            target = INTEGER_TYPES.get(name, pa.float64())
+            try:
+                column = column.cast(target)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as exc:
+                if strict:
+                    raise ValueError(f'{name}: cannot store as {target}: {exc}') from exc
+        else:
+            continue
+        table = table.set_column(i, name, column)
+    return table
+
+
+def _from_pandas(frame: pd.DataFrame) -> pa.Table:
+    try:
+        return pa.Table.from_pandas(frame, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+    # Some object column mixes types, e.g. a JSON number column holding one string.
+    # Such columns are kept as text, as a CSV reader would give them.
+    arrays = []
+    for name in frame.columns:
+        column = frame[name]
+        try:
+            arrays.append(pa.array(column, from_pandas=True))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arrays.append(pa.array(column.astype(str).where(column.notna(), None), from_pandas=True))
+    return pa.Table.from_arrays(arrays, names=[str(name) for name in frame.columns])
+
+
+def _encode_categories(name: str, column: pa.ChunkedArray, strict: bool) -> pa.ChunkedArray:
+    dictionary = _DICTIONARIES[name]
+    if pa.types.is_dictionary(column.type) and column.num_chunks:
+        # Already encoded (e.g. read from the store): remap each chunk's small
+        # dictionary onto the vocabulary instead of re-hashing every value.
+        remapped = []
+        for chunk in column.chunks:
+            mapping = pc.index_in(chunk.dictionary, value_set=dictionary)
+            if mapping.null_count:
+                break
+            remapped.append(pa.DictionaryArray.from_arrays(
+                pc.take(mapping, chunk.indices).cast(pa.int8()), dictionary))
+        else:
+            return pa.chunked_array(remapped, pa.dictionary(pa.int8(), pa.string()))
+    try:
+        column = column.cast(pa.string())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        if strict:
+            raise ValueError(f'{name}: expected strings, got {column.type}')
+        return column
+    indices = pc.index_in(column, value_set=dictionary)
+    unknown = pc.and_(pc.is_null(indices), pc.is_valid(column))
+    if pc.any(unknown).as_py():
+        extra = pc.unique(pc.filter(column, unknown))
+        if strict:
+            raise ValueError(f'{name}: values outside the vocabulary: {extra.to_pylist()[:5]}')
+        dictionary = pa.concat_arrays([dictionary, extra])
+        indices = pc.index_in(column, value_set=dictionary)
+    index_type = pa.int8() if len(dictionary) <= 127 else pa.int32()
+    return pa.chunked_array(
+        [pa.DictionaryArray.from_arrays(chunk.cast(index_type), dictionary) for chunk in indices.chunks],
+        pa.dictionary(index_type, pa.string()),
+    )
+
+
+def _to_pandas(table: pa.Table) -> pd.DataFrame:
+    # The table is discarded, so its buffers can be released column by column as they convert.
+    return to_store_table(table).to_pandas(split_blocks=True, self_destruct=True)
+
+
+def _dataset(path: str) -> ds.Dataset:
+    return ds.dataset(path, format=_format(path), filesystem=_LOCAL)
+
+
+def read_history(path: str, columns: list[str] | None = None, filters=None) -> pd.DataFrame:
+    """Load project history with column projection and predicate pushdown.
+
+    ``filters`` is a pyarrow expression or DNF tuples. For Parquet, row groups
+    whose statistics rule the predicate out are skipped; Arrow IPC files are
+    memory-mapped and only the projected, matching rows are materialized.
+    """
+    expression = _expression(filters)
+    fmt = _format(path)
+    if fmt in ('parquet', 'ipc'):
+        return _to_pandas(_dataset(path).to_table(columns=columns, filter=expression))
+    # Text formats have no statistics: parse, then filter (on all columns) and project.
+    table = to_store_table(_read_text(path, None if expression is not None else columns))
+    return _filter_and_project(table, expression, columns).to_pandas()
+
+
+def _read_text(path: str, columns: list[str] | None) -> pd.DataFrame:
+    if _format(path) == 'jsonl':
+        df = pd.read_json(path, lines=True, dtype=False)
+        return df if columns is None else df.reindex(columns=columns)
+    return pd.read_csv(path, usecols=columns)
+
+
+def _filter_and_project(table: pa.Table, expression: pc.Expression | None, columns: list[str] | None) -> pa.Table:
+    if expression is None:
+        return table
+    table = table.filter(expression)
+    return table if columns is None else table.select(columns)
+
+
+def iter_data_chunks(path: str, chunk_size: int, columns: list[str] | None = None,
+                     filters=None) -> Iterator[pd.DataFrame]:
+    """Stream a CSV, Parquet, Arrow or JSONL file as DataFrames of at most chunk_size rows, in file order."""
+    expression = _expression(filters)
+    fmt = _format(path)
+    if fmt in ('parquet', 'ipc'):
+        for batch in _dataset(path).to_batches(columns=columns, filter=expression, batch_size=chunk_size):
+            if batch.num_rows:
+                yield _to_pandas(pa.Table.from_batches([batch]))
+        return
+    read_columns = None if expression is not None else columns
+    if fmt == 'jsonl':
+        reader = pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False)
+    else:
+        reader = pd.read_csv(path, chunksize=chunk_size, usecols=read_columns)
+    with reader:
+        for chunk in reader:
+            if fmt == 'jsonl' and read_columns is not None:
+                chunk = chunk.reindex(columns=read_columns)
+            table = _filter_and_project(to_store_table(chunk), expression, columns)
+            if table.num_rows:
+                yield table.to_pandas()
+
+
+class HistoryWriter:
+    """Append chunks to a Parquet or Arrow IPC store; the file appears atomically on close."""
+
+    def __init__(self, path: str, fmt: str | None = None):
+        self.path = path
+        self.tmp = f'{path}.tmp'
+        self.format = {'arrow': 'ipc'}.get(fmt, fmt) or _format(path)
+        if self.format not in ('parquet', 'ipc'):
+            raise ValueError(f'Unsupported store format: {path} (use .parquet or .arrow)')
+        self._writer = None
+        self.schema: pa.Schema | None = None
+        self.rows = 0
+
+    def write(self, chunk: pd.DataFrame | pa.Table):
+        table = to_store_table(chunk, strict=True)
+        if self._writer is None:
+            if self.format == 'parquet':
+                self._writer = pq.ParquetWriter(self.tmp, table.schema, compression='zstd')
+            else:
+                self._writer = pa.ipc.new_file(self.tmp, table.schema)
+            self.schema = table.schema
+        table = table.cast(self.schema)
+        if self.format == 'parquet':
+            self._writer.write_table(table, row_group_size=ROW_GROUP_ROWS)
+        else:
+            self._writer.write_table(table, max_chunksize=ROW_GROUP_ROWS)
+        self.rows += table.num_rows
+
+    def close(self, commit: bool = True):
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        if commit:
+            os.replace(self.tmp, self.path)
+        else:
+            os.remove(self.tmp)
+
+
+def convert(source: str, output: str, chunk_size: int = 500_000) -> int:
+    """Convert a CSV/JSONL (or another store file) into a Parquet or Arrow store; returns the row count."""
+    writer = HistoryWriter(output)
+    committed = False
+    try:
+        for chunk in iter_data_chunks(source, chunk_size):
+            writer.write(chunk)
+        committed = True
+    finally:
+        writer.close(commit=committed)
+    return writer.rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert project history into the columnar store.')
+    parser.add_argument('input', nargs='?', default=DEFAULT_CSV_PATH)
+    parser.add_argument('output', nargs='?', default=DEFAULT_STORE_PATH, help='.parquet or .arrow')
+    parser.add_argument('--chunk-size', type=int, default=500_000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    rows = convert(args.input, args.output, args.chunk_size)
+    size = os.path.getsize(args.output) / 2**20
+    print(f'Wrote {args.output} ({rows} rows, {size:.1f} MiB) in {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Replay recorded production traffic from the prediction audit log.
+
+    python replay_audit.py AUDIT_LOG [--url http://host:8000] [--concurrency N]
+                           [--limit N] [--verify]
+
+AUDIT_LOG is the active log path (rotated and gzipped siblings are included,
+oldest first) or a single rotated file. Without ``--url`` the requests are
+scored in-process against the current artifacts; with it they are sent over
+HTTP. ``--verify`` compares each response against the recorded one.
+"""
+
+import argparse
+import asyncio
+import math
+import time
+
+import numpy as np
+
+from audit_log import read_records
+
+REPLAYABLE_ENDPOINTS = ('/predict', '/predict_cost_overrun', '/predict_batch')
+PROBABILITY_TOLERANCE = 1e-6
+
+
+def _same(recorded, replayed) -> bool:
+    if isinstance(recorded, dict) and isinstance(replayed, dict):
+        return recorded.keys() == replayed.keys() and all(_same(recorded[k], replayed[k]) for k in recorded)
+    if isinstance(recorded, list) and isinstance(replayed, list):
+        return len(recorded) == len(replayed) and all(_same(a, b) for a, b in zip(recorded, replayed))
+    if isinstance(recorded, float) or isinstance(replayed, float):
+        return math.isclose(recorded, replayed, rel_tol=0, abs_tol=PROBABILITY_TOLERANCE)
+    return recorded == replayed
+
+
+def _in_process_sender():
+    import serve_model_fastapi as server
+
+    def send(endpoint: str, request):
+        if endpoint == '/predict_batch':
+            return {'predictions': server._predict_batch([server.ProjectIn(**r) for r in request])}
+        result = server._predict(server.ProjectIn(**request))
+        if endpoint == '/predict':
+            return result
+        return server._cost_overrun_response(result)
+
+    async def send_async(endpoint: str, request):
+        return await asyncio.to_thread(send, endpoint, request)
+
+    return send_async, None
+
+
+def _http_sender(url: str, concurrency: int):
+    import httpx
+
+    client = httpx.AsyncClient(
+        base_url=url,
+        timeout=30.0,
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+    )
+
+    async def send(endpoint: str, request):
+        response = await client.post(endpoint, json=request)
+        response.raise_for_status()
+        return response.json()
+
+    return send, client
+
+
+async def replay(
+    path: str,
+    url: str | None = None,
+    concurrency: int = 8,
+    limit: int | None = None,
+    verify: bool = False,
+) -> dict:
+    send, client = _http_sender(url, concurrency) if url else _in_process_sender()
+    records = (r for r in read_records(path) if r['endpoint'] in REPLAYABLE_ENDPOINTS)
+    latencies = []
+    errors = mismatches = 0
+    queue: asyncio.Queue = asyncio.Queue(maxsize=2 * concurrency)
+
+    async def worker():
+        nonlocal errors, mismatches
+        while (record := await queue.get()) is not None:
+            started = time.perf_counter()
+            try:
+                response = await send(record['endpoint'], record['request'])
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            if verify and not _same(record['response'], response):
+                mismatches += 1
+
+    started = time.perf_counter()
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        for i, record in enumerate(records):
+            if limit is not None and i >= limit:
+                break
+            await queue.put(record)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        if client is not None:
+            await client.aclose()
+    seconds = time.perf_counter() - started
+
+    summary = {
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'seconds': seconds,
+        'throughput_rps': len(latencies) / seconds if seconds else 0.0,
+    }
+    if latencies:
+        p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+        summary.update(p50_ms=p50, p95_ms=p95, p99_ms=p99)
+    if verify:
+        summary['mismatches'] = mismatches
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay an audit log against the models or a running server.')
+    parser.add_argument('log', help='audit log path (rotated files are included)')
+    parser.add_argument('--url', default=None, help='server base URL (default: score in-process)')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--limit', type=int, default=None, help='replay at most N records')
+    parser.add_argument('--verify', action='store_true', help='compare responses with the recorded ones')
+    args = parser.parse_args()
+
+    summary = asyncio.run(replay(args.log, args.url, args.concurrency, args.limit, args.verify))
+    line = (f"Replayed {summary['requests']} requests ({summary['errors']} errors) "
+            f"in {summary['seconds']:.2f}s: {summary['throughput_rps']:.1f} req/s")
+    if 'p50_ms' in summary:
+        line += f", p50 {summary['p50_ms']:.2f} ms, p95 {summary['p95_ms']:.2f} ms, p99 {summary['p99_ms']:.2f} ms"
+    if args.verify:
+        line += f", {summary['mismatches']} mismatches"
+    print(line)
+
+
+if __name__ == '__main__':
+    main()
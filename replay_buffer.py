@@ -0,0 +1,87 @@
+"""Fixed-size uniform sample of the project history, for incremental updates.
+
+The buffer is a reservoir sample: after any sequence of ``add`` calls every
+project seen so far is in it with the same probability, so it stands in for
+the full history when ``update_model.py`` replays old projects alongside a new
+batch. Adding a batch costs O(batch), never a rescan of the history.
+
+Buffered projects may have been trained on by any earlier model, so updates
+are gated on the new batch only, never on the buffer.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from model_utils import FEATURES, REPLAY_BUFFER_PATH, replace_file
+from project_store import iter_data_chunks, to_store_table
+from train_model import TARGETS
+
+COLUMNS = FEATURES + list(TARGETS)
+DEFAULT_CAPACITY = 50_000
+
+
+class ReplayBuffer:
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, frame: pd.DataFrame | None = None, seen: int = 0):
+        if capacity < 1:
+            raise ValueError('capacity must be positive')
+        self.capacity = capacity
+        self.frame = frame.reset_index(drop=True) if frame is not None else pd.DataFrame(columns=COLUMNS)
+        self.seen = seen
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def add(self, frame: pd.DataFrame, seed: int = 0):
+        """Reservoir-sample ``frame`` into the buffer (Algorithm R, vectorized over the batch)."""
+        rows = frame[COLUMNS].reset_index(drop=True)
+        # Seeded by the number of rows seen so far, so an update is reproducible.
+        rng = np.random.default_rng([seed, self.seen])
+        free = max(self.capacity - len(self.frame), 0)
+        fill, rest = rows.iloc[:free], rows.iloc[free:]
+        if len(fill):
+            self.frame = pd.concat([self.frame, fill], ignore_index=True) if len(self.frame) else fill.copy()
+        if len(rest):
+            position = self.seen + free + np.arange(len(rest))
+            slot = (rng.random(len(rest)) * (position + 1)).astype(np.int64)
+            accepted = np.flatnonzero(slot < self.capacity)
+            # When two rows of the batch land in one slot, the later one wins, as in the sequential algorithm.
+            last = len(accepted) - 1 - np.unique(slot[accepted][::-1], return_index=True)[1]
+            accepted = accepted[last]
+            take = np.arange(len(self.frame))
+            take[slot[accepted]] = len(self.frame) + accepted
+            self.frame = pd.concat([self.frame, rest], ignore_index=True).iloc[take].reset_index(drop=True)
+        self.seen += len(rows)
+
+    def sample(self, n: int, seed: int = 0) -> pd.DataFrame:
+        """Up to ``n`` buffered rows, drawn without replacement."""
+        pick = np.random.default_rng(seed).choice(len(self.frame), size=min(n, len(self.frame)), replace=False)
+        return self.frame.iloc[np.sort(pick)]
+
+    def save(self, path: str = REPLAY_BUFFER_PATH):
+        table = to_store_table(self.frame, strict=True)
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            b'replay_capacity': str(self.capacity).encode(),
+            b'replay_seen': str(self.seen).encode(),
+        })
+        tmp = f'{path}.tmp'
+        pq.write_table(table, tmp, compression='zstd')
+        replace_file(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = REPLAY_BUFFER_PATH) -> 'ReplayBuffer':
+        table = pq.read_table(path)
+        metadata = table.schema.metadata or {}
+        if b'replay_seen' not in metadata:
+            raise ValueError(f'{path} is not a replay buffer')
+        frame = to_store_table(table).to_pandas()
+        return cls(int(metadata[b'replay_capacity']), frame, int(metadata[b'replay_seen']))
+
+
+def build_replay_buffer(data: str, capacity: int = DEFAULT_CAPACITY, chunk_size: int = 500_000,
+                        seed: int = 0) -> ReplayBuffer:
+    buffer = ReplayBuffer(capacity)
+    for chunk in iter_data_chunks(data, chunk_size, COLUMNS):
+        buffer.add(chunk, seed)
+    return buffer
@@ -0,0 +1,387 @@
+"""Table-driven key-risk-factor and vendor-rating rules.
+
+The rules are data: each one has a weight, a label and a ``when`` mapping of
+field to condition, and they can be loaded from the ``risk_rules`` section of
+a YAML config (see ``sample_config.yaml``)::
+
+    - {group: season, weight: 80, when: {season: Monsoon}, label: ...}
+    - {group: budget, weight: 52, when: {project_type: substation, planned_cost: {gt: 60000000}}, label: ...}
+
+A condition is a category value, a list of values, or comparisons
+(``lt``/``le``/``gt``/``ge``) for numeric fields. All conditions of a rule
+must hold. Rules sharing a ``group`` are an if/elif chain: only the first
+matching one fires. Besides the ProjectIn fields, rules can use
+``cost_overrun_probability``, ``time_overrun_probability`` and
+``vendor_cohort_risk``. Labels may name one categorical field, e.g.
+``'Complex terrain ({terrain})'``.
+
+The fired rules are ranked by weight, ties in table order, and the top
+``max_factors`` labels are returned. For a batch, every rule compiles to a
+NumPy mask over the whole batch and the top-k comes from ``argpartition``
+over a precomputed rank; single rows use a scalar walk over the same
+compiled table, which is faster than NumPy at n=1. Both give the same output.
+"""
+
+import itertools
+import operator
+import string
+from collections.abc import Mapping, Sequence
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from model_utils import CATEGORY_VALUES, NUMERIC_BOUNDS
+from vendor_stats import COHORTS, VendorStats
+
+DEFAULT_RISK_RULES = {
+    'max_factors': 4,
+    'fallback': 'Balanced profile: no major risk drivers triggered',
+    'rules': [
+        {'group': 'regulatory', 'weight': 100, 'when': {'regulatory_risk': 'High'},
+         'label': 'High regulatory approval complexity'},
+        {'group': 'regulatory', 'weight': 75, 'when': {'regulatory_risk': 'Medium'},
+         'label': 'Moderate regulatory clearance risk'},
+        {'weight': 85, 'when': {'market_condition': 'Volatile'},
+         'label': 'Volatile market may increase material and execution risk'},
+        {'group': 'season', 'weight': 80, 'when': {'season': 'Monsoon'},
+         'label': 'Monsoon season can delay on-site execution'},
+        {'group': 'season', 'weight': 40, 'when': {'season': 'Winter'},
+         'label': 'Winter season may slow field productivity'},
+        {'group': 'terrain', 'weight': 62, 'when': {'terrain': ['hilly', 'forest']},
+         'label': 'Complex terrain ({terrain}) increases execution difficulty'},
+        {'group': 'terrain', 'weight': 45, 'when': {'terrain': 'urban'},
+         'label': 'Urban terrain may involve right-of-way and utility conflicts'},
+        {'group': 'vendor_rating', 'weight': 92, 'when': {'vendor_rating': {'lt': 3.0}},
+         'label': 'Low vendor rating indicates high delivery risk'},
+        {'group': 'vendor_rating', 'weight': 60, 'when': {'vendor_rating': {'lt': 3.8}},
+         'label': 'Mid vendor rating indicates moderate delivery variance'},
+        {'group': 'vendor_cohort', 'weight': 65, 'when': {'vendor_cohort_risk': 'high'},
+         'label': '{vendor} has overrun more often than the portfolio historically'},
+        {'group': 'vendor_cohort', 'weight': 48, 'when': {'vendor_cohort_risk': 'medium'},
+         'label': '{vendor} belongs to medium-risk vendor cohort'},
+        {'weight': 50, 'when': {'planned_days': {'gt': 300}},
+         'label': 'Long planned duration increases schedule slippage exposure'},
+        {'group': 'budget', 'weight': 52, 'when': {'project_type': 'substation', 'planned_cost': {'gt': 60_000_000}},
+         'label': 'Large substation budget increases cost sensitivity'},
+        {'group': 'budget', 'weight': 52,
+         'when': {'project_type': 'underground_cable', 'planned_cost': {'gt': 25_000_000}},
+         'label': 'Large underground cable budget increases cost sensitivity'},
+        {'group': 'budget', 'weight': 52, 'when': {'project_type': 'overhead_line', 'planned_cost': {'gt': 15_000_000}},
+         'label': 'Large overhead line budget increases cost sensitivity'},
+        {'weight': 64, 'when': {'cost_overrun_probability': {'gt': 0.7}},
+         'label': 'Model indicates high cost-overrun probability'},
+        {'weight': 64, 'when': {'time_overrun_probability': {'gt': 0.7}},
+         'label': 'Model indicates high timeline-overrun probability'},
+    ],
+    # First band whose min_rating the vendor_rating reaches; the last band has none.
+    'vendor_rating_bands': [
+        {'min_rating': 4.3, 'band': 'Strong', 'note': 'Strong historical rating; maintain current controls.'},
+        {'min_rating': 3.5, 'band': 'Watchlist', 'note': 'Acceptable rating; monitor milestones closely.'},
+        {'band': 'Critical', 'note': 'Low rating; enforce strict governance and contingency.'},
+    ],
+}
+
+# Categorical fields a rule can test, with their vocabularies.
+CATEGORICAL_FIELDS = {**CATEGORY_VALUES, 'vendor_cohort_risk': COHORTS.tolist()}
+NUMERIC_FIELDS = [*NUMERIC_BOUNDS, 'cost_overrun_probability', 'time_overrun_probability']
+PROBABILITY_FIELDS = ('cost_overrun_probability', 'time_overrun_probability')
+_CATEGORY_INDEX = {field: {v: i for i, v in enumerate(values)} for field, values in CATEGORICAL_FIELDS.items()}
+# Comparison name -> (array op, scalar op taking the threshold first).
+_COMPARISONS = {
+    'lt': (operator.lt, operator.gt),
+    'le': (operator.le, operator.ge),
+    'gt': (operator.gt, operator.lt),
+    'ge': (operator.ge, operator.le),
+}
+
+
+class RiskRules:
+    def __init__(self, spec: Mapping | None = None):
+        spec = DEFAULT_RISK_RULES if spec is None else spec
+        self.spec = spec
+        self.max_factors = int(spec.get('max_factors', DEFAULT_RISK_RULES['max_factors']))
+        self.fallback = spec.get('fallback', DEFAULT_RISK_RULES['fallback'])
+        if self.max_factors < 1:
+            raise ValueError('risk_rules.max_factors must be >= 1')
+
+        rules = spec.get('rules') or []
+        self._rules = [_compile_rule(i, rule) for i, rule in enumerate(rules)]
+        groups = {}
+        self._group = np.array([groups.setdefault(r['group'], len(groups)) if r['group'] is not None else -1
+                                for r in self._rules], dtype=np.int64)
+        # Unique rank per rule: higher weight first, then table order (the old stable sort).
+        order = sorted(range(len(self._rules)), key=lambda i: (-self._rules[i]['weight'], i))
+        self._rank = np.empty(len(self._rules), dtype=np.int64)
+        self._rank[order] = np.arange(len(order), 0, -1)
+        self._uses_cohort = any('vendor_cohort_risk' in [*r['fields'], r['label_field']] for r in self._rules)
+        self._compile_scalar()
+
+        bands = spec.get('vendor_rating_bands') or DEFAULT_RISK_RULES['vendor_rating_bands']
+        if any('min_rating' not in band for band in bands[:-1]) or 'min_rating' in bands[-1]:
+            raise ValueError('risk_rules.vendor_rating_bands: every band but the last needs a min_rating')
+        self._band_minimums = [float(band['min_rating']) for band in bands[:-1]]
+        self._bands = np.array([band['band'] for band in bands], dtype=object)
+        self._band_notes = np.array([band['note'] for band in bands], dtype=object)
+
+        # Input columns the rules and vendor_info read (the cohort is looked up from the vendor).
+        used = {f for r in self._rules for f in [*r['fields'], r['label_field']] if f is not None}
+        used = {'vendor' if f == 'vendor_cohort_risk' else f for f in used} - set(PROBABILITY_FIELDS)
+        self.fields = sorted(used | {'vendor', 'vendor_rating', 'project_type'})
+
+    # -- key risk factors -------------------------------------------------
+
+    def key_risk_factors(self, columns: Mapping[str, Sequence], cost_probs: Sequence[float],
+                         time_probs: Sequence[float], vendor_stats: VendorStats) -> list[list[str]]:
+        """Top risk-factor labels for every row of a column table (DataFrame or dict of sequences)."""
+        cost_probs = np.asarray(cost_probs, dtype=float)
+        n = len(cost_probs)
+        rules = self._rules
+        if not rules or n == 0:
+            return [[self.fallback] for _ in range(n)]
+        values = _ColumnValues(columns, cost_probs, time_probs, vendor_stats)
+
+        fired = np.empty((n, len(rules)), dtype=bool)
+        taken = {}
+        for r, rule in enumerate(rules):
+            mask = np.ones(n, dtype=bool)
+            for field, kind, test in rule['vector']:
+                if kind == 'category':
+                    mask &= test[values.codes(field)]
+                else:
+                    mask &= test(values.numbers(field))
+            group = self._group[r]
+            if group >= 0:
+                if group in taken:
+                    mask &= ~taken[group]
+                    taken[group] |= mask
+                else:
+                    taken[group] = mask.copy()
+            fired[:, r] = mask
+
+        key = np.where(fired, self._rank, 0)
+        k = min(self.max_factors, len(rules))
+        top = np.argpartition(-key, k - 1, axis=1)[:, :k] if k < len(rules) else np.broadcast_to(
+            np.arange(len(rules)), (n, len(rules)))
+        top = np.take_along_axis(top, np.argsort(-np.take_along_axis(key, top, axis=1), axis=1), axis=1)
+        counts = np.minimum(fired.sum(axis=1), k).tolist()
+
+        labels = np.empty((n, len(rules)), dtype=object)
+        for r, rule in enumerate(rules):
+            if rule['label_field'] is None:
+                labels[:, r] = rule['label']
+            else:
+                labels[:, r] = rule['labels'][values.codes(rule['label_field'])]
+        selected = np.take_along_axis(labels, top, axis=1).tolist()
+        return [row if count == k else row[:count] if count else [self.fallback]
+                for row, count in zip(selected, counts)]
+
+    def key_risk_factors_one(self, record, cost_prob: float, time_prob: float, vendor_stats: VendorStats) -> list[str]:
+        """Same result as ``key_risk_factors`` for one record (ProjectIn or any object with the fields)."""
+        cohort = vendor_stats.cohort_risk(record.vendor) if self._uses_cohort else None
+        values = (*self._get_record_fields(record), cost_prob, time_prob, cohort)
+        fired = []
+        for slot, switch, chain in self._scalar:
+            if switch is not None:
+                hit = switch.get(values[slot])
+            else:
+                hit = None
+                for conditions, candidate in chain:
+                    for i, test in conditions:
+                        if not test(values[i]):
+                            break
+                    else:
+                        hit = candidate
+                        break
+            if hit is not None:
+                rank, label, label_slot, labels = hit
+                fired.append((rank, label if labels is None else labels[values[label_slot]]))
+        if not fired:
+            return [self.fallback]
+        fired.sort(reverse=True)
+        return [label for _, label in fired[:self.max_factors]]
+
+    def _compile_scalar(self):
+        """Compile the table for one record at a time.
+
+        Values are fetched once into a tuple (record fields by one attrgetter,
+        then the probabilities and the cohort). Each group, and each ungrouped
+        rule, becomes one step that yields at most one hit: a dict lookup when
+        its rules each test one categorical field (the same one), otherwise
+        an if/elif chain of conditions.
+        """
+        record_fields = sorted({f for r in self._rules for f in [*r['fields'], r['label_field']]
+                                if f is not None and f not in PROBABILITY_FIELDS and f != 'vendor_cohort_risk'})
+        slots = {f: i for i, f in enumerate([*record_fields, *PROBABILITY_FIELDS, 'vendor_cohort_risk'])}
+        getter = operator.attrgetter(*record_fields) if record_fields else (lambda record: ())
+        self._get_record_fields = getter if len(record_fields) != 1 else (lambda record: (getter(record),))
+
+        steps = {}
+        for i, rule in enumerate(self._rules):
+            steps.setdefault(rule['group'] if rule['group'] is not None else ('rule', i), []).append(i)
+        self._scalar = []
+        for members in steps.values():
+            hits = []
+            for i in members:
+                rule = self._rules[i]
+                labels = None
+                if rule['label_field'] is not None:
+                    labels = dict(zip(CATEGORICAL_FIELDS[rule['label_field']], rule['labels'].tolist()))
+                hits.append((int(self._rank[i]), rule['label'], slots.get(rule['label_field']), labels))
+            fields = {field for i in members for field in self._rules[i]['fields']}
+            if len(fields) == 1 and all(self._rules[i]['categories'] for i in members):
+                field = fields.pop()
+                switch = {}
+                for i, hit in zip(members, hits):
+                    for value in self._rules[i]['categories'][field]:
+                        switch.setdefault(value, hit)
+                self._scalar.append((slots[field], switch, None))
+            else:
+                chain = [(tuple((slots[f], test) for f, test in self._rules[i]['scalar']), hit)
+                         for i, hit in zip(members, hits)]
+                self._scalar.append((None, None, chain))
+
+    # -- vendor info ------------------------------------------------------
+
+    def rating_bands(self, ratings: Sequence[float]) -> np.ndarray:
+        """Index into the vendor rating bands for each rating."""
+        ratings = np.asarray(ratings, dtype=float)
+        band = np.full(len(ratings), len(self._band_minimums), dtype=np.int64)
+        for i in range(len(self._band_minimums) - 1, -1, -1):
+            band[ratings >= self._band_minimums[i]] = i
+        return band
+
+    def band_names(self, ratings: Sequence[float]) -> np.ndarray:
+        return self._bands[self.rating_bands(ratings)]
+
+    def vendor_info(self, columns: Mapping[str, Sequence], vendor_stats: VendorStats) -> list[dict]:
+        vendors = list(columns['vendor'])
+        project_types = list(columns['project_type'])
+        ratings = np.asarray(columns['vendor_rating'], dtype=float)
+        band = self.rating_bands(ratings)
+        return [
+            _vendor_info(vendor, rating, self._bands[b], self._band_notes[b], project_type, vendor_stats)
+            for vendor, rating, b, project_type in zip(vendors, ratings.tolist(), band.tolist(), project_types)
+        ]
+
+    def vendor_info_one(self, record, vendor_stats: VendorStats) -> dict:
+        rating = record.vendor_rating
+        b = len(self._band_minimums)
+        for i, minimum in enumerate(self._band_minimums):
+            if rating >= minimum:
+                b = i
+                break
+        return _vendor_info(record.vendor, rating, self._bands[b], self._band_notes[b], record.project_type,
+                            vendor_stats)
+
+
+def _vendor_info(vendor, rating, band, band_note, project_type, vendor_stats: VendorStats) -> dict:
+    return {
+        'vendor': vendor,
+        'vendor_rating': rating,
+        'vendor_rating_band': band,
+        'vendor_cohort_risk': vendor_stats.cohort_risk(vendor),
+        'history': vendor_stats.lookup(vendor, project_type),
+        'notes': [band_note, vendor_stats.note(vendor)],
+    }
+
+
+class _ColumnValues:
+    """Lazily converted columns of one batch: category codes and float arrays."""
+
+    def __init__(self, columns, cost_probs, time_probs, vendor_stats: VendorStats):
+        self.columns = columns
+        self.vendor_stats = vendor_stats
+        self._numbers = {'cost_overrun_probability': cost_probs,
+                         'time_overrun_probability': np.asarray(time_probs, dtype=float)}
+        self._codes = {}
+
+    def numbers(self, field: str) -> np.ndarray:
+        if field not in self._numbers:
+            self._numbers[field] = np.asarray(self.columns[field], dtype=float)
+        return self._numbers[field]
+
+    def codes(self, field: str) -> np.ndarray:
+        """Positions in the field's vocabulary; -1 (the tables' trailing entry) for anything else."""
+        if field not in self._codes:
+            if field == 'vendor_cohort_risk':
+                cohort = np.append(self.vendor_stats.cohort, COHORTS.tolist().index('unknown'))
+                self._codes[field] = cohort[self.codes('vendor')]
+            else:
+                self._codes[field] = _category_codes(self.columns[field], field)
+        return self._codes[field]
+
+
+def _category_codes(values, field: str) -> np.ndarray:
+    if isinstance(values, pd.Series) and isinstance(values.dtype, pd.CategoricalDtype):
+        if list(values.cat.categories) == CATEGORICAL_FIELDS[field]:
+            return values.cat.codes.to_numpy()
+    # A dict lookup per value is several times faster than pd.Categorical for lists of Python strings.
+    index = _CATEGORY_INDEX[field]
+    return np.fromiter(map(index.get, values, itertools.repeat(-1)), dtype=np.int64, count=len(values))
+
+
+def _compile_rule(i: int, rule: Mapping) -> dict:
+    where = f'risk_rules.rules[{i}]'
+    unknown = set(rule) - {'group', 'weight', 'when', 'label'}
+    if unknown or 'weight' not in rule or 'label' not in rule or not rule.get('when'):
+        raise ValueError(f'{where}: needs weight, label and when (got {sorted(rule)})')
+    vector, scalar, categories = [], [], {}
+    for field, condition in rule['when'].items():
+        if field in CATEGORICAL_FIELDS:
+            vocabulary = CATEGORICAL_FIELDS[field]
+            allowed = [condition] if isinstance(condition, str) else list(condition)
+            bad = [value for value in allowed if value not in vocabulary]
+            if bad:
+                raise ValueError(f'{where}: {field} has no value {bad[0]!r}')
+            table = np.zeros(len(vocabulary) + 1, dtype=bool)
+            table[[vocabulary.index(value) for value in allowed]] = True
+            vector.append((field, 'category', table))
+            scalar.append((field, frozenset(allowed).__contains__))
+            categories[field] = allowed
+        elif field in NUMERIC_FIELDS:
+            if not isinstance(condition, Mapping) or not condition or set(condition) - set(_COMPARISONS):
+                raise ValueError(f'{where}: {field} needs comparisons among {sorted(_COMPARISONS)}')
+            for name, threshold in condition.items():
+                array_op, scalar_op = _COMPARISONS[name]
+                threshold = float(threshold)
+                vector.append((field, 'number', partial(_compare, array_op, threshold)))
+                scalar.append((field, partial(scalar_op, threshold)))
+        else:
+            raise ValueError(f'{where}: unknown field {field!r}')
+
+    label = str(rule['label'])
+    label_fields = [name for _, name, _, _ in string.Formatter().parse(label) if name is not None]
+    if len(label_fields) > 1 or any(name not in CATEGORICAL_FIELDS for name in label_fields):
+        raise ValueError(f'{where}: labels may reference one categorical field, got {label_fields}')
+    label_field = label_fields[0] if label_fields else None
+    labels = None
+    if label_field is not None:
+        labels = np.array([label.format(**{label_field: v}) for v in CATEGORICAL_FIELDS[label_field]] + [''],
+                          dtype=object)
+    return {
+        'group': rule.get('group'),
+        'weight': float(rule['weight']),
+        'fields': list(rule['when']),
+        'vector': vector,
+        'scalar': scalar,
+        'categories': categories,
+        'label': label,
+        'label_field': label_field,
+        'labels': labels,
+    }
+
+
+def _compare(op, threshold: float, values: np.ndarray) -> np.ndarray:
+    return op(values, threshold)
+
+
+def load_risk_rules(path: str | None = None) -> RiskRules:
+    """Rules from the ``risk_rules`` section of a YAML config; the built-in table when path is empty."""
+    if not path:
+        return RiskRules()
+    import yaml
+
+    with open(path) as f:
+        config = yaml.safe_load(f) or {}
+    return RiskRules(config.get('risk_rules'))
@@ -0,0 +1,169 @@
+"""Offline bulk scoring of a project file.
+
+    python score.py INPUT OUTPUT [--workers N] [--chunk-size N] [--url http://host:8000]
+
+INPUT and OUTPUT may be CSV, Parquet or JSONL (ProjectIn records, one per
+line). The input is streamed in chunks and each chunk is validated in a
+vectorized way against the ProjectIn constraints. Valid rows are scored on a
+process pool; each worker loads the models once. Results are written in
+input order with at most ``2 * workers`` chunks in flight, so memory stays
+bounded for any file size. Invalid rows are kept, with an ``error`` column
+and empty predictions.
+
+With ``--url`` the chunks are scored by a running server instead, sent as
+Arrow IPC to ``/predict_batch_arrow`` with ``--workers`` requests in flight;
+the output is the same.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+
+import httpx
+import pandas as pd
+
+from api_client import predict_arrow_chunk
+from columnar import records, score_columns
+from compiled_model import compile_pipelines
+from model_utils import load_models
+from project_store import iter_data_chunks
+from risk_rules import load_risk_rules
+from train_model import available_cores
+from vendor_stats import load_vendor_stats
+
+# Same rule table as the server (see serve_model_fastapi.py).
+RISK_RULES_PATH = os.getenv('POWERGRID_RISK_RULES', '')
+
+_predictors = None
+_vendor_stats = None
+_risk_rules = None
+
+
+def _init_worker():
+    global _predictors, _vendor_stats, _risk_rules
+    _predictors = compile_pipelines(*load_models())
+    _vendor_stats = load_vendor_stats()
+    _risk_rules = load_risk_rules(RISK_RULES_PATH)
+
+
+def score_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    if _predictors is None:
+        _init_worker()
+    return score_columns(chunk, _predictors, _vendor_stats, _risk_rules)
+
+
+class ResultWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp = f'{path}.tmp'
+        self.format = (
+            'parquet' if path.endswith(('.parquet', '.pq'))
+            else 'jsonl' if path.endswith(('.jsonl', '.ndjson'))
+            else 'csv'
+        )
+        self._parquet = None
+        self._started = False
+
+    def write(self, df: pd.DataFrame):
+        if self.format == 'jsonl':
+            with open(self.tmp, 'a' if self._started else 'w') as f:
+                for record in records(df):
+                    f.write(json.dumps(record) + '\n')
+        else:
+            df = df.assign(key_risk_factors=df['key_risk_factors'].map(
+                lambda f: '; '.join(f) if f is not None else None
+            ))
+            if self.format == 'csv':
+                df.to_csv(self.tmp, mode='a' if self._started else 'w', header=not self._started, index=False)
+            else:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if self._parquet is None:
+                    schema = pa.schema(
+                        [pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in table.schema],
+                        metadata=table.schema.metadata,
+                    )
+                    self._parquet = pq.ParquetWriter(self.tmp, schema)
+                self._parquet.write_table(table.cast(self._parquet.schema))
+        self._started = True
+
+    def close(self, commit: bool = True):
+        if self._parquet is not None:
+            self._parquet.close()
+        if not self._started:
+            return
+        if commit:
+            os.replace(self.tmp, self.path)
+        else:
+            os.remove(self.tmp)
+
+
+def score_file(input_path: str, output_path: str, workers: int | None = None, chunk_size: int = 50_000,
+               url: str | None = None) -> dict:
+    workers = workers or (available_cores() if url is None else 4)
+    writer = ResultWriter(output_path)
+    rows = invalid = 0
+    started = time.perf_counter()
+    chunks = iter_data_chunks(input_path, chunk_size)
+
+    def emit(result: pd.DataFrame):
+        nonlocal rows, invalid
+        writer.write(result)
+        rows += len(result)
+        invalid += int((result['error'] != '').sum())
+
+    committed = False
+    try:
+        if workers == 1 and url is None:
+            for chunk in chunks:
+                emit(score_chunk(chunk))
+        else:
+            with ExitStack() as stack:
+                if url is None:
+                    methods = multiprocessing.get_all_start_methods()
+                    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+                    pool = stack.enter_context(ProcessPoolExecutor(
+                        max_workers=workers, mp_context=context, initializer=_init_worker))
+                    score = score_chunk
+                else:
+                    client = stack.enter_context(httpx.Client())
+                    pool = stack.enter_context(ThreadPoolExecutor(max_workers=workers))
+                    score = partial(predict_arrow_chunk, url=url, client=client)
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(score, chunk))
+                    if len(pending) >= 2 * workers:
+                        emit(pending.popleft().result())
+                while pending:
+                    emit(pending.popleft().result())
+        committed = True
+    finally:
+        writer.close(commit=committed)
+    return {'rows': rows, 'invalid_rows': invalid, 'seconds': time.perf_counter() - started}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score a CSV/Parquet/JSONL file of projects offline.')
+    parser.add_argument('input')
+    parser.add_argument('output')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='scoring processes (default: all cores), or concurrent requests with --url (default: 4)')
+    parser.add_argument('--chunk-size', type=int, default=50_000)
+    parser.add_argument('--url', default=None, help='score on this running server instead of locally')
+    args = parser.parse_args()
+
+    summary = score_file(args.input, args.output, args.workers, args.chunk_size, args.url)
+    print(f"Scored {summary['rows']} rows ({summary['invalid_rows']} invalid) "
+          f"in {summary['seconds']:.1f}s -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
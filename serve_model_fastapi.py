@@ -1,21 +1,346 @@
+import asyncio
+import hashlib
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
 from functools import lru_cache
 from typing import Literal
 
+import numpy as np
+import orjson
 import pandas as pd
-import uvicorn
-from fastapi import FastAPI
-from pydantic import BaseModel, ConfigDict, Field
+import pyarrow as pa
+import xgboost as xgb
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+import portfolio_simulation
+from audit_log import AuditLogger
+from columnar import ARROW_STREAM, PASSTHROUGH_COLUMNS, read_ipc, records, score_columns, write_ipc
+from drift_monitor import DriftMonitor, load_reference
+from micro_batching import MicroBatcher
+from model_registry import CanaryError, ModelRegistry, ModelVersion
+from model_utils import (
+    CATEGORY_VALUES,
+    DRIFT_REFERENCE_PATH,
+    FEATURES,
+    MODEL_BUNDLE_PATH,
+    MODEL_COST_PATH,
+    MODEL_TIME_PATH,
+    VENDOR_STATS_PATH,
+    load_artifact,
+    load_bundle,
+    validate_frame,
+)
+from prediction_cache import PredictionCache
+from risk_rules import load_risk_rules
+from sampling_profiler import profile_for
+from service_metrics import REQUEST_STARTED, SIZE_BUCKETS, MetricsMiddleware, Registry
+from vendor_stats import load_vendor_stats
+
+logger = logging.getLogger(__name__)
+
+MODEL_PATHS = (MODEL_COST_PATH, MODEL_TIME_PATH)
+# Written by train_model.py; preferred over MODEL_PATHS when present.
+BUNDLE_PATH = MODEL_BUNDLE_PATH
+
+# Load, compile and warm both models at startup instead of on the first request.
+EAGER_LOAD = os.getenv('POWERGRID_EAGER_LOAD', '1') == '1'
+# Memory-map numpy arrays stored in the artifacts instead of copying them.
+MMAP_MODE = 'r' if os.getenv('POWERGRID_MMAP_ARTIFACTS', '1') == '1' else None
+# XGBoost threads per prediction; 0 leaves XGBoost's default (all cores). serve_workers.py sets it per worker.
+PREDICT_THREADS = int(os.getenv('POWERGRID_PREDICT_THREADS', '0'))
+
+# Opt-in micro-batching of concurrent /predict and /predict_cost_overrun calls.
+MICROBATCH_ENABLED = os.getenv('POWERGRID_MICROBATCH', '0') == '1'
+MICROBATCH_WINDOW_MS = float(os.getenv('POWERGRID_BATCH_WINDOW_MS', '2'))
+MICROBATCH_MAX_SIZE = int(os.getenv('POWERGRID_BATCH_MAX_SIZE', '64'))
+
+# Full-result cache; POWERGRID_CACHE_SIZE=0 disables it.
+CACHE_SIZE = int(os.getenv('POWERGRID_CACHE_SIZE', '10000'))
+CACHE_TTL_SECONDS = float(os.getenv('POWERGRID_CACHE_TTL_SECONDS', '3600'))
+# How often the background watcher re-checks the artifact files for changes.
+ARTIFACT_CHECK_SECONDS = float(os.getenv('POWERGRID_ARTIFACT_CHECK_SECONDS', '1'))
+HOT_RELOAD = os.getenv('POWERGRID_HOT_RELOAD', '1') == '1'
+# Previous model versions kept in memory for instant rollback.
+MODEL_HISTORY = int(os.getenv('POWERGRID_MODEL_HISTORY', '3'))
+# A new version is rejected if its mean |probability change| on the canary batch exceeds this.
+CANARY_MAX_SHIFT = float(os.getenv('POWERGRID_CANARY_MAX_SHIFT', '0.2'))
+
+# Audit log of every scored payload and its result; unset POWERGRID_AUDIT_LOG disables it.
+AUDIT_LOG_PATH = os.getenv('POWERGRID_AUDIT_LOG', '')
+AUDIT_QUEUE_SIZE = int(os.getenv('POWERGRID_AUDIT_QUEUE_SIZE', '10000'))
+# 'block' waits for queue space so no record is lost; 'drop' never slows requests but loses records under load.
+AUDIT_POLICY = os.getenv('POWERGRID_AUDIT_POLICY', 'block')
+AUDIT_MAX_BYTES = int(os.getenv('POWERGRID_AUDIT_MAX_BYTES', str(100 * 1024 * 1024)))
+AUDIT_ROTATE_SECONDS = float(os.getenv('POWERGRID_AUDIT_ROTATE_SECONDS', '3600'))
+AUDIT_COMPRESS = os.getenv('POWERGRID_AUDIT_COMPRESS', '0') == '1'
+
+# Largest grid /sweep will score in one request.
+SWEEP_MAX_POINTS = int(os.getenv('POWERGRID_SWEEP_MAX_POINTS', '100000'))
+
+# /simulate_portfolio bounds: projects x scenarios per request, and simulation
+# processes (forked from the server; large runs belong in the CLI).
+PORTFOLIO_MAX_DRAWS = int(os.getenv('POWERGRID_PORTFOLIO_MAX_DRAWS', '200000000'))
+PORTFOLIO_WORKERS = int(os.getenv('POWERGRID_PORTFOLIO_WORKERS', '1'))
+
+# YAML config whose risk_rules section replaces the built-in risk-factor table (see risk_rules.py).
+RISK_RULES_PATH = os.getenv('POWERGRID_RISK_RULES', '')
+
+# Live traffic is compared with the training-time profile in DRIFT_REFERENCE_PATH over the
+# last POWERGRID_DRIFT_WINDOWS windows of POWERGRID_DRIFT_WINDOW_SECONDS each.
+DRIFT_ENABLED = os.getenv('POWERGRID_DRIFT_MONITOR', '1') == '1'
+DRIFT_WINDOW_SECONDS = float(os.getenv('POWERGRID_DRIFT_WINDOW_SECONDS', '300'))
+DRIFT_WINDOWS = int(os.getenv('POWERGRID_DRIFT_WINDOWS', '12'))
+# Features with fewer observations than this are reported without a score.
+DRIFT_MIN_ROWS = int(os.getenv('POWERGRID_DRIFT_MIN_ROWS', '100'))
+
+# POST /debug/profile samples the live process; off unless explicitly enabled.
+PROFILING_ENABLED = os.getenv('POWERGRID_PROFILING', '0') == '1'
+
+_batcher: MicroBatcher | None = None
+_audit: AuditLogger | None = None
+_drift: DriftMonitor | None = None
+# (size, mtime) of the reference file _drift was built from.
+_drift_file: tuple[int, int] | None = None
+_drift_lock = threading.Lock()
+_ready = threading.Event()
+_startup: dict = {'warmup_seconds': None, 'error': None}
+_prediction_cache = PredictionCache(CACHE_SIZE, CACHE_TTL_SECONDS) if CACHE_SIZE > 0 else None
+_risk_rules = load_risk_rules(RISK_RULES_PATH)
+
+METRICS = Registry()
+_stage_seconds = METRICS.histogram(
+    'powergrid_stage_seconds', 'Latency of each prediction stage (per row for per-row stages).', ('stage',)
+)
+_http_requests = METRICS.counter('powergrid_http_requests_total', 'HTTP requests by route and status.', ('route', 'status'))
+_http_seconds = METRICS.histogram('powergrid_http_request_seconds', 'End-to-end HTTP request latency.', ('route',))
+_scored_rows = METRICS.histogram(
+    'powergrid_model_batch_rows', 'Rows per vectorized (batch or micro-batch) model invocation.', buckets=SIZE_BUCKETS
+)
+_predictions = METRICS.counter('powergrid_predictions_total', 'Predictions served, by source.', ('source',))
+_warmup_seconds = METRICS.gauge('powergrid_warmup_seconds', 'Duration of the startup load and warm-up.')
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _batcher, _audit
+    warmup = asyncio.create_task(run_in_threadpool(_warm_up)) if EAGER_LOAD else None
+    if AUDIT_LOG_PATH:
+        _audit = AuditLogger(
+            AUDIT_LOG_PATH,
+            max_queue=AUDIT_QUEUE_SIZE,
+            policy=AUDIT_POLICY,
+            max_bytes=AUDIT_MAX_BYTES,
+            rotate_seconds=AUDIT_ROTATE_SECONDS,
+            compress=AUDIT_COMPRESS,
+        )
+        _audit.start()
+    if HOT_RELOAD:
+        _registry.start()
+    drift_watch = asyncio.create_task(_watch_drift_reference()) if HOT_RELOAD and DRIFT_ENABLED else None
+    if MICROBATCH_ENABLED:
+        _batcher = MicroBatcher(
+            _predict_batch,
+            window_ms=MICROBATCH_WINDOW_MS,
+            max_batch_size=MICROBATCH_MAX_SIZE,
+        )
+        await _batcher.start()
+    try:
+        yield
+    finally:
+        if warmup is not None:
+            await asyncio.gather(warmup, return_exceptions=True)
+        await run_in_threadpool(_registry.stop)
+        if drift_watch is not None:
+            drift_watch.cancel()
+            await asyncio.gather(drift_watch, return_exceptions=True)
+        if _batcher is not None:
+            await _batcher.stop()
+            _batcher = None
+        if _audit is not None:
+            await run_in_threadpool(_audit.close)
+            _audit = None
+
+
+class _ORJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+# Endpoints returning large bodies build the response themselves: FastAPI runs
+# jsonable_encoder over plain dict results, which costs far more than orjson.
+app = FastAPI(title='POWERGRID Cost & Timeline Predictor', lifespan=lifespan,
+              default_response_class=_ORJSONResponse)
+app.add_middleware(MetricsMiddleware, requests=_http_requests, latency=_http_seconds)
+
+
+def _read_artifacts():
+    if _artifact_paths() == (BUNDLE_PATH,):
+        models = load_bundle(BUNDLE_PATH, mmap_mode=MMAP_MODE)
+    else:
+        models = (load_artifact(MODEL_PATHS[0], mmap_mode=MMAP_MODE),
+                  load_artifact(MODEL_PATHS[1], mmap_mode=MMAP_MODE))
+    _apply_predict_threads(models)
+    return models
+
+
+def _apply_predict_threads(models):
+    if PREDICT_THREADS > 0:
+        for model in models:
+            model.named_steps['clf'].get_booster().set_param('nthread', PREDICT_THREADS)
+
+
+def _set_predict_threads(threads: int):
+    """Thread budget for every in-memory model version and for versions loaded later.
+
+    Not safe while requests are being served; call it before the server starts.
+    """
+    global PREDICT_THREADS
+    PREDICT_THREADS = threads
+    for version in _registry.loaded():
+        _apply_predict_threads(version.models)
+
+
+def _artifact_paths() -> tuple[str, ...]:
+    return (BUNDLE_PATH,) if os.path.exists(BUNDLE_PATH) else MODEL_PATHS
+
+
+def _artifact_fingerprint() -> str:
+    digest = hashlib.sha1()
+    for path in _artifact_paths() + (VENDOR_STATS_PATH,):
+        if path == VENDOR_STATS_PATH and not os.path.exists(path):
+            continue
+        stat = os.stat(path)
+        digest.update(f'{path}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+    return digest.hexdigest()[:12]
+
+
+@lru_cache(maxsize=1)
+def _canary_payloads() -> list['ProjectIn']:
+    # Every categorical level appears, with numeric values spread over their valid ranges.
+    combos = itertools.product(*(CATEGORY_VALUES[name] for name in (
+        'project_type', 'terrain', 'regulatory_risk', 'season', 'market_condition'
+    )))
+    vendors = CATEGORY_VALUES['vendor']
+    return [
+        ProjectIn(
+            project_type=project_type,
+            terrain=terrain,
+            regulatory_risk=regulatory_risk,
+            season=season,
+            market_condition=market_condition,
+            vendor=vendors[i % len(vendors)],
+            planned_days=10 + (i * 37) % 1991,
+            planned_cost=1_000_000.0 * (1 + i % 100),
+            vendor_rating=1.0 + (i % 41) / 10,
+        )
+        for i, (project_type, terrain, regulatory_risk, season, market_condition) in enumerate(combos)
+    ]
+
+
+def _validate_canary(candidate: ModelVersion, current: ModelVersion | None) -> dict:
+    """Score the canary batch with a candidate version before it serves traffic.
+
+    Both the batch and the single-row paths are exercised, which also warms
+    the candidate's prediction buffers.
+    """
+    payloads = _canary_payloads()
+    report = {'rows': len(payloads)}
+    for i, target in enumerate(('cost_overrun', 'time_overrun')):
+        predictor = candidate.predictors[i]
+        probs = predictor.positive_proba(predictor.encoder.encode(payloads))
+        if not np.isfinite(probs).all() or probs.min() < 0.0 or probs.max() > 1.0:
+            raise CanaryError(f'{target}: probabilities outside [0, 1]')
+        single = predictor.positive_proba(predictor.encoder.encode_one(payloads[0]))[0]
+        if abs(single - probs[0]) > 1e-6:
+            raise CanaryError(f'{target}: single-row and batch predictions disagree')
+        report[f'{target}_mean_probability'] = float(probs.mean())
+        if current is not None:
+            previous = current.predictors[i]
+            shift = float(np.abs(probs - previous.positive_proba(previous.encoder.encode(payloads))).mean())
+            report[f'{target}_mean_abs_shift'] = shift
+            if shift > CANARY_MAX_SHIFT:
+                raise CanaryError(
+                    f'{target}: mean probability shift {shift:.3f} exceeds {CANARY_MAX_SHIFT} on the canary batch'
+                )
+    return report
+
+
+def _on_swap(version: ModelVersion):
+    # Entries are keyed by version, so this only frees memory; results that
+    # in-flight requests put for the old version can never be served.
+    if _prediction_cache is not None:
+        _prediction_cache.clear()
+
+
+def _refresh_drift_monitor():
+    """Follow DRIFT_REFERENCE_PATH; a stat call when the file is unchanged.
+
+    The reference is watched apart from the model artifacts: rebuilding it
+    only replaces the drift monitor, never reloads or re-canaries the models.
+    """
+    global _drift, _drift_file
+    if not DRIFT_ENABLED:
+        return
+    try:
+        stat = os.stat(DRIFT_REFERENCE_PATH)
+        signature = (stat.st_size, stat.st_mtime_ns)
+    except FileNotFoundError:
+        signature = None
+    if signature == _drift_file:
+        return
+    with _drift_lock:
+        if signature == _drift_file:
+            return
+        reference = load_reference(DRIFT_REFERENCE_PATH)
+        if reference is None:
+            _drift = None
+        elif _drift is None or _drift.reference != reference:
+            # A new training run has new bins: counting restarts against it.
+            _drift = DriftMonitor(reference, DRIFT_WINDOW_SECONDS, DRIFT_WINDOWS)
+        _drift_file = signature
+
+
+async def _watch_drift_reference():
+    while True:
+        await asyncio.sleep(ARTIFACT_CHECK_SECONDS)
+        try:
+            await run_in_threadpool(_refresh_drift_monitor)
+        except Exception:
+            logger.exception('Drift reference reload failed; keeping the current one')
+
+
+_refresh_drift_monitor()
+
+
+_registry = ModelRegistry(
+    _read_artifacts,
+    _artifact_fingerprint,
+    _validate_canary,
+    history=MODEL_HISTORY,
+    check_seconds=ARTIFACT_CHECK_SECONDS,
+    on_swap=_on_swap,
+    load_vendor_stats=lambda: load_vendor_stats(VENDOR_STATS_PATH),
+)
+
+
+def _model_version() -> ModelVersion:
+    """The version serving new requests; callers hold on to it for the whole request."""
+    return _registry.ensure_current()
 
-from model_utils import load_artifact
 
-app = FastAPI(title='POWERGRID Cost & Timeline Predictor')
+def _load_models():
+    return _model_version().models
 
 
-@lru_cache(maxsize=2)
-def _load_models():
-    model_cost = load_artifact('artifacts/model_cost.pkl')
-    model_time = load_artifact('artifacts/model_time.pkl')
-    return model_cost, model_time
+def _load_predictors():
+    return _model_version().predictors
 
 
 class ProjectIn(BaseModel):
@@ -32,137 +357,583 @@ class ProjectIn(BaseModel):
     market_condition: Literal['Stable', 'Volatile']
 
 
-def _vendor_index(vendor: str) -> int:
-    return int(vendor.split('_')[1])
-
-
-def _vendor_cohort_risk(vendor: str) -> str:
-    idx = _vendor_index(vendor)
-    if idx <= 6:
-        return 'low'
-    if idx <= 14:
-        return 'medium'
-    return 'high'
-
-
-def _key_risk_factors(payload: ProjectIn, cost_prob: float, time_prob: float) -> list[str]:
-    factors: list[tuple[int, str]] = []
-
-    if payload.regulatory_risk == 'High':
-        factors.append((100, 'High regulatory approval complexity'))
-    elif payload.regulatory_risk == 'Medium':
-        factors.append((75, 'Moderate regulatory clearance risk'))
-
-    if payload.market_condition == 'Volatile':
-        factors.append((85, 'Volatile market may increase material and execution risk'))
-    if payload.season == 'Monsoon':
-        factors.append((80, 'Monsoon season can delay on-site execution'))
-    elif payload.season == 'Winter':
-        factors.append((40, 'Winter season may slow field productivity'))
-
-    if payload.terrain in {'hilly', 'forest'}:
-        factors.append((62, f'Complex terrain ({payload.terrain}) increases execution difficulty'))
-    elif payload.terrain == 'urban':
-        factors.append((45, 'Urban terrain may involve right-of-way and utility conflicts'))
-
-    if payload.vendor_rating < 3.0:
-        factors.append((92, 'Low vendor rating indicates high delivery risk'))
-    elif payload.vendor_rating < 3.8:
-        factors.append((60, 'Mid vendor rating indicates moderate delivery variance'))
-
-    cohort = _vendor_cohort_risk(payload.vendor)
-    if cohort == 'high':
-        factors.append((65, f'{payload.vendor} belongs to higher-risk vendor cohort'))
-    elif cohort == 'medium':
-        factors.append((48, f'{payload.vendor} belongs to medium-risk vendor cohort'))
-
-    if payload.planned_days > 300:
-        factors.append((50, 'Long planned duration increases schedule slippage exposure'))
-
-    if payload.project_type == 'substation' and payload.planned_cost > 60_000_000:
-        factors.append((52, 'Large substation budget increases cost sensitivity'))
-    elif payload.project_type == 'underground_cable' and payload.planned_cost > 25_000_000:
-        factors.append((52, 'Large underground cable budget increases cost sensitivity'))
-    elif payload.project_type == 'overhead_line' and payload.planned_cost > 15_000_000:
-        factors.append((52, 'Large overhead line budget increases cost sensitivity'))
-
-    if cost_prob > 0.7:
-        factors.append((64, 'Model indicates high cost-overrun probability'))
-    if time_prob > 0.7:
-        factors.append((64, 'Model indicates high timeline-overrun probability'))
-
-    if not factors:
-        return ['Balanced profile: no major risk drivers triggered']
-
-    factors.sort(key=lambda x: x[0], reverse=True)
-    return [label for _, label in factors[:4]]
-
-
-def _vendor_info(payload: ProjectIn) -> dict:
-    cohort = _vendor_cohort_risk(payload.vendor)
-    if payload.vendor_rating >= 4.3:
-        rating_band = 'Strong'
-        note = 'Strong historical rating; maintain current controls.'
-    elif payload.vendor_rating >= 3.5:
-        rating_band = 'Watchlist'
-        note = 'Acceptable rating; monitor milestones closely.'
-    else:
-        rating_band = 'Critical'
-        note = 'Low rating; enforce strict governance and contingency.'
+class SweepAxis(BaseModel):
+    """One swept field: explicit ``values``, or ``num`` evenly spaced numbers from ``start`` to ``stop``."""
 
-    cohort_note = {
-        'low': 'Vendor cohort is generally stable.',
-        'medium': 'Vendor cohort has mixed reliability.',
-        'high': 'Vendor cohort is historically volatile.',
-    }[cohort]
+    model_config = ConfigDict(extra='forbid')
 
-    return {
-        'vendor': payload.vendor,
-        'vendor_rating': payload.vendor_rating,
-        'vendor_rating_band': rating_band,
-        'vendor_cohort_risk': cohort,
-        'notes': [note, cohort_note],
-    }
+    field: Literal[
+        'project_type', 'terrain', 'planned_days', 'planned_cost', 'regulatory_risk',
+        'season', 'vendor', 'vendor_rating', 'market_condition',
+    ]
+    values: list[str | float] | None = Field(default=None, min_length=1)
+    start: float | None = None
+    stop: float | None = None
+    num: int | None = Field(default=None, ge=1)
+
+    @model_validator(mode='after')
+    def _check_spec(self):
+        has_range = None not in (self.start, self.stop, self.num)
+        if (self.values is None) == (not has_range):
+            raise ValueError('give either values or start, stop and num')
+        if has_range and self.field in CATEGORY_VALUES:
+            raise ValueError(f'{self.field} is categorical; give values')
+        return self
+
+    def expand(self) -> list:
+        if self.values is not None:
+            return list(self.values)
+        values = np.linspace(self.start, self.stop, self.num)
+        if self.field == 'planned_days':
+            return np.unique(np.round(values).astype(int)).tolist()
+        return values.tolist()
+
+
+class SweepIn(BaseModel):
+    model_config = ConfigDict(extra='forbid')
 
+    base: ProjectIn
+    axes: list[SweepAxis] = Field(min_length=1, max_length=2)
 
-def _predict(payload: ProjectIn) -> dict:
-    model_cost, model_time = _load_models()
-    df = pd.DataFrame([payload.model_dump()])
 
-    cost_prob = float(model_cost.predict_proba(df)[:, 1][0])
-    time_prob = float(model_time.predict_proba(df)[:, 1][0])
+class PortfolioIn(BaseModel):
+    model_config = ConfigDict(extra='forbid')
 
+    projects: list[ProjectIn] = Field(min_length=1)
+    scenarios: int = Field(default=10_000, ge=1)
+    seed: int = Field(default=0, ge=0)
+    calibrate: bool = True
+    market_correlation: float = Field(default=0.5, ge=0.0, le=1.0)
+    vendor_correlation: float = Field(default=0.5, ge=0.0, le=1.0)
+    top: int = Field(default=10, ge=1, le=1000)
+
+
+def _prediction_result(payload: ProjectIn, cost_prob: float, time_prob: float, version: ModelVersion) -> dict:
+    # Chained timestamps rather than context managers keep the per-row cost to
+    # one perf_counter() call per stage.
+    t0 = time.perf_counter()
+    factors = _risk_rules.key_risk_factors_one(payload, cost_prob, time_prob, version.vendor_stats)
+    t1 = time.perf_counter()
+    vendor_info = _risk_rules.vendor_info_one(payload, version.vendor_stats)
+    t2 = time.perf_counter()
+    _stage_seconds.observe(t1 - t0, 'key_risk_factors')
+    _stage_seconds.observe(t2 - t1, 'vendor_info')
+    return _result(cost_prob, time_prob, factors, vendor_info, version)
+
+
+def _result(cost_prob: float, time_prob: float, factors: list[str], vendor_info: dict, version: ModelVersion) -> dict:
     return {
         'cost_overrun_probability': cost_prob,
         'cost_overrun_predicted': int(cost_prob > 0.5),
         'time_overrun_probability': time_prob,
         'time_overrun_predicted': int(time_prob > 0.5),
-        'key_risk_factors': _key_risk_factors(payload, cost_prob, time_prob),
-        'vendor_info': _vendor_info(payload),
+        'key_risk_factors': factors,
+        'vendor_info': vendor_info,
+        'model_version': version.version,
     }
 
 
+def _cache_key(model_version: str, payload: ProjectIn) -> tuple:
+    # Validated payloads are already normalized (ints, floats, literals), so
+    # the field values in declaration order are a canonical key.
+    return (model_version, *(getattr(payload, name) for name in ProjectIn.model_fields))
+
+
+def _score_batch(payloads: list[ProjectIn], version: ModelVersion) -> list[dict]:
+    predictor_cost, predictor_time = version.predictors
+    _scored_rows.observe(len(payloads))
+    _predictions.inc('model', amount=len(payloads))
+
+    with _stage_seconds.time('encode_batch'):
+        X = predictor_cost.encoder.encode(payloads)
+        if predictor_time.encoder is not predictor_cost.encoder:
+            X_time = predictor_time.encoder.encode(payloads)
+        else:
+            X_time = X
+    with _stage_seconds.time('predict_cost_overrun_batch'):
+        cost_probs = predictor_cost.positive_proba(X).tolist()
+    with _stage_seconds.time('predict_time_overrun_batch'):
+        time_probs = predictor_time.positive_proba(X_time).tolist()
+
+    # The rule table is evaluated once over the whole batch.
+    columns = {field: [getattr(payload, field) for payload in payloads] for field in _risk_rules.fields}
+    with _stage_seconds.time('key_risk_factors_batch'):
+        factors = _risk_rules.key_risk_factors(columns, cost_probs, time_probs, version.vendor_stats)
+    with _stage_seconds.time('vendor_info_batch'):
+        vendor_info = _risk_rules.vendor_info(columns, version.vendor_stats)
+    return [
+        _result(cost_prob, time_prob, row_factors, row_info, version)
+        for cost_prob, time_prob, row_factors, row_info in zip(cost_probs, time_probs, factors, vendor_info)
+    ]
+
+
+def _predict_batch(payloads: list[ProjectIn]) -> list[dict]:
+    if not payloads:
+        return []
+    version = _model_version()
+    if _prediction_cache is None:
+        return _score_batch(payloads, version)
+
+    with _stage_seconds.time('cache_lookup_batch'):
+        keys = [_cache_key(version.version, payload) for payload in payloads]
+        results = [_prediction_cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+    _predictions.inc('cache', amount=len(payloads) - len(missing))
+    if missing:
+        scored = _score_batch([payloads[i] for i in missing], version)
+        for i, result in zip(missing, scored):
+            results[i] = result
+            _prediction_cache.put(keys[i], result)
+    return results
+
+
+def _predict(payload: ProjectIn) -> dict:
+    version = _model_version()
+    if _prediction_cache is not None:
+        t0 = time.perf_counter()
+        key = _cache_key(version.version, payload)
+        cached = _prediction_cache.get(key)
+        _stage_seconds.observe(time.perf_counter() - t0, 'cache_lookup')
+        if cached is not None:
+            _predictions.inc('cache')
+            return cached
+
+    predictor_cost, predictor_time = version.predictors
+    _predictions.inc('model')
+    t0 = time.perf_counter()
+    row = predictor_cost.encoder.encode_one(payload)
+    t1 = time.perf_counter()
+    cost_prob = float(predictor_cost.positive_proba(row)[0])
+    t2 = time.perf_counter()
+    encode_seconds = t1 - t0
+    if predictor_time.encoder is not predictor_cost.encoder:
+        row = predictor_time.encoder.encode_one(payload)
+        t3 = time.perf_counter()
+        encode_seconds += t3 - t2
+    else:
+        t3 = t2
+    time_prob = float(predictor_time.positive_proba(row)[0])
+    t4 = time.perf_counter()
+    _stage_seconds.observe(encode_seconds, 'encode')
+    _stage_seconds.observe(t2 - t1, 'predict_cost_overrun')
+    _stage_seconds.observe(t4 - t3, 'predict_time_overrun')
+    result = _prediction_result(payload, cost_prob, time_prob, version)
+
+    if _prediction_cache is not None:
+        _prediction_cache.put(key, result)
+    return result
+
+
+def _explain_batch(payloads: list[ProjectIn], approximate: bool = False) -> list[dict]:
+    if not payloads:
+        return []
+    version = _model_version()
+    predictor_cost, predictor_time = version.predictors
+    explanations = [{'contribution_units': 'log_odds', 'model_version': version.version} for _ in payloads]
+    data = None
+    for target, predictor in (('cost_overrun', predictor_cost), ('time_overrun', predictor_time)):
+        if data is None or predictor.encoder is not predictor_cost.encoder:
+            X = predictor.encoder.encode(payloads)
+            data = xgb.DMatrix(X, missing=predictor.missing)
+        probs = predictor.positive_proba(X).tolist()
+        contribs = predictor.contributions(data, approximate=approximate).tolist()
+        names = predictor.encoder.feature_names
+        for explanation, prob, row in zip(explanations, probs, contribs):
+            explanation[f'{target}_probability'] = prob
+            explanation.setdefault('contributions', {})[target] = {
+                'base_value': row[-1],
+                'features': dict(zip(names, row[:-1])),
+            }
+    return explanations
+
+
+def _warm_up():
+    """Load, compile and canary-validate the models before the first request.
+
+    The canary batch runs both the single-row and the batch path, so XGBoost's
+    prediction buffers and thread pool are set up here rather than on the
+    first request. Nothing is written to the prediction cache or counters.
+    """
+    started = time.perf_counter()
+    try:
+        _model_version()
+    except Exception as exc:
+        _startup['error'] = f'{type(exc).__name__}: {exc}'
+        logger.exception('Model warm-up failed')
+        raise
+    _startup['warmup_seconds'] = time.perf_counter() - started
+    _startup['error'] = None
+    _warmup_seconds.set(_startup['warmup_seconds'])
+    _ready.set()
+
+
+async def _predict_async(payload: ProjectIn) -> dict:
+    if _batcher is not None:
+        return await _batcher.submit(payload)
+    return await run_in_threadpool(_predict, payload)
+
+
+def _observe_request_parsing():
+    # Time from the request entering the app to the handler running: body
+    # read, JSON decoding and ProjectIn validation.
+    started = REQUEST_STARTED.get()
+    if started is not None:
+        _stage_seconds.observe(time.perf_counter() - started, 'parse_validate')
+
+
+async def _audit_async(endpoint: str, request, response):
+    # Never block the event loop: only fall back to a worker thread when the
+    # queue is full and the policy is to wait for space.
+    if _audit is not None and not _audit.try_log(endpoint, request, response):
+        await run_in_threadpool(_audit.log, endpoint, request, response)
+
+
 @app.get('/health')
 def health():
-    _load_models()
+    _load_predictors()
     return {'status': 'ok'}
 
 
+@app.get('/ready')
+async def ready():
+    if not _ready.is_set() and not EAGER_LOAD:
+        # Without eager loading, the first readiness probe does the warm-up.
+        try:
+            await run_in_threadpool(_warm_up)
+        except Exception:
+            pass
+    body = {'ready': _ready.is_set(), **_startup}
+    return JSONResponse(body, status_code=200 if _ready.is_set() else 503)
+
+
 @app.post('/predict')
-def predict(payload: ProjectIn):
-    return _predict(payload)
+async def predict(payload: ProjectIn):
+    _observe_request_parsing()
+    result = await _predict_async(payload)
+    if (drift := _drift) is not None:
+        drift.observe(payload, result['cost_overrun_probability'], result['time_overrun_probability'])
+    await _audit_async('/predict', payload, result)
+    return _ORJSONResponse(result)
 
 
-@app.post('/predict_cost_overrun')
-def predict_cost_overrun(payload: ProjectIn):
-    result = _predict(payload)
+def _cost_overrun_response(result: dict) -> dict:
+    """The backward-compatible /predict_cost_overrun body, from a /predict result."""
     return {
         'probability': result['cost_overrun_probability'],
         'predicted_overrun': result['cost_overrun_predicted'],
         'key_risk_factors': result['key_risk_factors'],
         'vendor_info': result['vendor_info'],
+        'model_version': result['model_version'],
+    }
+
+
+@app.post('/predict_cost_overrun')
+async def predict_cost_overrun(payload: ProjectIn):
+    _observe_request_parsing()
+    result = await _predict_async(payload)
+    if (drift := _drift) is not None:
+        drift.observe(payload, result['cost_overrun_probability'], result['time_overrun_probability'])
+    response = _cost_overrun_response(result)
+    await _audit_async('/predict_cost_overrun', payload, response)
+    return _ORJSONResponse(response)
+
+
+@app.post('/predict_batch')
+def predict_batch(payloads: list[ProjectIn]):
+    _observe_request_parsing()
+    response = {'predictions': _predict_batch(payloads)}
+    if (drift := _drift) is not None and payloads:
+        predictions = response['predictions']
+        drift.observe_columns(
+            {name: [getattr(payload, name) for payload in payloads] for name in FEATURES},
+            [result['cost_overrun_probability'] for result in predictions],
+            [result['time_overrun_probability'] for result in predictions],
+        )
+    if _audit is not None:
+        _audit.log('/predict_batch', payloads, response)
+    return _ORJSONResponse(response)
+
+
+def _score_arrow(body: bytes) -> bytes:
+    with _stage_seconds.time('decode_arrow'):
+        try:
+            frame = read_ipc(body)
+        except pa.ArrowInvalid as exc:
+            raise HTTPException(status_code=422, detail=f'Invalid Arrow IPC stream: {exc}')
+    unknown = sorted(set(frame.columns) - set(FEATURES) - set(PASSTHROUGH_COLUMNS))
+    missing = [col for col in FEATURES if col not in frame]
+    if unknown or missing:
+        raise HTTPException(status_code=422, detail=f'Missing columns: {missing}; unknown columns: {unknown}')
+    version = _model_version()
+    with _stage_seconds.time('score_columnar'):
+        results = score_columns(frame, version.predictors, version.vendor_stats, _risk_rules)
+    valid = (results['error'] == '').to_numpy()
+    scored = int(valid.sum())
+    _scored_rows.observe(scored)
+    _predictions.inc('model', amount=scored)
+    if (drift := _drift) is not None and scored:
+        drift.observe_columns(frame[valid], results['cost_overrun_probability'][valid],
+                              results['time_overrun_probability'][valid])
+    if _audit is not None:
+        _audit.log('/predict_batch_arrow', records(frame), {'predictions': records(results)})
+    with _stage_seconds.time('encode_arrow'):
+        return write_ipc(results, {'model_version': version.version})
+
+
+@app.post('/predict_batch_arrow', response_class=Response)
+async def predict_batch_arrow(request: Request):
+    """Score an Arrow IPC stream of projects column by column; the results come back as an Arrow IPC stream."""
+    content_type = request.headers.get('content-type', '').split(';')[0].strip()
+    if content_type != ARROW_STREAM:
+        raise HTTPException(status_code=415, detail=f'Send an Arrow IPC stream as {ARROW_STREAM}')
+    body = await request.body()
+    return Response(await run_in_threadpool(_score_arrow, body), media_type=ARROW_STREAM)
+
+
+@app.post('/explain')
+def explain(payload: ProjectIn, approximate: bool = False):
+    result = _explain_batch([payload], approximate)[0]
+    if _audit is not None:
+        _audit.log(_explain_endpoint('/explain', approximate), payload, result)
+    return _ORJSONResponse(result)
+
+
+@app.post('/explain_batch')
+def explain_batch(payloads: list[ProjectIn], approximate: bool = False):
+    response = {'explanations': _explain_batch(payloads, approximate)}
+    if _audit is not None:
+        _audit.log(_explain_endpoint('/explain_batch', approximate), payloads, response)
+    return _ORJSONResponse(response)
+
+
+def _explain_endpoint(path: str, approximate: bool) -> str:
+    # The query parameter changes the result, so it is part of the recorded endpoint.
+    return f'{path}?approximate=true' if approximate else path
+
+
+def _sweep(request: SweepIn) -> dict:
+    fields = [axis.field for axis in request.axes]
+    if len(set(fields)) != len(fields):
+        raise HTTPException(status_code=422, detail='Sweep axes must be different fields')
+    axis_values = [axis.expand() for axis in request.axes]
+    shape = tuple(len(values) for values in axis_values)
+    n_points = int(np.prod(shape))
+    if n_points > SWEEP_MAX_POINTS:
+        raise HTTPException(status_code=422, detail=f'Sweep has {n_points} points; the limit is {SWEEP_MAX_POINTS}')
+
+    # Validate each axis once (not each grid point) with the same rules as ProjectIn.
+    base = request.base.model_dump()
+    for field, values in zip(fields, axis_values):
+        frame = pd.DataFrame({name: [base[name]] * len(values) for name in FEATURES})
+        frame[field] = values
+        errors = validate_frame(frame)
+        if (errors != '').any():
+            bad = int(np.flatnonzero(errors != '')[0])
+            raise HTTPException(status_code=422, detail=f'{field}={values[bad]!r}: {errors[bad]}')
+    axis_values = [
+        [int(v) for v in values] if field == 'planned_days'
+        else [str(v) for v in values] if field in CATEGORY_VALUES
+        else [float(v) for v in values]
+        for field, values in zip(fields, axis_values)
+    ]
+
+    # Row-major grid: the last axis varies fastest.
+    grids = np.meshgrid(*(np.asarray(values, dtype=object) for values in axis_values), indexing='ij')
+    overrides = {field: grid.ravel() for field, grid in zip(fields, grids)}
+
+    version = _model_version()
+    predictor_cost, predictor_time = version.predictors
+    _scored_rows.observe(n_points)
+    with _stage_seconds.time('sweep_encode'):
+        X = predictor_cost.encoder.encode_variants(request.base, overrides)
+        if predictor_time.encoder is not predictor_cost.encoder:
+            X_time = predictor_time.encoder.encode_variants(request.base, overrides)
+        else:
+            X_time = X
+    with _stage_seconds.time('sweep_predict'):
+        cost_probs = predictor_cost.positive_proba(X).reshape(shape)
+        time_probs = predictor_time.positive_proba(X_time).reshape(shape)
+
+    return {
+        'model_version': version.version,
+        'axes': [{'field': field, 'values': values} for field, values in zip(fields, axis_values)],
+        'shape': list(shape),
+        'cost_overrun_probability': cost_probs.tolist(),
+        'time_overrun_probability': time_probs.tolist(),
     }
 
 
+@app.post('/sweep')
+def sweep(request: SweepIn):
+    """Score a one- or two-field what-if grid around a base project in one vectorized pass."""
+    _observe_request_parsing()
+    response = _sweep(request)
+    if _audit is not None:
+        _audit.log('/sweep', request, response)
+    return _ORJSONResponse(response)
+
+
+@app.post('/simulate_portfolio')
+def simulate_portfolio(request: PortfolioIn):
+    """Monte Carlo distribution of the portfolio's total cost and schedule overrun."""
+    _observe_request_parsing()
+    draws = len(request.projects) * request.scenarios
+    if draws > PORTFOLIO_MAX_DRAWS:
+        raise HTTPException(
+            status_code=422,
+            detail=f'{len(request.projects)} projects x {request.scenarios} scenarios = {draws} draws; '
+                   f'the limit is {PORTFOLIO_MAX_DRAWS}',
+        )
+    version = _model_version()
+    frame = pd.DataFrame([p.model_dump() for p in request.projects], columns=FEATURES)
+    with _stage_seconds.time('portfolio_simulation'):
+        report = portfolio_simulation.simulate(
+            frame,
+            scenarios=request.scenarios,
+            seed=request.seed,
+            workers=PORTFOLIO_WORKERS,
+            predictors=version.predictors,
+            calibrate=request.calibrate,
+            market_correlation=request.market_correlation,
+            vendor_correlation=request.vendor_correlation,
+            top=request.top,
+        )
+    report['model_version'] = version.version
+    if _audit is not None:
+        _audit.log('/simulate_portfolio', request, report)
+    return _ORJSONResponse(report)
+
+
+@app.get('/drift')
+def drift(windows: int | None = Query(None, ge=1, description='recent windows to merge (default: all kept)')):
+    """PSI and KS drift of recent /predict* traffic against the training-time reference profile."""
+    _refresh_drift_monitor()
+    if (monitor := _drift) is None:
+        raise HTTPException(status_code=404, detail='Drift monitoring is off or there is no reference profile '
+                                                    f'at {DRIFT_REFERENCE_PATH}; run train_model.py')
+    return monitor.report(windows, min_rows=DRIFT_MIN_ROWS)
+
+
+@app.get('/cache')
+def cache_stats():
+    if _prediction_cache is None:
+        return {'enabled': False}
+    return {'enabled': True, 'model_version': _model_version().version, **_prediction_cache.stats()}
+
+
+@app.get('/models')
+def models():
+    return {'versions': _registry.versions(), **_registry.stats()}
+
+
+@app.post('/models/reload')
+def reload_models():
+    """Load, validate and activate the artifacts on disk now, even if a previous attempt failed."""
+    try:
+        version = _registry.refresh(force=True)
+    except CanaryError as exc:
+        raise HTTPException(status_code=422, detail=f'Canary validation failed: {exc}') from exc
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f'Model load failed: {type(exc).__name__}: {exc}') from exc
+    return {'reloaded': version is not None, 'model_version': _model_version().version}
+
+
+@app.post('/models/rollback')
+def rollback_models(version: str | None = None):
+    try:
+        active = _registry.rollback(version)
+    except LookupError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return {'model_version': active.version}
+
+
+@app.get('/audit')
+def audit_stats():
+    if _audit is None:
+        return {'enabled': False}
+    return {'enabled': True, **_audit.stats()}
+
+
+@app.get('/batching')
+def batching_stats():
+    if _batcher is None:
+        return {'enabled': False}
+    return {'enabled': True, **_batcher.stats()}
+
+
+def _component_samples(component, fields: tuple[str, ...], label: str | None = None):
+    if component is None:
+        return []
+    stats = component.stats()
+    return [({label: field} if label else {}, stats[field]) for field in fields]
+
+
+METRICS.callback(
+    'powergrid_cache_entries', 'gauge', 'Entries in the prediction cache.',
+    lambda: _component_samples(_prediction_cache, ('size',)),
+)
+METRICS.callback(
+    'powergrid_cache_events_total', 'counter', 'Prediction cache lookups and removals by event.',
+    lambda: _component_samples(
+        _prediction_cache, ('hits', 'misses', 'evictions', 'expirations', 'invalidations'), 'event'
+    ),
+)
+METRICS.callback(
+    'powergrid_microbatch_queue_depth', 'gauge', 'Requests waiting for the micro-batcher.',
+    lambda: _component_samples(_batcher, ('queue_depth',)),
+)
+METRICS.callback(
+    'powergrid_microbatch_total', 'counter', 'Micro-batches run and items scored through them.',
+    lambda: _component_samples(_batcher, ('batches', 'items'), 'kind'),
+)
+METRICS.callback(
+    'powergrid_model_registry_events_total', 'counter', 'Model loads, failed loads, swaps and rollbacks.',
+    lambda: _component_samples(_registry, ('loads', 'failures', 'swaps', 'rollbacks'), 'event'),
+)
+METRICS.callback(
+    'powergrid_model_load_seconds', 'gauge', 'Load and compile time of the served model version.',
+    lambda: [({}, v.load_seconds)] if (v := _registry.current) is not None else [],
+)
+METRICS.callback(
+    'powergrid_model_info', 'gauge', 'The served model version (value is always 1).',
+    lambda: [({'version': v.version}, 1)] if (v := _registry.current) is not None else [],
+)
+
+
+def _drift_samples():
+    if (monitor := _drift) is None:
+        return []
+    features = monitor.report(min_rows=DRIFT_MIN_ROWS)['features']
+    return [({'feature': name}, entry['psi']) for name, entry in features.items() if entry['psi'] is not None]
+
+
+METRICS.callback(
+    'powergrid_drift_psi', 'gauge', 'Population stability index of recent traffic against the training profile.',
+    _drift_samples,
+)
+METRICS.callback(
+    'powergrid_audit_queue_depth', 'gauge', 'Audit records waiting to be written.',
+    lambda: _component_samples(_audit, ('queue_depth',)),
+)
+METRICS.callback(
+    'powergrid_audit_records_total', 'counter', 'Audit records by outcome.',
+    lambda: _component_samples(_audit, ('enqueued', 'written', 'dropped', 'write_errors'), 'outcome'),
+)
+
+
+@app.get('/metrics', response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(METRICS.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.post('/debug/profile', response_class=PlainTextResponse)
+def profile(seconds: float = Query(10.0, gt=0, le=120), interval_ms: float = Query(5.0, ge=1, le=1000)):
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail='Profiling is disabled; set POWERGRID_PROFILING=1')
+    return PlainTextResponse(profile_for(seconds, interval_ms / 1000.0))
+
+
 if __name__ == '__main__':
+    import uvicorn
+
     uvicorn.run(app, host='0.0.0.0', port=8000)
@@ -0,0 +1,273 @@
+"""Pre-fork multi-worker launcher for the prediction service.
+
+    python serve_workers.py --workers 4 [--threads-per-worker 2] [--port 8000]
+
+The parent process imports the service, loads, compiles and canary-validates
+the model version once and binds the listening socket; the workers are forked
+from it afterwards. Boosters, encoders and the vendor index are inherited
+copy-on-write, and with memory-mapped artifacts the numpy arrays are shared
+through the page cache, so each extra worker only adds its private pages
+(request buffers, caches, interpreter state) instead of another copy of the
+models. ``gc.freeze()`` before forking keeps the collector from writing to the
+inherited objects and un-sharing their pages.
+
+The CPUs the launcher may run on are split into one slice per worker: each
+worker is pinned to its slice and XGBoost predicts with that many threads, so
+workers neither compete for cores nor oversubscribe them. The parent restarts
+workers that exit, and every ``--report-seconds`` logs each worker's request
+rate, RSS and PSS (its fair share of the shared pages; the PSS of all
+processes adds up to the memory the service really uses). ``--stats`` also
+writes that report as JSON.
+
+A model reload (hot reload or ``/models/reload``) loads the new version in
+every worker separately, and those copies are private; restart the launcher to
+share the models again.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+import serve_model_fastapi as server
+
+logger = logging.getLogger('serve_workers')
+
+# A worker that exits sooner than this after starting is not restarted: the launcher shuts down instead.
+MIN_UPTIME_SECONDS = 5.0
+SHUTDOWN_TIMEOUT_SECONDS = 30.0
+
+
+def plan_workers(cpus: list[int], workers: int, threads: int | None = None) -> list[tuple[int, ...]]:
+    """The CPUs each worker is pinned to; its thread budget is the length of its slice.
+
+    By default the CPUs are divided evenly. With more workers (or threads)
+    than CPUs the slices wrap around and workers share CPUs.
+    """
+    if workers < 1:
+        raise ValueError('workers must be >= 1')
+    threads = threads or max(1, len(cpus) // workers)
+    return [tuple(cpus[(i * threads + j) % len(cpus)] for j in range(threads)) for i in range(workers)]
+
+
+def memory_usage(pid: int) -> dict:
+    """RSS, PSS and shared/private resident bytes of a process (Linux), or {} if unavailable."""
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            fields = {line.split(':')[0]: int(line.split()[1]) * 1024 for line in f if line.endswith('kB\n')}
+    except OSError:
+        return {}
+    return {
+        'rss_bytes': fields.get('Rss', 0),
+        'pss_bytes': fields.get('Pss', 0),
+        'shared_bytes': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+        'private_bytes': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+
+def _audit_path(path: str, worker: int) -> str:
+    # Workers must not rotate each other's files: logs/requests.jsonl -> logs/requests.w0.jsonl
+    root, ext = os.path.splitext(path)
+    return f'{root}.w{worker}{ext}'
+
+
+class _CountingApp:
+    """ASGI wrapper counting the HTTP requests a worker has finished, in a slot of shared memory."""
+
+    def __init__(self, app, counters, slot: int):
+        self.app = app
+        self.counters = counters
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if scope['type'] == 'http':
+                # Only this worker's event loop writes its slot.
+                self.counters[self.slot] += 1
+
+
+class WorkerPool:
+    def __init__(self, sock: socket.socket, plans: list[tuple[int, ...]], pin: bool = True,
+                 log_level: str = 'info'):
+        self.sock = sock
+        self.plans = plans
+        self.pin = pin
+        self.log_level = log_level
+        self.counters = multiprocessing.RawArray('q', len(plans))
+        self.pids: dict[int, int] = {}  # pid -> worker
+        self.started = [0.0] * len(plans)
+        self.restarts = [0] * len(plans)
+        self._stopping = False
+        self._last_report = (time.monotonic(), [0] * len(plans))
+
+    def spawn(self, worker: int):
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                self._run_worker(worker)
+                code = 0
+            except BaseException:
+                logger.exception('Worker %d failed', worker)
+            finally:
+                os._exit(code)
+        self.pids[pid] = worker
+        self.started[worker] = time.monotonic()
+        logger.info('Worker %d started (pid %d, cpus %s)', worker, pid, list(self.plans[worker]))
+
+    def _run_worker(self, worker: int):
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        cpus = self.plans[worker]
+        if self.pin and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, cpus)
+        server._set_predict_threads(len(cpus))
+        if server.AUDIT_LOG_PATH:
+            server.AUDIT_LOG_PATH = _audit_path(server.AUDIT_LOG_PATH, worker)
+        config = uvicorn.Config(_CountingApp(server.app, self.counters, worker), log_level=self.log_level)
+        uvicorn.Server(config).run(sockets=[self.sock])
+
+    def run(self, report_seconds: float = 60.0, stats_path: str | None = None) -> int:
+        """Supervise the workers until a signal asks to stop; returns the exit code."""
+        for worker in range(len(self.plans)):
+            self.spawn(worker)
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        next_report = time.monotonic() + report_seconds
+        code = 0
+        while not self._stopping:
+            for pid, worker, status in self._reap():
+                uptime = time.monotonic() - self.started[worker]
+                logger.warning('Worker %d (pid %d) exited with status %d after %.1f s',
+                               worker, pid, status, uptime)
+                if uptime < MIN_UPTIME_SECONDS:
+                    logger.error('Worker %d is failing on startup; shutting down', worker)
+                    self._stopping, code = True, 1
+                    break
+                self.restarts[worker] += 1
+                self.spawn(worker)
+            if time.monotonic() >= next_report:
+                self._log_report(self.report(), stats_path)
+                next_report += report_seconds
+            time.sleep(0.1)
+        self.stop()
+        return code
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
+
+    def _reap(self) -> list[tuple[int, int, int]]:
+        exited = []
+        while self.pids:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            if pid in self.pids:
+                exited.append((pid, self.pids.pop(pid), os.waitstatus_to_exitcode(status)))
+        return exited
+
+    def stop(self, timeout: float = SHUTDOWN_TIMEOUT_SECONDS):
+        """Ask every worker to shut down gracefully; kill the ones still running after ``timeout``."""
+        for pid in self.pids:
+            os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + timeout
+        while self.pids and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.05)
+        for pid in self.pids:
+            logger.warning('Worker pid %d did not stop in %.0f s; killing it', pid, timeout)
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self.pids.clear()
+
+    def report(self) -> dict:
+        """Per-worker request counts and rates since the last report, and memory of every process."""
+        now = time.monotonic()
+        last_time, last_counts = self._last_report
+        counts = list(self.counters)
+        self._last_report = (now, counts)
+        elapsed = max(now - last_time, 1e-9)
+        workers = [
+            {
+                'worker': worker,
+                'pid': pid,
+                'cpus': list(self.plans[worker]),
+                'threads': len(self.plans[worker]),
+                'restarts': self.restarts[worker],
+                'requests': counts[worker],
+                'requests_per_second': (counts[worker] - last_counts[worker]) / elapsed,
+                **memory_usage(pid),
+            }
+            for pid, worker in sorted(self.pids.items(), key=lambda item: item[1])
+        ]
+        parent = {'pid': os.getpid(), **memory_usage(os.getpid())}
+        processes = [parent] + workers
+        return {
+            'time': time.time(),
+            'port': self.sock.getsockname()[1],
+            'requests_per_second': sum(w['requests_per_second'] for w in workers),
+            'total_rss_bytes': sum(p.get('rss_bytes', 0) for p in processes),
+            'total_pss_bytes': sum(p.get('pss_bytes', 0) for p in processes),
+            'parent': parent,
+            'workers': workers,
+        }
+
+    def _log_report(self, report: dict, stats_path: str | None):
+        mib = 1024 * 1024
+        for w in report['workers']:
+            logger.info('Worker %d (pid %d, cpus %s): %.1f req/s, RSS %.1f MiB, PSS %.1f MiB, private %.1f MiB',
+                        w['worker'], w['pid'], w['cpus'], w['requests_per_second'], w.get('rss_bytes', 0) / mib,
+                        w.get('pss_bytes', 0) / mib, w.get('private_bytes', 0) / mib)
+        logger.info('Total: %.1f req/s, PSS %.1f MiB over %d workers and the parent',
+                    report['requests_per_second'], report['total_pss_bytes'] / mib, len(report['workers']))
+        if stats_path:
+            tmp = f'{stats_path}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(report, f, indent=2)
+            os.replace(tmp, stats_path)
+
+
+def main():
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count() or 1))
+    parser = argparse.ArgumentParser(description='Serve the prediction API from pre-forked, CPU-pinned workers.')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('POWERGRID_WORKERS', '0')) or len(cpus),
+                        help='worker processes (default: one per available CPU)')
+    parser.add_argument('--threads-per-worker', type=int,
+                        default=int(os.getenv('POWERGRID_THREADS_PER_WORKER', '0')) or None,
+                        help='CPUs and XGBoost threads per worker (default: available CPUs / workers)')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000, help='0 picks a free port (see --stats)')
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--no-pin', action='store_true', help='keep the thread budgets but do not set CPU affinity')
+    parser.add_argument('--report-seconds', type=float, default=60.0)
+    parser.add_argument('--stats', default=None, help='also write each report to this JSON file')
+    parser.add_argument('--log-level', default='info')
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format='%(asctime)s %(name)s %(levelname)s %(message)s')
+
+    started = time.perf_counter()
+    version = server._model_version()
+    # Collect now and move everything that survives into the permanent
+    # generation, so the workers' collections never touch the shared objects.
+    gc.collect()
+    gc.freeze()
+    logger.info('Loaded model version %s in %.2f s', version.version, time.perf_counter() - started)
+
+    sock = socket.create_server((args.host, args.port), backlog=args.backlog)
+    plans = plan_workers(cpus, args.workers, args.threads_per_worker)
+    pool = WorkerPool(sock, plans, pin=not args.no_pin, log_level=args.log_level)
+    logger.info('Listening on %s:%d with %d workers', args.host, sock.getsockname()[1], len(plans))
+    raise SystemExit(pool.run(args.report_seconds, args.stats))
+
+
+if __name__ == '__main__':
+    main()
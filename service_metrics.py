@@ -0,0 +1,257 @@
+"""Low-overhead in-process metrics with a Prometheus text exposition.
+
+Counters and histograms are sharded per thread: the hot path only touches a
+thread-local dict (no lock), and a scrape sums the shards. Gauges are either
+set directly or computed at scrape time by registered callbacks, which is how
+cache, batcher and audit-log statistics are exported without touching their
+hot paths.
+"""
+
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+
+# Seconds; spans a cache hit (~µs) up to a large batch (~s).
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+SIZE_BUCKETS = tuple(float(1 << i) for i in range(18))
+
+# perf_counter() at which the current HTTP request entered the app.
+REQUEST_STARTED: contextvars.ContextVar[float | None] = contextvars.ContextVar('request_started', default=None)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _ShardedMetric:
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: list[dict] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _merged(self) -> dict[tuple, list]:
+        with self._lock:
+            shards = list(self._shards)
+        merged: dict[tuple, list] = {}
+        for shard in shards:
+            for labels, cell in list(shard.items()):
+                total = merged.get(labels)
+                if total is None:
+                    merged[labels] = list(cell)
+                else:
+                    for i, v in enumerate(cell):
+                        total[i] += v
+        return merged
+
+    def collect(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_ShardedMetric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount: float = 1):
+        shard = self._shard()
+        cell = shard.get(labels)
+        if cell is None:
+            shard[labels] = [amount]
+        else:
+            cell[0] += amount
+
+    def value(self, *labels) -> float:
+        return self._merged().get(labels, [0])[0]
+
+    def collect(self) -> list[str]:
+        return [
+            f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(cell[0])}'
+            for labels, cell in sorted(self._merged().items())
+        ]
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram: 'Histogram', labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class Histogram(_ShardedMetric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        shard = self._shard()
+        cell = shard.get(labels)
+        if cell is None:
+            # One count per bucket, one for +Inf, then the running sum.
+            cell = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def time(self, *labels) -> _Timer:
+        return _Timer(self, labels)
+
+    def snapshot(self, *labels) -> dict:
+        cell = self._merged().get(labels)
+        if cell is None:
+            return {'count': 0, 'sum': 0.0}
+        return {'count': sum(cell[:-1]), 'sum': cell[-1]}
+
+    def collect(self) -> list[str]:
+        lines = []
+        for labels, cell in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), cell[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}')
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_str} {_format_value(cell[-1])}')
+            lines.append(f'{self.name}_count{label_str} {cumulative}')
+        return lines
+
+
+class Gauge:
+    kind = 'gauge'
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def collect(self) -> list[str]:
+        return [f'{self.name} {_format_value(float(self.value))}']
+
+
+class CallbackMetric:
+    """A family whose samples are computed at scrape time: ``fn() -> [(labels_dict, value), ...]``."""
+
+    def __init__(self, name: str, kind: str, help_text: str, fn: Callable[[], Iterable[tuple[dict, float]]]):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.fn = fn
+
+    def collect(self) -> list[str]:
+        lines = []
+        for labels, value in self.fn():
+            names = tuple(labels)
+            lines.append(f'{self.name}{_format_labels(names, tuple(labels[n] for n in names))} '
+                         f'{_format_value(float(value))}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, object] = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f'metric {metric.name} is already registered')
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: tuple[str, ...] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._register(Gauge(name, help_text))
+
+    def callback(self, name: str, kind: str, help_text: str, fn) -> CallbackMetric:
+        return self._register(CallbackMetric(name, kind, help_text, fn))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            samples = metric.collect()
+            if not samples:
+                continue
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request count and latency per route template.
+
+    It also stamps REQUEST_STARTED so a handler can attribute the time spent
+    before it ran (body read, JSON parsing and pydantic validation).
+    """
+
+    def __init__(self, app, requests: Counter, latency: Histogram):
+        self.app = app
+        self.requests = requests
+        self.latency = latency
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        token = REQUEST_STARTED.set(started)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_STARTED.reset(token)
+            route = scope.get('route')
+            # Route templates keep the label set bounded; unmatched paths share one label.
+            path = getattr(route, 'path', 'unmatched')
+            self.requests.inc(path, str(status))
+            self.latency.observe(time.perf_counter() - started, path)
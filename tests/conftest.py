@@ -0,0 +1,36 @@
+"""Session setup: the tests run against small models trained on a generated dataset.
+
+Artifact paths are relative (``artifacts/...``), so the session works in a
+scratch directory holding freshly trained artifacts instead of whatever the
+repository's artifacts/ directory contains.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from generate_synthetic_data import generate, write_chunks
+from project_store import read_history
+from train_model import REPORT_PATH, save_training_artifacts, train_and_evaluate
+
+ROWS = 2000
+
+
+@pytest.fixture(scope='session', autouse=True)
+def trained_artifacts(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp('powergrid')
+    (workdir / 'artifacts').mkdir()
+    previous = os.getcwd()
+    os.chdir(workdir)
+    try:
+        data = str(workdir / 'projects.csv')
+        write_chunks(generate(ROWS, seed=42), data)
+        pipelines = train_and_evaluate(read_history(data), parallel=False, report_path=REPORT_PATH)
+        save_training_artifacts(pipelines, data)
+        yield workdir / 'artifacts'
+    finally:
+        os.chdir(previous)
@@ -0,0 +1,37 @@
+"""Sample projects shared by the API tests."""
+
+PAYLOADS = [
+    {
+        'project_type': 'substation',
+        'terrain': 'urban',
+        'planned_days': 220,
+        'planned_cost': 55_000_000.0,
+        'regulatory_risk': 'Medium',
+        'season': 'Winter',
+        'vendor': 'vendor_12',
+        'vendor_rating': 3.6,
+        'market_condition': 'Volatile',
+    },
+    {
+        'project_type': 'overhead_line',
+        'terrain': 'plains',
+        'planned_days': 120,
+        'planned_cost': 10_000_000.0,
+        'regulatory_risk': 'Low',
+        'season': 'Summer',
+        'vendor': 'vendor_3',
+        'vendor_rating': 4.8,
+        'market_condition': 'Stable',
+    },
+    {
+        'project_type': 'underground_cable',
+        'terrain': 'forest',
+        'planned_days': 400,
+        'planned_cost': 30_000_000.0,
+        'regulatory_risk': 'High',
+        'season': 'Monsoon',
+        'vendor': 'vendor_19',
+        'vendor_rating': 2.1,
+        'market_condition': 'Volatile',
+    },
+]
@@ -0,0 +1,102 @@
+"""Audit log writing, rotation, drop policy and replay."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+import serve_model_fastapi as server
+from audit_log import AuditLogger, log_files, read_records
+from payloads import PAYLOADS
+from replay_audit import REPLAYABLE_ENDPOINTS, replay
+from serve_model_fastapi import ProjectIn, _predict
+
+
+def test_records_are_flushed_on_close_and_rotated(tmp_path):
+    path = str(tmp_path / 'requests.jsonl')
+    logger = AuditLogger(path, batch_size=2, max_bytes=1, rotate_seconds=None, compress=True)
+    logger.start()
+    for i in range(5):
+        assert logger.log('/predict', {'i': i}, {'ok': True})
+    logger.close()
+
+    assert [r['request']['i'] for r in read_records(path)] == list(range(5))
+    assert logger.stats()['written'] == 5
+    assert logger.rotations >= 1
+    assert any(f.endswith('.jsonl.gz') for f in log_files(path))
+    # Another worker's log beside this one is not part of its rotated set.
+    (tmp_path / 'requests.w0.jsonl').write_text('{"request": {"i": 99}}\n')
+    assert [r['request']['i'] for r in read_records(path)] == list(range(5))
+
+
+def test_unserializable_record_is_counted_and_the_writer_keeps_running(tmp_path):
+    path = str(tmp_path / 'requests.jsonl')
+    logger = AuditLogger(path, max_queue=1, policy='block', flush_interval=0.01)
+    logger.start()
+    assert logger.log('/predict', {'i': 0}, {'bad': object()})
+    # With a dead writer the second blocking put would never return.
+    for i in range(1, 4):
+        assert logger.log('/predict', {'i': i}, {'ok': True})
+    logger.close()
+
+    assert [r['request']['i'] for r in read_records(path)] == [1, 2, 3]
+    assert (logger.written, logger.write_errors) == (3, 1)
+
+
+def test_drop_policy_never_blocks_when_queue_is_full(tmp_path):
+    logger = AuditLogger(str(tmp_path / 'requests.jsonl'), max_queue=2, policy='drop')
+    # Not started, so nothing drains the queue.
+    results = [logger.log('/predict', {'i': i}, {}) for i in range(4)]
+
+    assert results == [True, True, False, False]
+    assert (logger.enqueued, logger.dropped) == (2, 2)
+
+
+def test_replay_reproduces_recorded_predictions(tmp_path):
+    path = str(tmp_path / 'requests.jsonl')
+    logger = AuditLogger(path)
+    logger.start()
+    for p in PAYLOADS:
+        payload = ProjectIn(**p)
+        logger.log('/predict', payload, _predict(payload))
+    logger.close()
+
+    summary = asyncio.run(replay(path, concurrency=2, verify=True))
+    assert summary['requests'] == len(PAYLOADS)
+    assert summary['errors'] == 0
+    assert summary['mismatches'] == 0
+
+
+def test_replay_verifies_every_replayable_endpoint(tmp_path, monkeypatch):
+    path = str(tmp_path / 'requests.jsonl')
+    logger = AuditLogger(path)
+    logger.start()
+    monkeypatch.setattr(server, '_audit', logger)
+    client = TestClient(server.app)
+    for endpoint in REPLAYABLE_ENDPOINTS:
+        body = PAYLOADS if endpoint == '/predict_batch' else PAYLOADS[0]
+        assert client.post(endpoint, json=body).status_code == 200
+    logger.close()
+
+    assert [r['endpoint'] for r in read_records(path)] == list(REPLAYABLE_ENDPOINTS)
+    summary = asyncio.run(replay(path, verify=True))
+    assert (summary['requests'], summary['errors'], summary['mismatches']) == (len(REPLAYABLE_ENDPOINTS), 0, 0)
+
+
+def test_explain_endpoints_are_audited(tmp_path, monkeypatch):
+    path = str(tmp_path / 'requests.jsonl')
+    logger = AuditLogger(path)
+    logger.start()
+    monkeypatch.setattr(server, '_audit', logger)
+    client = TestClient(server.app)
+    assert client.post('/explain', json=PAYLOADS[0]).status_code == 200
+    assert client.post('/explain_batch', params={'approximate': True}, json=PAYLOADS).status_code == 200
+    logger.close()
+
+    records = list(read_records(path))
+    assert [r['endpoint'] for r in records] == ['/explain', '/explain_batch?approximate=true']
+    assert records[1]['request'] == PAYLOADS
+    assert len(records[1]['response']['explanations']) == len(PAYLOADS)
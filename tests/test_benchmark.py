@@ -0,0 +1,44 @@
+"""Benchmark results are machine-readable and the comparison gates regressions."""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from benchmark import _metric, compare, run
+
+
+def _result(**metrics) -> dict:
+    return {'meta': {}, 'metrics': metrics}
+
+
+def test_compare_flags_regressions_in_the_worse_direction_only():
+    baseline = _result(
+        latency=_metric(10.0, 'ms'),
+        throughput=_metric(1000.0, 'rows/s', 'higher'),
+        memory=_metric(200.0, 'MiB'),
+    )
+    current = _result(
+        latency=_metric(12.0, 'ms'),                      # 20% slower: regression
+        throughput=_metric(1500.0, 'rows/s', 'higher'),   # faster: fine
+        memory=_metric(210.0, 'MiB'),                     # 5% worse: within threshold
+        new_metric=_metric(1.0, 's'),                     # not in baseline: ignored
+    )
+
+    rows = {r['metric']: r for r in compare(baseline, current, threshold=0.10)}
+
+    assert set(rows) == {'latency', 'throughput', 'memory'}
+    assert rows['latency']['regressed']
+    assert not rows['throughput']['regressed']
+    assert not rows['memory']['regressed']
+    assert compare(_result(t=_metric(1000.0, 'rows/s', 'higher')),
+                   _result(t=_metric(800.0, 'rows/s', 'higher')))[0]['regressed']
+
+
+def test_quick_run_produces_json_serializable_metrics():
+    result = run(['load', 'predict'], quick=True)
+
+    json.dumps(result)
+    assert {'load.load_models_seconds', 'predict.p50_ms', 'predict.p99_ms'} <= set(result['metrics'])
+    assert result['metrics']['predict.p50_ms']['value'] <= result['metrics']['predict.p99_ms']['value']
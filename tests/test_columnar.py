@@ -0,0 +1,78 @@
+"""Arrow IPC batch scoring: same results as the JSON batch, per-row errors, and the client helpers."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+import score
+import serve_model_fastapi as server
+from api_client import predict_arrow_chunk
+from columnar import ARROW_STREAM, RESULT_COLUMNS, read_ipc, write_ipc
+from model_utils import FEATURES
+
+DATA = str(Path(__file__).resolve().parents[1] / 'synthetic_projects.csv')
+
+
+def _projects(n: int = 300) -> pd.DataFrame:
+    frame = pd.read_csv(DATA, nrows=n)[FEATURES]
+    frame.insert(0, 'project_id', np.arange(1000, 1000 + n))
+    return frame
+
+
+def test_arrow_batch_matches_the_json_batch_and_reports_invalid_rows():
+    client = TestClient(server.app)
+    projects = _projects()
+    projects.loc[5, 'season'] = 'Spring'
+    projects.loc[7, 'planned_days'] = 5
+    projects.loc[9, 'vendor'] = None
+
+    response = client.post('/predict_batch_arrow', content=write_ipc(projects), headers={'Content-Type': ARROW_STREAM})
+    assert response.status_code == 200 and response.headers['content-type'] == ARROW_STREAM
+    with pa.ipc.open_stream(response.content) as reader:
+        version = reader.schema.metadata[b'model_version'].decode()
+    results = read_ipc(response.content)
+    assert list(results.columns) == ['project_id'] + RESULT_COLUMNS
+    assert results['project_id'].tolist() == projects['project_id'].tolist()
+
+    invalid = [5, 7, 9]
+    assert results.loc[invalid, 'error'].tolist() == ['invalid season', 'invalid planned_days', 'invalid vendor']
+    assert results.loc[invalid, 'cost_overrun_probability'].isna().all()
+    assert results.loc[invalid, 'time_overrun_predicted'].isna().all()
+
+    valid = projects.drop(index=invalid)
+    expected = client.post('/predict_batch', json=valid[FEATURES].to_dict('records')).json()['predictions']
+    scored = results.drop(index=invalid)
+    assert (scored['error'] == '').all()
+    assert scored['cost_overrun_probability'].tolist() == [r['cost_overrun_probability'] for r in expected]
+    assert scored['time_overrun_predicted'].tolist() == [r['time_overrun_predicted'] for r in expected]
+    assert [list(f) for f in scored['key_risk_factors']] == [r['key_risk_factors'] for r in expected]
+    assert scored['vendor_rating_band'].tolist() == [r['vendor_info']['vendor_rating_band'] for r in expected]
+    assert {r['model_version'] for r in expected} == {version}
+
+
+def test_arrow_endpoint_rejects_other_content_and_unknown_columns():
+    client = TestClient(server.app)
+    projects = _projects(5)
+    assert client.post('/predict_batch_arrow', content=write_ipc(projects),
+                       headers={'Content-Type': 'application/json'}).status_code == 415
+    assert client.post('/predict_batch_arrow', content=b'not arrow',
+                       headers={'Content-Type': ARROW_STREAM}).status_code == 422
+    for frame in (projects.drop(columns=['terrain']), projects.assign(colour='red')):
+        response = client.post('/predict_batch_arrow', content=write_ipc(frame), headers={'Content-Type': ARROW_STREAM})
+        assert response.status_code == 422
+
+
+def test_client_helper_returns_what_score_py_writes():
+    projects = _projects(200)
+    remote = predict_arrow_chunk(projects.astype({'season': 'category'}), url='', client=TestClient(server.app))
+    local = score.score_chunk(projects)
+    pd.testing.assert_frame_equal(remote.drop(columns='key_risk_factors'), local.drop(columns='key_risk_factors'),
+                                  check_dtype=False)
+    assert [list(f) for f in remote['key_risk_factors']] == list(local['key_risk_factors'])
@@ -0,0 +1,62 @@
+"""The compiled predictor must reproduce pipe.predict_proba exactly."""
+
+import itertools
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from compiled_model import compile_pipeline, compile_pipelines
+from serve_model_fastapi import ProjectIn, _load_models
+
+
+def _grid() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    rows = [
+        {
+            'project_type': project_type,
+            'terrain': terrain,
+            'planned_days': int(rng.integers(10, 2000)),
+            'planned_cost': float(rng.uniform(1e6, 8e7)),
+            'regulatory_risk': reg_risk,
+            'season': season,
+            'vendor': vendor,
+            'vendor_rating': float(np.round(rng.uniform(1.0, 5.0), 1)),
+            'market_condition': market,
+        }
+        for project_type, terrain, reg_risk, season, market, vendor in itertools.product(
+            ['substation', 'overhead_line', 'underground_cable'],
+            ['plains', 'hilly', 'forest', 'urban'],
+            ['Low', 'Medium', 'High'],
+            ['Summer', 'Winter', 'Monsoon'],
+            ['Stable', 'Volatile'],
+            [f'vendor_{i}' for i in range(1, 21)],
+        )
+    ]
+    return pd.DataFrame(rows)
+
+
+def test_compiled_predictor_is_bit_identical_to_pipeline():
+    df = _grid()
+    payloads = [ProjectIn(**row) for row in df.to_dict('records')]
+
+    for pipe in _load_models():
+        compiled = compile_pipeline(pipe)
+        expected = pipe.predict_proba(df)
+
+        assert np.array_equal(compiled.predict_proba(payloads), expected)
+        assert np.array_equal(compiled.positive_proba(compiled.encoder.encode_columns(df)), expected[:, 1])
+        single = np.array([compiled.predict_one(p) for p in payloads[:200]])
+        assert np.array_equal(single, expected[:200, 1].astype(np.float64))
+
+
+def test_pipelines_with_the_same_preprocessing_share_one_encoder():
+    model_cost, model_time = _load_models()
+    predictor_cost, predictor_time = compile_pipelines(model_cost, model_time)
+
+    assert predictor_cost.encoder is predictor_time.encoder
+    assert predictor_cost.booster is model_cost.named_steps['clf'].get_booster()
+    assert predictor_time.booster is model_time.named_steps['clf'].get_booster()
@@ -0,0 +1,108 @@
+"""Drift monitor: reference bins, PSI/KS on shifted traffic, time windows and the /drift endpoint."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+import drift_monitor
+import serve_model_fastapi as server
+from columnar import ARROW_STREAM, write_ipc
+from drift_monitor import DriftMonitor, build_reference, save_reference
+from model_utils import FEATURES
+
+DATA = str(Path(__file__).resolve().parents[1] / 'synthetic_projects.csv')
+
+
+def _traffic(frame: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    predictor_cost, predictor_time = server._model_version().predictors
+    X = predictor_cost.encoder.encode_columns(frame)
+    return frame, predictor_cost.positive_proba(X), predictor_time.positive_proba(X)
+
+
+def test_training_like_traffic_is_stable_and_shifted_traffic_drifts():
+    history = pd.read_csv(DATA)[FEATURES]
+    reference = build_reference(history.iloc[:1500], server._model_version().predictors)
+    assert reference['features']['vendor_rating']['cuts'][0] == history['vendor_rating'].iloc[:1500].min()
+
+    stable = DriftMonitor(reference)
+    frame, cost, time_ = _traffic(history.iloc[1500:])
+    stable.observe_columns(frame, cost, time_)
+    report = stable.report()
+    assert report['rows'] == 500 and report['drifted'] == []
+    assert all(entry['psi'] < 0.1 for entry in report['features'].values())
+
+    shifted = history.iloc[1500:].assign(season='Monsoon', market_condition='Volatile', planned_cost=500_000_000.0)
+    frame, cost, time_ = _traffic(shifted)
+    drifted = DriftMonitor(reference)
+    # The per-request path counts exactly what the column path does.
+    for record, c, t in zip(frame.itertuples(), cost.tolist(), time_.tolist()):
+        drifted.observe(record, c, t)
+    batched = DriftMonitor(reference)
+    batched.observe_columns(frame.astype({'season': 'category'}), cost, time_)
+    assert np.array_equal(drifted.counts(), batched.counts())
+
+    report = drifted.report()
+    assert {'season', 'market_condition', 'planned_cost'} <= set(report['drifted'])
+    assert report['features']['planned_cost']['out_of_range'] == 1.0
+    assert report['features']['planned_cost']['ks'] > 0.99
+    assert report['features']['season']['share']['Monsoon']['current'] == 1.0
+    assert report['features']['terrain']['status'] == 'stable'
+
+
+def test_counts_roll_over_time_windows(monkeypatch):
+    history = pd.read_csv(DATA, nrows=300)[FEATURES]
+    monitor = DriftMonitor(build_reference(history, server._model_version().predictors), window_seconds=60, windows=3)
+    record = next(history.itertuples())
+    clock = [1_000_000.0]
+    monkeypatch.setattr(drift_monitor.time, 'time', lambda: clock[0])
+    for minute in range(5):
+        clock[0] = 1_000_000.0 + 60 * minute
+        for _ in range(minute + 1):
+            monitor.observe(record, 0.5, 0.5)
+    # Minutes 2, 3 and 4 are kept (3 + 4 + 5 requests); older windows are dropped.
+    assert monitor.report()['rows'] == 12
+    assert monitor.report(windows=1)['rows'] == 5
+    assert monitor.report(min_rows=100)['features']['season']['status'] == 'insufficient data'
+
+
+def test_drift_endpoint_counts_json_and_arrow_traffic(monkeypatch):
+    monkeypatch.setattr(server, 'DRIFT_MIN_ROWS', 1)
+    client = TestClient(server.app)
+    before = client.get('/drift').json()['rows']
+    projects = pd.read_csv(DATA, nrows=6)[FEATURES]
+    records = projects.to_dict('records')
+    client.post('/predict', json=records[0])
+    client.post('/predict_cost_overrun', json=records[1])
+    client.post('/predict_batch', json=records[2:4])
+    client.post('/predict_batch_arrow', content=write_ipc(projects), headers={'Content-Type': ARROW_STREAM})
+    report = client.get('/drift').json()
+    assert report['rows'] == before + 4 + 6
+    assert set(report['features']) == set(FEATURES) | {'cost_overrun_probability', 'time_overrun_probability'}
+    assert 'powergrid_drift_psi{feature="season"}' in client.get('/metrics').text
+
+
+def test_rebuilt_reference_replaces_the_monitor_without_reloading_the_models(tmp_path, monkeypatch):
+    path = str(tmp_path / 'drift_reference.json')
+    monkeypatch.setattr(server, 'DRIFT_REFERENCE_PATH', path)
+    monkeypatch.setattr(server, '_drift', server._drift)
+    monkeypatch.setattr(server, '_drift_file', server._drift_file)
+    fingerprint = server._artifact_fingerprint()
+    history = pd.read_csv(DATA, nrows=500)[FEATURES]
+
+    save_reference(build_reference(history.iloc[:300], server._model_version().predictors), path)
+    server._refresh_drift_monitor()
+    first = server._drift
+    assert first.reference['rows'] == 300
+    server._refresh_drift_monitor()
+    assert server._drift is first
+
+    save_reference(build_reference(history, server._model_version().predictors), path)
+    server._refresh_drift_monitor()
+    assert server._drift.reference['rows'] == 500
+    assert server._artifact_fingerprint() == fingerprint
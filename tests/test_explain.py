@@ -0,0 +1,36 @@
+"""Native contribution explanations are consistent with the predictions."""
+
+import math
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+from model_utils import FEATURES
+from payloads import PAYLOADS
+from serve_model_fastapi import ProjectIn, _explain_batch, _predict, app
+
+
+def test_contributions_sum_to_model_margin_per_original_feature():
+    payloads = [ProjectIn(**p) for p in PAYLOADS]
+    for payload, explanation in zip(payloads, _explain_batch(payloads)):
+        prediction = _predict(payload)
+        for target in ('cost_overrun', 'time_overrun'):
+            contribution = explanation['contributions'][target]
+            assert set(contribution['features']) == set(FEATURES)
+            margin = contribution['base_value'] + sum(contribution['features'].values())
+            prob = explanation[f'{target}_probability']
+            assert prob == prediction[f'{target}_probability']
+            assert math.isclose(1.0 / (1.0 + math.exp(-margin)), prob, rel_tol=1e-4)
+
+
+def test_explain_endpoints():
+    client = TestClient(app)
+    single = client.post('/explain', json=PAYLOADS[0])
+    batch = client.post('/explain_batch', params={'approximate': True}, json=PAYLOADS)
+
+    assert single.status_code == 200
+    assert single.json()['contribution_units'] == 'log_odds'
+    assert len(batch.json()['explanations']) == len(PAYLOADS)
@@ -0,0 +1,35 @@
+"""The generator is reproducible for a seed regardless of chunk size."""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import generate_synthetic_data
+from generate_synthetic_data import generate, write_chunks
+
+
+def test_same_seed_gives_same_rows_for_any_chunk_size(monkeypatch):
+    monkeypatch.setattr(generate_synthetic_data, 'BLOCK_ROWS', 1000)
+
+    whole = pd.concat(generate(2500, seed=7, chunk_size=10_000), ignore_index=True)
+    chunks = list(generate(2500, seed=7, chunk_size=333))
+
+    assert [len(c) for c in chunks] == [333] * 7 + [169]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), whole)
+    assert whole['project_id'].is_unique
+    assert whole['project_id'].iloc[-1] == 'P02500'
+    assert not whole.equals(pd.concat(generate(2500, seed=8), ignore_index=True))
+
+
+def test_written_csv_matches_training_schema(tmp_path):
+    out = tmp_path / 'projects.csv'
+    assert write_chunks(generate(500, seed=1, chunk_size=128), str(out)) == 500
+
+    df = pd.read_csv(out)
+    reference = pd.read_csv(Path(__file__).resolve().parents[1] / 'synthetic_projects.csv', nrows=5)
+    assert list(df.columns) == list(reference.columns)
+    assert len(df) == 500
+    assert set(df['cost_overrun'].unique()) <= {0, 1}
@@ -0,0 +1,75 @@
+"""Per-stage metrics, the /metrics exposition and the sampling profiler."""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+from payloads import PAYLOADS
+from sampling_profiler import SamplingProfiler
+from serve_model_fastapi import app
+from service_metrics import Registry
+
+
+def test_sharded_histogram_merges_threads_into_cumulative_buckets():
+    registry = Registry()
+    hist = registry.histogram('demo_seconds', 'Demo.', ('stage',), buckets=(0.1, 1.0))
+    counter = registry.counter('demo_total', 'Demo.', ('stage',))
+
+    def work():
+        for value in (0.05, 0.5, 5.0):
+            hist.observe(value, 'a')
+            counter.inc('a')
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    text = registry.render()
+    assert 'demo_seconds_bucket{stage="a",le="0.1"} 4' in text
+    assert 'demo_seconds_bucket{stage="a",le="1.0"} 8' in text
+    assert 'demo_seconds_bucket{stage="a",le="+Inf"} 12' in text
+    assert 'demo_seconds_count{stage="a"} 12' in text
+    assert counter.value('a') == 12
+
+
+def test_metrics_endpoint_reports_prediction_stages():
+    client = TestClient(app)
+    assert client.post('/predict', json=PAYLOADS[0]).status_code == 200
+    assert client.post('/predict_batch', json=PAYLOADS).status_code == 200
+
+    res = client.get('/metrics')
+    assert res.status_code == 200
+    assert res.headers['content-type'].startswith('text/plain')
+    for stage in ('parse_validate', 'key_risk_factors', 'vendor_info'):
+        assert f'powergrid_stage_seconds_count{{stage="{stage}"}}' in res.text
+    assert 'powergrid_http_requests_total{route="/predict",status="200"}' in res.text
+    assert 'powergrid_model_load_seconds' in res.text
+
+
+def test_sampling_profiler_emits_folded_stacks():
+    stop = threading.Event()
+
+    def busy_loop_for_profiler():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=busy_loop_for_profiler, name='busy')
+    worker.start()
+    profiler = SamplingProfiler(interval=0.002)
+    profiler.start()
+    time.sleep(0.1)
+    folded = profiler.stop()
+    stop.set()
+    worker.join()
+
+    assert profiler.n_samples > 0
+    busy = [line for line in folded.splitlines() if line.startswith('busy;')]
+    assert busy and any('busy_loop_for_profiler' in line for line in busy)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in folded.splitlines())
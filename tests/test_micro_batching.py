@@ -0,0 +1,79 @@
+"""Concurrent submissions are coalesced into vectorized batches."""
+
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from micro_batching import MicroBatcher
+
+
+def test_concurrent_submissions_are_batched_and_routed_back():
+    calls = []
+
+    def predict_batch(items):
+        calls.append(list(items))
+        return [item * 10 for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(predict_batch, window_ms=50, max_batch_size=4)
+        await batcher.start()
+        try:
+            results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+            stats = batcher.stats()
+        finally:
+            await batcher.stop()
+        return results, stats
+
+    results, stats = asyncio.run(scenario())
+
+    assert results == [i * 10 for i in range(10)]
+    assert [len(c) for c in calls] == [4, 4, 2]
+    assert stats['batches'] == 3
+    assert stats['items'] == 10
+    assert stats['max_seen_batch_size'] == 4
+    assert stats['queue_depth'] == 0
+
+
+def test_batch_errors_propagate_to_every_caller():
+    def predict_batch(items):
+        raise ValueError('boom')
+
+    async def scenario():
+        batcher = MicroBatcher(predict_batch, window_ms=5, max_batch_size=8)
+        await batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(scenario()))
+
+
+def test_stop_fails_running_collecting_and_queued_callers():
+    started = threading.Event()
+    release = threading.Event()
+
+    def predict_batch(items):
+        started.set()
+        release.wait(5)
+        return items
+
+    async def scenario():
+        batcher = MicroBatcher(predict_batch, window_ms=0, max_batch_size=1)
+        await batcher.start()
+        running = asyncio.ensure_future(batcher.submit(0))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        # One item is collected for the next batch, the other is still queued.
+        waiting = [asyncio.ensure_future(batcher.submit(i)) for i in (1, 2)]
+        await asyncio.sleep(0.01)
+        stopping = asyncio.ensure_future(batcher.stop())
+        await asyncio.sleep(0.01)
+        release.set()
+        await stopping
+        return await asyncio.wait_for(asyncio.gather(running, *waiting, return_exceptions=True), 1)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
@@ -0,0 +1,117 @@
+"""Hot model reload: validated atomic swaps, rollback and versioned responses."""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+import serve_model_fastapi as server
+from model_registry import CanaryError, ModelRegistry
+from payloads import PAYLOADS
+
+
+class Artifacts:
+    """Stands in for the files on disk: a fingerprint the test can change."""
+
+    def __init__(self):
+        self.fingerprint = 'v1'
+        self.models = server._read_artifacts()
+
+    def load(self):
+        return self.models
+
+
+def reject_v3(candidate, current):
+    if candidate.version == 'v3':
+        raise CanaryError('probabilities outside [0, 1]')
+    return {'rows': 1}
+
+
+def test_swap_is_atomic_and_rejected_or_rolled_back_versions_are_skipped():
+    artifacts = Artifacts()
+    registry = ModelRegistry(artifacts.load, lambda: artifacts.fingerprint, reject_v3)
+    in_flight = registry.ensure_current()
+    assert in_flight.version == 'v1'
+
+    artifacts.fingerprint = 'v2'
+    assert registry.refresh().version == 'v2'
+    # A request that started on v1 still holds v1's predictors.
+    assert in_flight.predictors is not registry.current.predictors
+
+    artifacts.fingerprint = 'v3'
+    with pytest.raises(CanaryError):
+        registry.refresh()
+    assert registry.current.version == 'v2'
+    assert registry.refresh() is None  # not retried until the files change again
+
+    artifacts.fingerprint = 'v4'
+    registry.refresh()
+    assert registry.rollback().version == 'v2'
+    assert registry.refresh() is None  # the watcher does not re-load the rolled-back files
+    assert registry.rollback('v1').version == 'v1'
+    assert [v['version'] for v in registry.versions()] == ['v1', 'v2', 'v4']
+    assert registry.stats()['rollbacks'] == 2
+
+
+def test_rollback_does_not_wait_for_a_load_in_progress():
+    artifacts = Artifacts()
+    validating, release = threading.Event(), threading.Event()
+
+    def slow_v3(candidate, current):
+        if candidate.version == 'v3':
+            validating.set()
+            release.wait(10)
+        return {'rows': 1}
+
+    registry = ModelRegistry(artifacts.load, lambda: artifacts.fingerprint, slow_v3)
+    registry.ensure_current()
+    artifacts.fingerprint = 'v2'
+    registry.refresh()
+
+    artifacts.fingerprint = 'v3'
+    results = []
+    loader = threading.Thread(target=lambda: results.append(registry.refresh()))
+    loader.start()
+    assert validating.wait(10)
+    started = time.perf_counter()
+    assert registry.rollback().version == 'v1'
+    assert time.perf_counter() - started < 1
+    release.set()
+    loader.join()
+
+    # The load finished after the rollback, so it is not activated, nor retried by the watcher.
+    assert results == [None] and registry.current.version == 'v1'
+    assert registry.refresh() is None
+    assert registry.stats()['skipped'] == {'v2': 'rolled back', 'v3': 'rolled back while loading'}
+
+
+def test_responses_carry_the_model_version_and_admin_endpoints(monkeypatch):
+    artifacts = Artifacts()
+    registry = ModelRegistry(
+        artifacts.load, lambda: artifacts.fingerprint, server._validate_canary, on_swap=server._on_swap
+    )
+    monkeypatch.setattr(server, '_registry', registry)
+    client = TestClient(server.app)
+
+    assert client.post('/predict', json=PAYLOADS[0]).json()['model_version'] == 'v1'
+    assert client.post('/predict_cost_overrun', json=PAYLOADS[0]).json()['model_version'] == 'v1'
+    batch = client.post('/predict_batch', json=PAYLOADS).json()['predictions']
+    assert {p['model_version'] for p in batch} == {'v1'}
+
+    artifacts.fingerprint = 'v2'
+    res = client.post('/models/reload')
+    assert res.json() == {'reloaded': True, 'model_version': 'v2'}
+    assert registry.current.canary['cost_overrun_mean_abs_shift'] == 0.0
+    assert client.post('/predict', json=PAYLOADS[0]).json()['model_version'] == 'v2'
+
+    assert client.post('/models/rollback').json() == {'model_version': 'v1'}
+    assert client.post('/models/rollback', params={'version': 'nope'}).status_code == 404
+    listed = client.get('/models').json()
+    assert listed['current_version'] == 'v1'
+    assert [v['version'] for v in listed['versions'] if v['active']] == ['v1']
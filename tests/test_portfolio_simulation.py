@@ -0,0 +1,82 @@
+"""Portfolio Monte Carlo: reproducible across workers, calibrated to the models, bounded aggregation."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+import portfolio_simulation
+import serve_model_fastapi as server
+from payloads import PAYLOADS
+from portfolio_simulation import StreamingHistogram, simulate
+
+
+def _portfolio(n: int = 30) -> pd.DataFrame:
+    return pd.DataFrame([PAYLOADS[i % len(PAYLOADS)] for i in range(n)])
+
+
+def _without_timing(report: dict) -> dict:
+    return {k: v for k, v in report.items() if k not in ('seconds', 'workers')}
+
+
+def test_report_depends_on_the_seed_not_the_worker_count(monkeypatch):
+    monkeypatch.setattr(portfolio_simulation, 'TASK_SCENARIOS', 700)
+    predictors = server._load_predictors()
+
+    one = simulate(_portfolio(), scenarios=2000, seed=3, workers=1, predictors=predictors)
+    two = simulate(_portfolio(), scenarios=2000, seed=3, workers=2, predictors=predictors)
+
+    assert _without_timing(one) == _without_timing(two)
+    assert one['total_cost_overrun'] != simulate(_portfolio(), scenarios=2000, seed=4,
+                                                 predictors=predictors)['total_cost_overrun']
+    cost = one['total_cost_overrun']
+    assert cost['min'] <= cost['p5'] <= cost['p50'] <= cost['p95'] <= cost['p99'] <= cost['max']
+    assert cost['out_of_range_fraction'] == 0.0
+    assert len(one['top_projects']) == 10
+
+
+def test_calibration_matches_model_probabilities():
+    report = simulate(_portfolio(len(PAYLOADS)), scenarios=20_000, seed=0, top=len(PAYLOADS),
+                      predictors=server._load_predictors())
+
+    for project in report['top_projects']:
+        assert abs(project['simulated_cost_overrun_rate'] - project['cost_overrun_probability']) < 0.03
+        assert abs(project['simulated_time_overrun_rate'] - project['time_overrun_probability']) < 0.03
+    assert abs(sum(p['tail_share'] for p in report['top_projects']) - 1.0) < 1e-9
+
+
+def test_streaming_histogram_quantiles_match_exact_percentiles():
+    values = np.random.default_rng(0).lognormal(size=100_000)
+    hist = StreamingHistogram(values.min() - 1, values.max() + 1)
+    other = StreamingHistogram(hist.lo, hist.hi)
+    hist.add(values[:60_000])
+    other.add(values[60_000:])
+    hist.merge(other)
+
+    width = (hist.hi - hist.lo) / hist.bins
+    for q in (0.05, 0.5, 0.95, 0.99):
+        assert abs(hist.quantile(q) - np.quantile(values, q)) <= width
+    assert abs(hist.summary()['mean'] - values.mean()) < 1e-9
+    assert hist.n == len(values)
+
+
+def test_endpoint_reports_model_version_and_enforces_the_draw_limit(monkeypatch):
+    client = TestClient(server.app)
+    body = {'projects': PAYLOADS, 'scenarios': 500, 'seed': 1, 'top': 3}
+
+    res = client.post('/simulate_portfolio', json=body)
+    assert res.status_code == 200
+    report = res.json()
+    assert report['model_version'] == server._model_version().version
+    assert report['scenarios'] == 500 and report['projects'] == len(PAYLOADS)
+    assert len(report['top_projects']) == 3
+
+    monkeypatch.setattr(server, 'PORTFOLIO_MAX_DRAWS', 100)
+    res = client.post('/simulate_portfolio', json=body)
+    assert res.status_code == 422
+    assert 'the limit is 100' in res.json()['detail']
@@ -0,0 +1,33 @@
+"""Batch scoring must match single-project scoring row for row."""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+from payloads import PAYLOADS
+from serve_model_fastapi import ProjectIn, _predict, _predict_batch, app
+
+
+def test_predict_batch_matches_single_predictions_in_order():
+    payloads = [ProjectIn(**p) for p in PAYLOADS]
+    batch = _predict_batch(payloads)
+
+    assert len(batch) == len(payloads)
+    for payload, result in zip(payloads, batch):
+        assert result == _predict(payload)
+
+
+def test_predict_batch_endpoint():
+    client = TestClient(app)
+    res = client.post('/predict_batch', json=PAYLOADS)
+
+    assert res.status_code == 200
+    predictions = res.json()['predictions']
+    assert [p['vendor_info']['vendor'] for p in predictions] == [p['vendor'] for p in PAYLOADS]
+
+    assert client.post('/predict_batch', json=[]).json() == {'predictions': []}
+    bad = dict(PAYLOADS[0], vendor='vendor_99')
+    assert client.post('/predict_batch', json=[PAYLOADS[0], bad]).status_code == 422
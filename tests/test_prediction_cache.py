@@ -0,0 +1,65 @@
+"""Prediction cache bookkeeping and model-fingerprint invalidation."""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import serve_model_fastapi as server
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache
+from serve_model_fastapi import ProjectIn, _predict
+
+
+def test_lru_eviction_and_ttl_expiry(monkeypatch):
+    cache = PredictionCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)  # evicts 'b', the least recently used
+
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (2, 1, 1)
+
+    now = [100.0]
+    monkeypatch.setattr('prediction_cache.time.monotonic', lambda: now[0])
+    ttl_cache = PredictionCache(maxsize=2, ttl_seconds=5)
+    ttl_cache.put('a', 1)
+    now[0] += 6
+    assert ttl_cache.get('a') is None
+    assert ttl_cache.stats()['expirations'] == 1
+
+
+def test_repeat_predictions_hit_cache_until_artifacts_change(monkeypatch):
+    payload = ProjectIn(
+        project_type='overhead_line',
+        terrain='hilly',
+        planned_days=140,
+        planned_cost=12_000_000.0,
+        regulatory_risk='High',
+        season='Monsoon',
+        vendor='vendor_17',
+        vendor_rating=2.9,
+        market_condition='Volatile',
+    )
+    cache = server._prediction_cache
+    first = _predict(payload)
+    hits = cache.hits
+    assert _predict(payload) is first
+    assert cache.hits == hits + 1
+
+    # A retrained artifact is swapped in by the registry; cached results of the
+    # old version are dropped and never served for the new one.
+    registry = ModelRegistry(
+        server._read_artifacts, lambda: 'retrained', server._validate_canary, on_swap=server._on_swap,
+        load_vendor_stats=server._registry.load_vendor_stats,
+    )
+    monkeypatch.setattr(server, '_registry', registry)
+    invalidations = cache.invalidations
+    again = _predict(payload)
+    assert cache.invalidations == invalidations + 1
+    assert again is not first
+    assert first['model_version'] != 'retrained'
+    assert again == {**first, 'model_version': 'retrained'}
@@ -0,0 +1,83 @@
+"""The columnar store round-trips the CSV history and every format loads with the same dtypes."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from model_utils import CATEGORY_VALUES, FEATURES, validate_frame
+from project_store import HistoryWriter, convert, iter_data_chunks, read_history
+from train_model import train_and_evaluate
+
+DATA = str(Path(__file__).resolve().parents[1] / 'synthetic_projects.csv')
+
+
+@pytest.fixture(scope='module')
+def stores(tmp_path_factory):
+    root = tmp_path_factory.mktemp('store')
+    paths = {fmt: str(root / f'history.{fmt}') for fmt in ('parquet', 'arrow')}
+    for path in paths.values():
+        assert convert(DATA, path, chunk_size=700) == 2000
+    return paths
+
+
+def test_store_round_trips_the_csv_with_compact_dtypes(stores):
+    reference = pd.read_csv(DATA)
+    for path in (*stores.values(), DATA):
+        df = read_history(path)
+        pd.testing.assert_frame_equal(df, reference, check_dtype=False, check_categorical=False)
+        for col, values in CATEGORY_VALUES.items():
+            assert list(df[col].cat.categories) == values
+        assert df['planned_days'].dtype == np.int16 and df['cost_overrun'].dtype == np.int8
+
+
+def test_projection_and_predicates_match_pandas_filtering(stores):
+    reference = pd.read_csv(DATA)
+    expected = reference[(reference['season'] == 'Monsoon') & (reference['planned_days'] > 180)]
+    filters = [('season', '==', 'Monsoon'), ('planned_days', '>', 180)]
+    for path in (*stores.values(), DATA):
+        df = read_history(path, columns=['project_id', 'season'], filters=filters)
+        assert list(df.columns) == ['project_id', 'season']
+        assert df['project_id'].tolist() == expected['project_id'].tolist()
+
+        chunks = list(iter_data_chunks(path, 300, FEATURES + ['project_id']))
+        assert max(len(c) for c in chunks) <= 300
+        assert pd.concat(chunks)['project_id'].tolist() == reference['project_id'].tolist()
+
+
+def test_writer_rejects_values_the_schema_cannot_hold_but_reads_keep_them(tmp_path):
+    bad = pd.read_csv(DATA, nrows=3)
+    bad.loc[1, 'season'] = 'Spring'
+    writer = HistoryWriter(str(tmp_path / 'bad.parquet'))
+    with pytest.raises(ValueError, match='season'):
+        writer.write(bad)
+
+    src = tmp_path / 'bad.csv'
+    bad.to_csv(src, index=False)
+    assert read_history(str(src))['season'].tolist() == bad['season'].tolist()
+
+
+def test_jsonl_with_a_mistyped_number_is_read_and_the_row_flagged(tmp_path):
+    rows = pd.read_csv(DATA, nrows=4)[FEATURES]
+    rows['planned_days'] = rows['planned_days'].astype(object)
+    rows.loc[1, 'planned_days'] = 'abc'
+    src = tmp_path / 'mixed.jsonl'
+    rows.to_json(src, orient='records', lines=True)
+
+    chunk = next(iter_data_chunks(str(src), 10, FEATURES))
+    assert chunk['planned_days'].tolist()[1] == 'abc'
+    assert validate_frame(chunk).tolist() == ['', 'invalid planned_days', '', '']
+
+
+def test_training_on_the_store_matches_training_on_the_csv(stores):
+    kwargs = dict(parallel=False, n_estimators=30, report_path=None)
+    from_csv = train_and_evaluate(pd.read_csv(DATA), **kwargs)
+    from_store = train_and_evaluate(read_history(stores['parquet']), **kwargs)
+
+    sample = pd.read_csv(DATA, nrows=200)
+    for target in from_csv:
+        assert np.array_equal(from_csv[target].predict_proba(sample), from_store[target].predict_proba(sample))
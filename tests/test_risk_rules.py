@@ -0,0 +1,181 @@
+"""The rule table reproduces the hand-written risk factors, batched and per row, and loads from config."""
+
+import random
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+import serve_model_fastapi as server
+from model_utils import CATEGORY_VALUES
+from risk_rules import DEFAULT_RISK_RULES, RiskRules, load_risk_rules
+from vendor_stats import load_vendor_stats
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _reference_factors(p, cost_prob, time_prob, vendor_stats) -> list[str]:
+    """The if/elif chain the default table replaced."""
+    factors = []
+    if p.regulatory_risk == 'High':
+        factors.append((100, 'High regulatory approval complexity'))
+    elif p.regulatory_risk == 'Medium':
+        factors.append((75, 'Moderate regulatory clearance risk'))
+    if p.market_condition == 'Volatile':
+        factors.append((85, 'Volatile market may increase material and execution risk'))
+    if p.season == 'Monsoon':
+        factors.append((80, 'Monsoon season can delay on-site execution'))
+    elif p.season == 'Winter':
+        factors.append((40, 'Winter season may slow field productivity'))
+    if p.terrain in {'hilly', 'forest'}:
+        factors.append((62, f'Complex terrain ({p.terrain}) increases execution difficulty'))
+    elif p.terrain == 'urban':
+        factors.append((45, 'Urban terrain may involve right-of-way and utility conflicts'))
+    if p.vendor_rating < 3.0:
+        factors.append((92, 'Low vendor rating indicates high delivery risk'))
+    elif p.vendor_rating < 3.8:
+        factors.append((60, 'Mid vendor rating indicates moderate delivery variance'))
+    cohort = vendor_stats.cohort_risk(p.vendor)
+    if cohort == 'high':
+        factors.append((65, f'{p.vendor} has overrun more often than the portfolio historically'))
+    elif cohort == 'medium':
+        factors.append((48, f'{p.vendor} belongs to medium-risk vendor cohort'))
+    if p.planned_days > 300:
+        factors.append((50, 'Long planned duration increases schedule slippage exposure'))
+    if p.project_type == 'substation' and p.planned_cost > 60_000_000:
+        factors.append((52, 'Large substation budget increases cost sensitivity'))
+    elif p.project_type == 'underground_cable' and p.planned_cost > 25_000_000:
+        factors.append((52, 'Large underground cable budget increases cost sensitivity'))
+    elif p.project_type == 'overhead_line' and p.planned_cost > 15_000_000:
+        factors.append((52, 'Large overhead line budget increases cost sensitivity'))
+    if cost_prob > 0.7:
+        factors.append((64, 'Model indicates high cost-overrun probability'))
+    if time_prob > 0.7:
+        factors.append((64, 'Model indicates high timeline-overrun probability'))
+    if not factors:
+        return ['Balanced profile: no major risk drivers triggered']
+    factors.sort(key=lambda x: x[0], reverse=True)
+    return [label for _, label in factors[:4]]
+
+
+def _reference_band(rating: float) -> str:
+    return 'Strong' if rating >= 4.3 else 'Watchlist' if rating >= 3.5 else 'Critical'
+
+
+def _boundary_projects(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    projects = []
+    for _ in range(n):
+        record = {col: rng.choice(values) for col, values in CATEGORY_VALUES.items()}
+        record.update(
+            planned_days=rng.choice([10, 300, 301, 2000]),
+            planned_cost=rng.choice([1e6, 15e6, 15_000_001.0, 25e6, 25_000_001.0, 60e6, 60_000_001.0]),
+            vendor_rating=rng.choice([1.0, 2.9, 3.0, 3.49, 3.5, 3.79, 3.8, 4.29, 4.3, 5.0]),
+        )
+        projects.append(server.ProjectIn(**record))
+    probs = [rng.choice([0.2, 0.7, 0.7000001, 0.95]) for _ in range(2 * n)]
+    return projects, probs[:n], probs[n:]
+
+
+def _columns(projects, fields) -> dict:
+    return {field: [getattr(p, field) for p in projects] for field in fields}
+
+
+def test_default_table_matches_the_reference_rules_batched_and_per_row():
+    vendor_stats = load_vendor_stats()
+    rules = RiskRules()
+    projects, cost_probs, time_probs = _boundary_projects(5000)
+
+    expected = [_reference_factors(*args, vendor_stats) for args in zip(projects, cost_probs, time_probs)]
+    assert [rules.key_risk_factors_one(*args, vendor_stats) for args in zip(projects, cost_probs, time_probs)] == expected
+    columns = _columns(projects, rules.fields)
+    assert rules.key_risk_factors(columns, cost_probs, time_probs, vendor_stats) == expected
+    # DataFrame input with store-style categorical columns takes the code fast path.
+    frame = pd.DataFrame(columns).astype({col: pd.CategoricalDtype(CATEGORY_VALUES[col])
+                                          for col in CATEGORY_VALUES if col in columns})
+    assert rules.key_risk_factors(frame, cost_probs, time_probs, vendor_stats) == expected
+
+    infos = rules.vendor_info(columns, vendor_stats)
+    assert infos == [rules.vendor_info_one(p, vendor_stats) for p in projects]
+    assert [info['vendor_rating_band'] for info in infos] == [_reference_band(p.vendor_rating) for p in projects]
+
+
+def test_vendor_cohort_factor_covers_high_and_medium_cohorts():
+    vendor_stats = load_vendor_stats()
+    rules = RiskRules()
+    quiet = dict(project_type='overhead_line', terrain='plains', planned_days=100, planned_cost=1e6,
+                 regulatory_risk='Low', season='Summer', vendor_rating=4.5, market_condition='Stable')
+    labels = {
+        'high': '{} has overrun more often than the portfolio historically',
+        'medium': '{} belongs to medium-risk vendor cohort',
+    }
+    for vendor in CATEGORY_VALUES['vendor']:
+        cohort = vendor_stats.cohort_risk(vendor)
+        factors = rules.key_risk_factors_one(server.ProjectIn(vendor=vendor, **quiet), 0.1, 0.1, vendor_stats)
+        if cohort in labels:
+            assert factors == [labels[cohort].format(vendor)]
+        else:
+            assert factors == ['Balanced profile: no major risk drivers triggered']
+
+
+def test_rules_load_from_config_and_groups_keep_table_order(tmp_path):
+    assert load_risk_rules(str(ROOT / 'sample_config.yaml')).spec == DEFAULT_RISK_RULES
+
+    config = tmp_path / 'rules.yaml'
+    config.write_text("""
+risk_rules:
+  max_factors: 2
+  fallback: nothing to report
+  rules:
+    - {group: rating, weight: 10, when: {vendor_rating: {lt: 3.0}}, label: very low rating}
+    - {group: rating, weight: 90, when: {vendor_rating: {lt: 4.0}}, label: low rating}
+    - {weight: 50, when: {season: [Monsoon, Winter], planned_days: {ge: 300}}, label: 'long {season} job'}
+    - {weight: 50, when: {vendor_cohort_risk: [unknown]}, label: 'no history for {vendor}'}
+  vendor_rating_bands:
+    - {min_rating: 4.0, band: Good, note: fine}
+    - {band: Poor, note: watch}
+""")
+    rules = load_risk_rules(str(config))
+    empty_stats = load_vendor_stats(str(tmp_path / 'missing.npz'))
+    projects, cost_probs, time_probs = _boundary_projects(500, seed=1)
+    batched = rules.key_risk_factors(_columns(projects, rules.fields), cost_probs, time_probs, empty_stats)
+
+    for p, factors, cost_prob, time_prob in zip(projects, batched, cost_probs, time_probs):
+        assert factors == rules.key_risk_factors_one(p, cost_prob, time_prob, empty_stats)
+        fired = []  # (weight, table position, label)
+        if p.vendor_rating < 3.0:
+            fired.append((10, 0, 'very low rating'))  # first in its group, though the next rule outweighs it
+        elif p.vendor_rating < 4.0:
+            fired.append((90, 1, 'low rating'))
+        if p.season in ('Monsoon', 'Winter') and p.planned_days >= 300:
+            fired.append((50, 2, f'long {p.season} job'))
+        fired.append((50, 3, f'no history for {p.vendor}'))
+        expected = [label for _, _, label in sorted(fired, key=lambda f: (-f[0], f[1]))]
+        assert factors == expected[:2]
+        assert rules.vendor_info_one(p, empty_stats)['vendor_rating_band'] == ('Good' if p.vendor_rating >= 4 else 'Poor')
+
+
+@pytest.mark.parametrize('rule, message', [
+    ({'weight': 1, 'when': {'season': 'Spring'}, 'label': 'x'}, "no value 'Spring'"),
+    ({'weight': 1, 'when': {'colour': 'red'}, 'label': 'x'}, "unknown field 'colour'"),
+    ({'weight': 1, 'when': {'planned_days': 300}, 'label': 'x'}, 'needs comparisons'),
+    ({'weight': 1, 'when': {'season': 'Winter'}, 'label': '{planned_days} days'}, 'one categorical field'),
+    ({'when': {'season': 'Winter'}, 'label': 'x'}, 'needs weight'),
+])
+def test_invalid_rules_are_rejected_when_loaded(rule, message):
+    with pytest.raises(ValueError, match=message):
+        RiskRules({'rules': [rule]})
+
+
+def test_batch_endpoint_matches_single_predictions():
+    client = TestClient(server.app)
+    projects, _, _ = _boundary_projects(40, seed=2)
+    payloads = [p.model_dump() for p in projects]
+    batch = client.post('/predict_batch', json=payloads).json()['predictions']
+    for payload, result in zip(payloads, batch):
+        assert client.post('/predict', json=payload).json() == result
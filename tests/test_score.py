@@ -0,0 +1,64 @@
+"""Offline scoring matches the API and keeps input order."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from model_utils import FEATURES, validate_frame
+from score import score_file
+from serve_model_fastapi import ProjectIn, _predict
+
+DATA = Path(__file__).resolve().parents[1] / 'synthetic_projects.csv'
+
+
+def test_validate_frame_agrees_with_project_in():
+    base = pd.read_csv(DATA, nrows=1)[FEATURES].iloc[0].to_dict()
+    cases = [
+        {},
+        {'vendor': 'vendor_0'},
+        {'vendor': 'vendor_20'},
+        {'planned_days': 9},
+        {'planned_days': 2000},
+        {'planned_days': 180.5},
+        {'planned_cost': 0.0},
+        {'vendor_rating': 5.01},
+        {'season': 'Autumn'},
+    ]
+    rows = pd.DataFrame([{**base, **case} for case in cases])
+    errors = validate_frame(rows)
+
+    for row, error in zip(rows.to_dict('records'), errors):
+        try:
+            ProjectIn(**row)
+            api_valid = True
+        except ValidationError:
+            api_valid = False
+        assert api_valid == (error == ''), (row, error)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_score_file_matches_predict_in_input_order(tmp_path, workers):
+    df = pd.read_csv(DATA, nrows=500)
+    df.loc[7, 'terrain'] = 'desert'
+    src = tmp_path / 'in.csv'
+    df.to_csv(src, index=False)
+    out = tmp_path / 'out.csv'
+
+    summary = score_file(str(src), str(out), workers=workers, chunk_size=64)
+    scored = pd.read_csv(out, keep_default_na=False, na_values=[''])
+
+    assert summary == {**summary, 'rows': 500, 'invalid_rows': 1}
+    assert list(scored['project_id']) == list(df['project_id'])
+    assert scored.loc[7, 'error'] == 'invalid terrain'
+    assert np.isnan(scored.loc[7, 'cost_overrun_probability'])
+    for i in (0, 100, 499):
+        expected = _predict(ProjectIn(**df.loc[i, FEATURES].to_dict()))
+        assert scored.loc[i, 'cost_overrun_probability'] == pytest.approx(expected['cost_overrun_probability'])
+        assert scored.loc[i, 'time_overrun_predicted'] == expected['time_overrun_predicted']
+        assert scored.loc[i, 'key_risk_factors'] == '; '.join(expected['key_risk_factors'])
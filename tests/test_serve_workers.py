@@ -0,0 +1,72 @@
+"""Pre-forked workers: CPU slices, thread budgets, and per-worker stats from a live launcher."""
+
+import json
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import serve_model_fastapi as server
+from serve_workers import _audit_path, plan_workers
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _nthread(booster) -> int:
+    return int(json.loads(booster.save_config())['learner']['generic_param']['nthread'])
+
+
+def test_plan_splits_cpus_evenly_and_wraps_when_oversubscribed():
+    assert plan_workers(list(range(8)), 4) == [(0, 1), (2, 3), (4, 5), (6, 7)]
+    assert plan_workers([0, 2, 4], 2) == [(0,), (2,)]
+    assert plan_workers([0, 1], 3) == [(0,), (1,), (0,)]
+    assert plan_workers([0, 1, 2, 3], 2, threads=3) == [(0, 1, 2), (3, 0, 1)]
+    assert _audit_path('logs/requests.jsonl', 1) == 'logs/requests.w1.jsonl'
+
+
+def test_thread_budget_applies_to_loaded_and_later_versions(monkeypatch):
+    version = server._model_version()
+    monkeypatch.setattr(server, 'PREDICT_THREADS', server.PREDICT_THREADS)
+    try:
+        server._set_predict_threads(1)
+        assert [_nthread(p.booster) for p in version.predictors] == [1, 1]
+        models = server._read_artifacts()
+        assert [_nthread(m.named_steps['clf'].get_booster()) for m in models] == [1, 1]
+    finally:
+        server._set_predict_threads(0)
+
+
+def test_launcher_serves_from_forked_workers_and_reports_each(tmp_path):
+    stats = tmp_path / 'stats.json'
+    proc = subprocess.Popen(
+        [sys.executable, str(ROOT / 'serve_workers.py'), '--workers', '2', '--port', '0', '--host', '127.0.0.1',
+         '--report-seconds', '0.5', '--stats', str(stats), '--log-level', 'warning'],
+    )
+    try:
+        deadline = time.monotonic() + 60
+        while not stats.exists() and time.monotonic() < deadline:
+            time.sleep(0.2)
+        port = json.loads(stats.read_text())['port']
+        for _ in range(20):
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=10) as response:
+                assert response.status == 200
+        time.sleep(1.5)
+        report = json.loads(stats.read_text())
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        code = proc.wait(timeout=30)
+
+    assert code == 0
+    workers = report['workers']
+    assert [w['worker'] for w in workers] == [0, 1]
+    assert len({w['pid'] for w in workers} | {report['parent']['pid']}) == 3
+    assert sum(w['requests'] for w in workers) == 20
+    for w in workers:
+        assert w['threads'] == len(w['cpus'])
+        # The models loaded before the fork are shared with the parent, not copied.
+        assert w['shared_bytes'] > w['private_bytes'] > 0
+    assert report['total_pss_bytes'] < report['total_rss_bytes']
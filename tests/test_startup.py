@@ -0,0 +1,49 @@
+"""Eager model warm-up at startup and the /ready probe."""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+import serve_model_fastapi as server
+from model_registry import ModelRegistry
+
+
+def test_lifespan_warms_models_and_reports_ready(monkeypatch):
+    monkeypatch.setattr(server, '_ready', server.threading.Event())
+    monkeypatch.setattr(server, '_startup', {'warmup_seconds': None, 'error': None})
+    registry = ModelRegistry(server._read_artifacts, server._artifact_fingerprint, server._validate_canary)
+    monkeypatch.setattr(server, '_registry', registry)
+
+    with TestClient(server.app) as client:
+        deadline = time.monotonic() + 30
+        res = client.get('/ready')
+        while res.status_code == 503 and time.monotonic() < deadline:
+            time.sleep(0.05)
+            res = client.get('/ready')
+
+        assert res.status_code == 200
+        body = res.json()
+        assert body['ready'] and body['error'] is None
+        assert body['warmup_seconds'] > 0
+        # The warm-up loaded, compiled and canary-checked one version.
+        assert registry.loads == 1
+        assert registry.current.canary['rows'] > 0
+
+
+def test_ready_reports_warmup_failure(monkeypatch):
+    monkeypatch.setattr(server, '_ready', server.threading.Event())
+    monkeypatch.setattr(server, '_startup', {'warmup_seconds': None, 'error': None})
+    monkeypatch.setattr(server, 'EAGER_LOAD', False)
+
+    def broken():
+        raise FileNotFoundError('artifacts/model_bundle.pkl')
+
+    monkeypatch.setattr(server, '_registry', ModelRegistry(broken, lambda: 'missing'))
+
+    res = TestClient(server.app).get('/ready')
+    assert res.status_code == 503
+    assert res.json()['error'].startswith('FileNotFoundError')
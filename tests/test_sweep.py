@@ -0,0 +1,53 @@
+"""What-if sweeps score the whole grid in one pass and match single predictions."""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+import serve_model_fastapi as server
+from payloads import PAYLOADS
+from serve_model_fastapi import ProjectIn, _predict, app
+
+
+def test_two_axis_sweep_matches_single_predictions_point_by_point():
+    client = TestClient(app)
+    body = {
+        'base': PAYLOADS[0],
+        'axes': [
+            {'field': 'vendor', 'values': ['vendor_1', 'vendor_12', 'vendor_20']},
+            {'field': 'planned_days', 'start': 10, 'stop': 2000, 'num': 5},
+        ],
+    }
+    res = client.post('/sweep', json=body)
+    assert res.status_code == 200
+    sweep = res.json()
+
+    assert sweep['shape'] == [3, 5]
+    days = sweep['axes'][1]['values']
+    assert days == [10, 508, 1005, 1502, 2000]
+    for i, vendor in enumerate(sweep['axes'][0]['values']):
+        for j, planned_days in enumerate(days):
+            single = _predict(ProjectIn(**{**PAYLOADS[0], 'vendor': vendor, 'planned_days': planned_days}))
+            assert sweep['cost_overrun_probability'][i][j] == single['cost_overrun_probability']
+            assert sweep['time_overrun_probability'][i][j] == single['time_overrun_probability']
+            assert sweep['model_version'] == single['model_version']
+
+
+def test_sweep_rejects_invalid_values_and_oversized_grids(monkeypatch):
+    client = TestClient(app)
+
+    def post(*axes):
+        return client.post('/sweep', json={'base': PAYLOADS[1], 'axes': list(axes)})
+
+    assert post({'field': 'vendor_rating', 'values': [4.0, 6.0]}).status_code == 422
+    assert post({'field': 'season', 'start': 0, 'stop': 1, 'num': 2}).status_code == 422
+    assert post({'field': 'terrain', 'values': ['hilly']}, {'field': 'terrain', 'values': ['urban']}).status_code == 422
+
+    monkeypatch.setattr(server, 'SWEEP_MAX_POINTS', 100)
+    res = post({'field': 'vendor_rating', 'start': 1, 'stop': 5, 'num': 20},
+               {'field': 'planned_cost', 'start': 1e6, 'stop': 1e8, 'num': 20})
+    assert res.status_code == 422
+    assert 'limit is 100' in res.json()['detail']
@@ -0,0 +1,64 @@
+"""Streaming (out-of-core) training produces a servable pipeline artifact."""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from compiled_model import compile_pipelines
+from model_utils import FEATURES, build_preprocessor, fit_fixed_preprocessor
+from train_model import train_and_evaluate, train_streaming
+
+DATA = str(Path(__file__).resolve().parents[1] / 'synthetic_projects.csv')
+
+
+def test_fixed_vocabulary_preprocessor_matches_data_fitted_layout():
+    df = pd.read_csv(DATA)
+    fitted = build_preprocessor().fit(df[FEATURES])
+    fixed = fit_fixed_preprocessor()
+
+    assert list(fixed.get_feature_names_out()) == list(fitted.get_feature_names_out())
+    assert np.array_equal(fixed.transform(df[FEATURES]), fitted.transform(df[FEATURES]))
+
+
+def test_streaming_training_yields_compilable_pipelines():
+    pipelines = train_streaming(DATA, chunk_size=300)
+    df = pd.read_csv(DATA, nrows=50)
+
+    model_cost, model_time = pipelines['cost_overrun'], pipelines['time_overrun']
+    predictor_cost, predictor_time = compile_pipelines(model_cost, model_time)
+    X = predictor_cost.encoder.encode_columns(df)
+
+    assert predictor_cost.encoder is predictor_time.encoder
+    assert np.array_equal(predictor_cost.positive_proba(X), model_cost.predict_proba(df)[:, 1])
+    assert np.array_equal(predictor_time.positive_proba(X), model_time.predict_proba(df)[:, 1])
+
+
+def test_parallel_training_matches_sequential_and_writes_timing_report(tmp_path):
+    df = pd.read_csv(DATA)
+    report_path = tmp_path / 'report.json'
+    kwargs = dict(n_jobs=2, n_estimators=60, early_stopping_rounds=10)
+
+    parallel = train_and_evaluate(df, parallel=True, report_path=str(report_path), **kwargs)
+    sequential = train_and_evaluate(df, parallel=False, report_path=None, **kwargs)
+
+    for target_col in parallel:
+        assert np.array_equal(
+            parallel[target_col].predict_proba(df.head(100)),
+            sequential[target_col].predict_proba(df.head(100)),
+        )
+    report = json.loads(report_path.read_text())
+    for timing in report['targets'].values():
+        assert timing['n_jobs'] == 1
+        assert timing['wall_seconds'] > 0
+        assert timing['best_iteration'] is not None
+    # Peak memory is a process-lifetime figure, so it is reported once per training process.
+    processes = report['processes']
+    assert sorted(t for p in processes for t in p['targets']) == sorted(report['targets'])
+    assert os.getpid() not in [p['pid'] for p in processes]
+    assert all(p['peak_rss_mb'] > 0 for p in processes)
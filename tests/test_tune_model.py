@@ -0,0 +1,32 @@
+"""Hyperparameter search caches encoded data and resumes from its trial log."""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from model_utils import build_pipeline, load_tuned_params
+from tune_model import load_trials, search
+
+DATA = str(Path(__file__).resolve().parents[1] / 'synthetic_projects.csv')
+
+
+def test_search_resumes_and_writes_best_config(tmp_path):
+    output = tmp_path / 'best_params.json'
+    cache_root = tmp_path / 'tuning'
+
+    first = search(DATA, n_trials=2, workers=1, output=str(output), cache_root=str(cache_root))
+    (fingerprint_dir,) = cache_root.iterdir()
+    assert (fingerprint_dir / 'matrices' / 'X_train.npy').exists()
+
+    second = search(DATA, n_trials=3, workers=1, output=str(output), cache_root=str(cache_root))
+    trials = load_trials(str(fingerprint_dir / 'trials_seed0.jsonl'))
+    assert sorted(t['trial_id'] for t in trials) == [0, 1, 2]
+    assert second['score'] <= first['score']
+
+    tuned = load_tuned_params(str(output))
+    assert tuned == json.loads(output.read_text())
+    clf = build_pipeline(params=tuned['params'], n_estimators=tuned['n_estimators']).named_steps['clf']
+    assert clf.max_depth == tuned['params']['max_depth']
+    assert clf.n_estimators == tuned['n_estimators']
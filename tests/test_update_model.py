@@ -0,0 +1,100 @@
+"""Incremental updates: warm-started boosters, the AUC gate and the replay reservoir."""
+
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from compiled_model import compile_pipelines
+from generate_synthetic_data import generate
+from model_utils import artifact_release, load_artifact, save_artifact
+from project_store import read_history
+from replay_buffer import ReplayBuffer, build_replay_buffer
+from train_model import train_and_evaluate
+from update_model import completed_projects, update_pipelines
+
+DATA = str(Path(__file__).resolve().parents[1] / 'synthetic_projects.csv')
+OUTCOMES = ['cost_overrun_pct', 'time_overrun_pct', 'cost_overrun', 'time_overrun']
+
+
+def _new_batch(n: int = 1500) -> pd.DataFrame:
+    return next(generate(n, seed=11, chunk_size=n))
+
+
+def test_outcomes_are_derived_from_actuals_and_invalid_rows_skipped():
+    raw = _new_batch(200)
+    raw.loc[3, 'season'] = 'Spring'
+    raw.loc[5, 'actual_cost'] = np.nan
+    batch, dropped = completed_projects(raw.drop(columns=OUTCOMES))
+
+    expected = raw.drop(index=[3, 5]).reset_index(drop=True)
+    assert dropped == 2
+    for col in OUTCOMES:
+        assert np.array_equal(batch[col].to_numpy(dtype=float), expected[col].to_numpy(dtype=float))
+
+
+def test_update_continues_the_served_trees_and_is_gated_on_holdout_auc():
+    pipelines = train_and_evaluate(pd.read_csv(DATA), parallel=False, n_estimators=60,
+                                   early_stopping_rounds=5, report_path=None)
+    buffer = build_replay_buffer(DATA, capacity=1000, chunk_size=700)
+    batch, _ = completed_projects(_new_batch())
+
+    updated, report = update_pipelines(pipelines, batch, buffer, rounds=15, tolerance=1.0)
+    # 1200 new training rows; replay is capped by the buffer's 1000 rows. Only unseen new rows are held out.
+    assert (report['new_rows'], report['replay_rows'], report['holdout_rows']) == (1500, 1000, 300)
+    for target_col, pipeline in updated.items():
+        previous = pipelines[target_col].named_steps['clf']
+        clf = pipeline.named_steps['clf']
+        # Boosting resumed after the early-stopped model's best iteration, and every new tree is served.
+        assert report['targets'][target_col]['trees'] == previous.best_iteration + 1 + 15
+        assert clf._get_iteration_range(None) == (0, 0)
+        assert pipeline.named_steps['pre'] is pipelines[target_col].named_steps['pre']
+
+    predictor_cost, _ = compile_pipelines(updated['cost_overrun'], updated['time_overrun'])
+    sample = batch.head(20)
+    assert np.array_equal(predictor_cost.positive_proba(predictor_cost.encoder.encode_columns(sample)),
+                          updated['cost_overrun'].predict_proba(sample)[:, 1])
+
+    kept, report = update_pipelines(pipelines, batch, buffer, rounds=15, tolerance=-1.0)
+    assert all(kept[t] is pipelines[t] for t in pipelines)
+    assert not any(r['published'] for r in report['targets'].values())
+
+
+def test_replay_buffer_is_a_uniform_sample_and_round_trips(tmp_path):
+    history = read_history(DATA)
+    history['planned_days'] = np.arange(len(history), dtype=np.int16)  # tags each row
+    hits = np.zeros(len(history))
+    for seed in range(100):
+        buffer = ReplayBuffer(capacity=200)
+        for start in range(0, len(history), 300):
+            buffer.add(history.iloc[start:start + 300], seed)
+        hits[buffer.frame['planned_days'].to_numpy()] += 1
+    assert buffer.seen == len(history) and len(buffer) == 200
+    # Each project is kept with probability 200 / 2000; both halves of the history are equally represented.
+    assert abs(hits[:1000].mean() - 10) < 1 and abs(hits[1000:].mean() - 10) < 1
+
+    path = str(tmp_path / 'buffer.parquet')
+    buffer.save(path)
+    loaded = ReplayBuffer.load(path)
+    pd.testing.assert_frame_equal(loaded.frame, buffer.frame)
+    assert (loaded.seen, loaded.capacity) == (buffer.seen, buffer.capacity)
+    assert len(set(buffer.sample(1000).index)) == 200
+
+
+def test_artifacts_saved_in_a_release_are_published_together(tmp_path):
+    first, second = str(tmp_path / 'a.pkl'), str(tmp_path / 'b.pkl')
+    with artifact_release():
+        save_artifact(1, first)
+        save_artifact(2, second)
+        assert not any(os.path.exists(path) for path in (first, second))
+    assert (load_artifact(first), load_artifact(second)) == (1, 2)
+
+    with pytest.raises(RuntimeError), artifact_release():
+        save_artifact(3, first)
+        raise RuntimeError
+    assert load_artifact(first) == 1 and sorted(os.listdir(tmp_path)) == ['a.pkl', 'b.pkl']
@@ -0,0 +1,78 @@
+"""Vendor statistics: incremental updates match a full rebuild and feed /predict."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+import serve_model_fastapi as server
+from model_registry import ModelRegistry
+from payloads import PAYLOADS
+from vendor_stats import VendorStats, build_vendor_stats
+
+DATA = str(Path(__file__).resolve().parents[1] / 'synthetic_projects.csv')
+
+
+def test_incremental_updates_match_a_full_rebuild_and_pandas(tmp_path):
+    df = pd.read_csv(DATA)
+    full = build_vendor_stats(DATA)
+
+    incremental = VendorStats()
+    assert incremental.update(df.iloc[:1500]) == 1500
+    incremental.save(str(tmp_path / 'stats.npz'))
+    incremental = VendorStats.load(str(tmp_path / 'stats.npz'))
+    assert incremental.update(df.iloc[1500:]) == 500
+
+    assert np.array_equal(incremental.counts, full.counts)
+    assert np.allclose(incremental.sums, full.sums)
+    assert np.array_equal(incremental.cohort, full.cohort)
+
+    expected = df[df['vendor'] == 'vendor_7']
+    cell = expected[expected['project_type'] == 'overhead_line']
+    history = full.lookup('vendor_7', 'overhead_line')
+    assert history['projects'] == len(expected)
+    assert np.isclose(history['time_overrun_rate'], expected['time_overrun'].mean())
+    assert history['project_type']['projects'] == len(cell)
+    assert np.isclose(history['project_type']['mean_cost_overrun_pct'], cell['cost_overrun_pct'].mean())
+
+
+def test_cohorts_come_from_outcomes_and_incomplete_rows_are_skipped():
+    rows = []
+    for i in range(200):
+        vendor = ('vendor_1', 'vendor_2', 'vendor_3')[i % 3]
+        overrun = int(vendor == 'vendor_1' or (vendor == 'vendor_2' and i % 2 == 0))
+        rows.append({'vendor': vendor, 'project_type': 'substation', 'cost_overrun': overrun,
+                     'time_overrun': overrun, 'cost_overrun_pct': 0.2 * overrun, 'time_overrun_pct': 0.2 * overrun})
+    rows.append({**rows[0], 'cost_overrun_pct': None})
+    stats = VendorStats()
+
+    assert stats.update(pd.DataFrame(rows)) == 200
+    assert [stats.cohort_risk(v) for v in ('vendor_1', 'vendor_2', 'vendor_3', 'vendor_4')] == \
+        ['high', 'medium', 'low', 'unknown']
+    assert stats.lookup('vendor_4') == {'projects': 0}
+
+
+def test_predict_uses_the_vendor_stats_loaded_with_the_model_version(monkeypatch):
+    df = pd.read_csv(DATA)
+    # vendor_12 always overran.
+    df.loc[df['vendor'] == 'vendor_12', ['cost_overrun', 'time_overrun']] = 1
+    stats = VendorStats()
+    stats.update(df)
+    registry = ModelRegistry(server._read_artifacts, lambda: 'v-stats', load_vendor_stats=lambda: stats)
+    monkeypatch.setattr(server, '_registry', registry)
+    if server._prediction_cache is not None:
+        server._prediction_cache.clear()
+
+    result = TestClient(server.app).post('/predict', json=PAYLOADS[0]).json()
+
+    assert PAYLOADS[0]['vendor'] == 'vendor_12'
+    info = result['vendor_info']
+    assert info['vendor_cohort_risk'] == 'high'
+    assert info['history']['cost_overrun_rate'] == 1.0
+    assert info['history']['project_type']['project_type'] == PAYLOADS[0]['project_type']
+    assert 'vendor_12 has overrun more often than the portfolio historically' in result['key_risk_factors']
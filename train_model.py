@@ -1,49 +1,366 @@
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
+import xgboost as xgb
+from sklearn.compose import ColumnTransformer
 from sklearn.metrics import classification_report, roc_auc_score
 from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+from compiled_model import compile_pipelines
+from drift_monitor import build_reference, save_reference
+from model_utils import (
+    DRIFT_REFERENCE_PATH,
+    FEATURES,
+    MODEL_BUNDLE_PATH,
+    MODEL_COST_PATH,
+    MODEL_TIME_PATH,
+    REPLAY_BUFFER_PATH,
+    TUNED_PARAMS_PATH,
+    VENDOR_STATS_PATH,
+    artifact_release,
+    build_classifier,
+    build_preprocessor,
+    fit_fixed_preprocessor,
+    load_tuned_params,
+    save_artifact,
+    save_bundle,
+)
+from project_store import default_history_path, iter_data_chunks, read_history
+from vendor_stats import build_vendor_stats
+
+NON_FEATURE_COLUMNS = [
+    'project_id',
+    'actual_cost',
+    'actual_days',
+    'cost_overrun_pct',
+    'time_overrun_pct',
+    'cost_overrun',
+    'time_overrun',
+]
+TARGETS = {
+    'cost_overrun': MODEL_COST_PATH,
+    'time_overrun': MODEL_TIME_PATH,
+}
+BUNDLE_PATH = MODEL_BUNDLE_PATH
+REPORT_PATH = 'artifacts/training_report.json'
+# Streaming mode holds out every HOLDOUT_EVERY-th row of the file for evaluation.
+HOLDOUT_EVERY = 5
+
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
 
-from model_utils import build_pipeline, save_artifact
-
-
-def train_and_evaluate_target(df: pd.DataFrame, target_col: str, model_path: str):
-    X = df.drop(
-        [
-            'project_id',
-            'actual_cost',
-            'actual_days',
-            'cost_overrun_pct',
-            'time_overrun_pct',
-            'cost_overrun',
-            'time_overrun',
-        ],
-        axis=1,
+
+def fit_target(
+    target_col: str,
+    Xt_train: np.ndarray,
+    y_train: np.ndarray,
+    Xt_val: np.ndarray | None,
+    y_val: np.ndarray | None,
+    Xt_test: np.ndarray,
+    n_jobs: int,
+    n_estimators: int,
+    early_stopping_rounds: int | None,
+    params: dict | None = None,
+) -> dict:
+    """Fit one target's classifier; runs in a worker process of the training pool."""
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    clf = build_classifier(
+        random_state=42,
+        n_estimators=n_estimators,
+        n_jobs=n_jobs,
+        early_stopping_rounds=early_stopping_rounds if Xt_val is not None else None,
+        params=params,
     )
-    y = df[target_col]
+    if Xt_val is not None:
+        clf.fit(Xt_train, y_train, eval_set=[(Xt_val, y_val)], verbose=False)
+    else:
+        clf.fit(Xt_train, y_train)
+    prob = clf.predict_proba(Xt_test)[:, 1]
+
+    return {
+        'target': target_col,
+        'clf': clf,
+        'prob': prob,
+        # ru_maxrss (KiB on Linux) is the peak of the whole process so far, not of
+        # this fit: a process may have run other targets or, when sequential,
+        # loaded the data. It is therefore reported per process, not per target.
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'timing': {
+            'pid': os.getpid(),
+            'n_jobs': n_jobs,
+            'wall_seconds': time.perf_counter() - wall_start,
+            'cpu_seconds': time.process_time() - cpu_start,
+            'n_estimators': n_estimators,
+            'best_iteration': getattr(clf, 'best_iteration', None),
+        },
+    }
+
 
+def train_and_evaluate(
+    df: pd.DataFrame,
+    n_jobs: int | None = None,
+    parallel: bool = True,
+    n_estimators: int = 200,
+    early_stopping_rounds: int | None = None,
+    validation_size: float = 0.1,
+    report_path: str | None = REPORT_PATH,
+    params: dict | None = None,
+) -> dict[str, Pipeline]:
+    """Fit every target on one shared preprocessor, concurrently by default.
+
+    ``n_jobs`` is the total core budget (default: all available cores); in
+    parallel mode it is split evenly between the target processes so the
+    XGBoost thread pools never oversubscribe the machine.
+    """
+    wall_start = time.perf_counter()
+    X = df.drop(NON_FEATURE_COLUMNS, axis=1)
+    y = df[list(TARGETS)]
+
+    # One split for both targets so they can share a single fitted preprocessor;
+    # stratify on the joint label to keep both class balances intact.
     X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
+        X, y, test_size=0.2, random_state=42,
+        stratify=y['cost_overrun'] * 2 + y['time_overrun'],
     )
+    X_val = y_val = None
+    if early_stopping_rounds:
+        X_train, X_val, y_train, y_val = train_test_split(
+            X_train, y_train, test_size=validation_size, random_state=42,
+            stratify=y_train['cost_overrun'] * 2 + y_train['time_overrun'],
+        )
+
+    pre = build_preprocessor()
+    Xt_train = pre.fit_transform(X_train)
+    Xt_val = pre.transform(X_val) if X_val is not None else None
+    Xt_test = pre.transform(X_test)
+
+    cores = n_jobs or available_cores()
+    workers = len(TARGETS) if parallel else 1
+    jobs = [
+        (
+            target_col,
+            Xt_train,
+            y_train[target_col].to_numpy(),
+            Xt_val,
+            y_val[target_col].to_numpy() if y_val is not None else None,
+            Xt_test,
+            max(1, cores // workers),
+            n_estimators,
+            early_stopping_rounds,
+            params,
+        )
+        for target_col in TARGETS
+    ]
+    if parallel:
+        # Fork where available: the workers inherit the encoded matrices and
+        # imported modules instead of re-importing them.
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            results = list(pool.map(fit_target, *zip(*jobs)))
+    else:
+        results = [fit_target(*job) for job in jobs]
+
+    pipelines = {}
+    timings = {}
+    processes = {}
+    for result in results:
+        target_col = result['target']
+        report(target_col, y_test[target_col], result['prob'])
+        result['timing']['auc'] = roc_auc_score(y_test[target_col], result['prob'])
+        timings[target_col] = result['timing']
+        pipelines[target_col] = Pipeline([('pre', pre), ('clf', result['clf'])])
+        process = processes.setdefault(result['timing']['pid'], {'targets': [], 'peak_rss_mb': 0.0})
+        process['targets'].append(target_col)
+        process['peak_rss_mb'] = max(process['peak_rss_mb'], result['peak_rss_mb'])
 
-    pipe = build_pipeline(random_state=42)
-    pipe.fit(X_train, y_train)
+    if report_path:
+        write_report(report_path, {
+            'rows': len(df),
+            'cores': cores,
+            'parallel': parallel,
+            'params': params or {},
+            'wall_seconds': time.perf_counter() - wall_start,
+            'targets': timings,
+            'processes': [{'pid': pid, **process} for pid, process in processes.items()],
+        })
+    return pipelines
 
-    pred = pipe.predict(X_test)
-    prob = pipe.predict_proba(X_test)[:, 1]
 
+def write_report(path: str, report_data: dict):
+    with open(path, 'w') as f:
+        json.dump(report_data, f, indent=2)
+    print(f'Wrote training report to {path}')
+
+
+def report(target_col: str, y_true, prob):
     print(f'===== {target_col} =====')
-    print(classification_report(y_test, pred))
-    print('AUC:', roc_auc_score(y_test, prob))
+    print(classification_report(y_true, (prob > 0.5).astype(int)))
+    print('AUC:', roc_auc_score(y_true, prob))
     print()
 
-    save_artifact(pipe, model_path)
-    print(f'Saved model to {model_path}')
+
+def iter_split_chunks(path: str, chunk_size: int, columns: list[str], holdout: bool) -> Iterator[pd.DataFrame]:
+    offset = 0
+    for chunk in iter_data_chunks(path, chunk_size, columns):
+        in_holdout = (np.arange(offset, offset + len(chunk)) % HOLDOUT_EVERY) == 0
+        offset += len(chunk)
+        part = chunk[in_holdout if holdout else ~in_holdout]
+        if len(part):
+            yield part
+
+
+class EncodedChunkIter(xgb.DataIter):
+    """Feeds one-hot encoded training chunks to XGBoost's external-memory DMatrix."""
+
+    def __init__(self, path: str, pre: ColumnTransformer, target_col: str, chunk_size: int, cache_prefix: str):
+        super().__init__(cache_prefix=cache_prefix)
+        self.path = path
+        self.pre = pre
+        self.target_col = target_col
+        self.chunk_size = chunk_size
+        self._chunks = None
+
+    def reset(self):
+        self._chunks = None
+
+    def next(self, input_data) -> bool:
+        if self._chunks is None:
+            self._chunks = iter_split_chunks(
+                self.path, self.chunk_size, FEATURES + [self.target_col], holdout=False
+            )
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        input_data(data=self.pre.transform(chunk[FEATURES]), label=chunk[self.target_col].to_numpy())
+        return True
+
+
+def train_streaming(
+    path: str,
+    chunk_size: int,
+    params: dict | None = None,
+    n_estimators: int = 200,
+    n_jobs: int | None = None,
+) -> dict[str, Pipeline]:
+    """Out-of-core training: only one chunk of raw rows is in memory at a time.
+
+    The preprocessor is fitted on the fixed category vocabulary instead of the
+    data, chunks are streamed into an ExtMemQuantileDMatrix (quantized pages
+    cached on disk), and holdout metrics are computed chunk by chunk. Targets
+    are fitted one after the other, each with all ``n_jobs`` cores.
+    """
+    pre = fit_fixed_preprocessor()
+    pipelines = {}
+    with tempfile.TemporaryDirectory(prefix='xgb-extmem-') as cache_dir:
+        for target_col in TARGETS:
+            clf = build_classifier(
+                random_state=42, n_estimators=n_estimators, n_jobs=n_jobs or available_cores(), params=params
+            )
+            dtrain = xgb.ExtMemQuantileDMatrix(
+                EncodedChunkIter(path, pre, target_col, chunk_size, f'{cache_dir}/{target_col}')
+            )
+            booster = xgb.train(clf.get_xgb_params(), dtrain, num_boost_round=clf.n_estimators)
+            del dtrain
+            clf.load_model(booster.save_raw())
+
+            probs, labels = [], []
+            for chunk in iter_split_chunks(path, chunk_size, FEATURES + [target_col], holdout=True):
+                probs.append(clf.predict_proba(pre.transform(chunk[FEATURES]))[:, 1])
+                labels.append(chunk[target_col].to_numpy(dtype=np.int8))
+            report(target_col, np.concatenate(labels), np.concatenate(probs))
+
+            pipelines[target_col] = Pipeline([('pre', pre), ('clf', clf)])
+    return pipelines
+
+
+def save_models(pipelines: dict[str, Pipeline]):
+    for target_col, model_path in TARGETS.items():
+        save_artifact(pipelines[target_col], model_path)
+        print(f'Saved model to {model_path}')
+    save_bundle(pipelines['cost_overrun'], pipelines['time_overrun'], BUNDLE_PATH)
+    print(f'Saved shared-preprocessor bundle to {BUNDLE_PATH}')
+
+
+def save_training_artifacts(pipelines: dict[str, Pipeline], data: str, chunk_size: int = 100_000):
+    """Publish the models with the vendor statistics, replay sample and drift reference of ``data``."""
+    # Imported here: replay_buffer imports this module for the split constants.
+    from replay_buffer import build_replay_buffer
+
+    # Everything is published together once the last artifact is written (see artifact_release).
+    with artifact_release():
+        save_models(pipelines)
+
+        stats = build_vendor_stats(data, chunk_size)
+        stats.save(VENDOR_STATS_PATH)
+        print(f'Saved vendor statistics for {stats.rows} projects to {VENDOR_STATS_PATH}')
+
+        buffer = build_replay_buffer(data, chunk_size=chunk_size)
+        buffer.save(REPLAY_BUFFER_PATH)
+        print(f'Saved a replay sample of {len(buffer)} projects to {REPLAY_BUFFER_PATH}')
+
+        # The replay sample is uniform over the history, so it also stands in for it as the drift reference.
+        predictors = compile_pipelines(pipelines['cost_overrun'], pipelines['time_overrun'])
+        save_reference(build_reference(buffer.frame, predictors), DRIFT_REFERENCE_PATH)
+        print(f'Saved the drift reference profile to {DRIFT_REFERENCE_PATH}')
 
 
 def main():
-    df = pd.read_csv('synthetic_projects.csv')
-    train_and_evaluate_target(df, 'cost_overrun', 'artifacts/model_cost.pkl')
-    train_and_evaluate_target(df, 'time_overrun', 'artifacts/model_time.pkl')
+    parser = argparse.ArgumentParser(description='Train the cost and timeline overrun models.')
+    parser.add_argument('--data', default=default_history_path(),
+                        help='project history: Parquet/Arrow store or CSV (default: the store if built)')
+    parser.add_argument('--stream', action='store_true', help='out-of-core training in chunks')
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--n-jobs', type=int, default=None, help='total CPU budget (default: all cores)')
+    parser.add_argument('--sequential', action='store_true', help='fit targets one after the other')
+    parser.add_argument('--n-estimators', type=int, default=None,
+                        help='boosting rounds (default: tuned value, else 200)')
+    parser.add_argument('--params', default=TUNED_PARAMS_PATH,
+                        help='tuned hyperparameters written by tune_model.py, used if present')
+    parser.add_argument('--early-stopping-rounds', type=int, default=None)
+    parser.add_argument('--validation-size', type=float, default=0.1)
+    args = parser.parse_args()
+
+    tuned = load_tuned_params(args.params)
+    params = tuned.get('params')
+    n_estimators = args.n_estimators or tuned.get('n_estimators', 200)
+    if tuned:
+        print(f'Using tuned hyperparameters from {args.params}: {params}')
 
+    if args.stream:
+        if args.early_stopping_rounds:
+            # The streamed holdout is only read after training; there is no validation set to stop on.
+            parser.error('--early-stopping-rounds is not supported with --stream')
+        pipelines = train_streaming(
+            args.data, args.chunk_size, params=params, n_estimators=n_estimators, n_jobs=args.n_jobs
+        )
+    else:
+        pipelines = train_and_evaluate(
+            read_history(args.data),
+            n_jobs=args.n_jobs,
+            parallel=not args.sequential,
+            n_estimators=n_estimators,
+            early_stopping_rounds=args.early_stopping_rounds,
+            validation_size=args.validation_size,
+            params=params,
+        )
+    save_training_artifacts(pipelines, args.data, args.chunk_size)
 
 if __name__ == '__main__':
     main()
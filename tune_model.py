@@ -0,0 +1,259 @@
+"""Resumable, parallel hyperparameter search for the overrun classifiers.
+
+The dataset is encoded once and cached as ``.npy`` matrices under
+``artifacts/tuning/<data fingerprint>/``; every trial (and every re-run on the
+same data) memory-maps those instead of re-parsing the CSV. Trials run in a
+process pool with early stopping, and a trial is pruned when its validation
+loss at the pruning rung is worse than the median of the completed trials.
+Finished trials are appended to ``trials.jsonl`` so an interrupted search
+resumes where it stopped. The best config is written to
+``model_utils.TUNED_PARAMS_PATH``, which train_model.py picks up.
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import xgboost as xgb
+
+from model_utils import FEATURES, TUNED_PARAMS_PATH, build_classifier, fit_fixed_preprocessor
+from project_store import default_history_path, iter_data_chunks
+from train_model import HOLDOUT_EVERY, TARGETS, available_cores
+
+CACHE_ROOT = 'artifacts/tuning'
+# Bump when the encoding or split below changes, to invalidate cached matrices.
+CACHE_VERSION = 1
+MAX_ROUNDS = 1000
+EARLY_STOPPING_ROUNDS = 50
+PRUNE_RUNG = 100
+
+
+def data_fingerprint(path: str) -> str:
+    digest = hashlib.sha1(f'v{CACHE_VERSION}:'.encode())
+    digest.update(','.join(fit_fixed_preprocessor().get_feature_names_out()).encode())
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def encode_dataset(path: str, cache_dir: str, chunk_size: int = 100_000):
+    """Encode once into cache_dir: rows with index % HOLDOUT_EVERY == 0 are the
+    test holdout (never used here, same as streaming training), == 1 are the
+    validation set, the rest are training rows."""
+    pre = fit_fixed_preprocessor()
+    columns = FEATURES + list(TARGETS)
+    parts = {'train': [], 'val': []}
+    labels = {split: {t: [] for t in TARGETS} for split in parts}
+    offset = 0
+    for chunk in iter_data_chunks(path, chunk_size, columns):
+        fold = np.arange(offset, offset + len(chunk)) % HOLDOUT_EVERY
+        offset += len(chunk)
+        X = pre.transform(chunk[FEATURES]).astype(np.float32)
+        for split, mask in (('train', fold > 1), ('val', fold == 1)):
+            parts[split].append(X[mask])
+            for target_col in TARGETS:
+                labels[split][target_col].append(chunk[target_col].to_numpy(dtype=np.float32)[mask])
+
+    tmp_dir = f'{cache_dir}.tmp'
+    os.makedirs(tmp_dir, exist_ok=True)
+    for split in parts:
+        np.save(f'{tmp_dir}/X_{split}.npy', np.concatenate(parts[split]))
+        for target_col in TARGETS:
+            np.save(f'{tmp_dir}/y_{split}_{target_col}.npy', np.concatenate(labels[split][target_col]))
+    os.replace(tmp_dir, cache_dir)
+
+
+def sample_params(seed: int, trial_id: int) -> dict:
+    rng = np.random.default_rng([seed, trial_id])
+    return {
+        'max_depth': int(rng.integers(3, 9)),
+        'learning_rate': float(np.exp(rng.uniform(np.log(0.01), np.log(0.3)))),
+        'subsample': float(rng.uniform(0.6, 1.0)),
+        'colsample_bytree': float(rng.uniform(0.6, 1.0)),
+        'min_child_weight': float(np.exp(rng.uniform(0.0, np.log(10.0)))),
+        'reg_lambda': float(np.exp(rng.uniform(np.log(0.1), np.log(10.0)))),
+    }
+
+
+class PruneAtRung(xgb.callback.TrainingCallback):
+    def __init__(self, rung: int, threshold: float | None):
+        super().__init__()
+        self.rung = rung
+        self.threshold = threshold
+        self.rung_score: float | None = None
+        self.pruned = False
+
+    def after_iteration(self, model, epoch: int, evals_log) -> bool:
+        if epoch + 1 != self.rung:
+            return False
+        self.rung_score = min(evals_log['val']['logloss'])
+        self.pruned = self.threshold is not None and self.rung_score > self.threshold
+        return self.pruned
+
+
+_worker_data: dict = {}
+
+
+def _init_worker(cache_dir: str, n_jobs: int):
+    _worker_data.update(cache_dir=cache_dir, n_jobs=n_jobs, matrices={})
+
+
+def _matrices(target_col: str):
+    matrices = _worker_data['matrices']
+    if target_col not in matrices:
+        cache_dir = _worker_data['cache_dir']
+        X_train = np.load(f'{cache_dir}/X_train.npy', mmap_mode='r')
+        X_val = np.load(f'{cache_dir}/X_val.npy', mmap_mode='r')
+        dtrain = xgb.QuantileDMatrix(X_train, label=np.load(f'{cache_dir}/y_train_{target_col}.npy'))
+        dval = xgb.QuantileDMatrix(X_val, label=np.load(f'{cache_dir}/y_val_{target_col}.npy'), ref=dtrain)
+        matrices[target_col] = (dtrain, dval)
+    return matrices[target_col]
+
+
+def run_trial(trial_id: int, params: dict, thresholds: dict) -> dict:
+    started = time.perf_counter()
+    record = {'trial_id': trial_id, 'params': params, 'status': 'complete', 'targets': {}}
+    for target_col in TARGETS:
+        dtrain, dval = _matrices(target_col)
+        xgb_params = build_classifier(n_jobs=_worker_data['n_jobs'], params=params).get_xgb_params()
+        pruner = PruneAtRung(PRUNE_RUNG, thresholds.get(target_col))
+        booster = xgb.train(
+            xgb_params,
+            dtrain,
+            num_boost_round=MAX_ROUNDS,
+            evals=[(dval, 'val')],
+            early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+            callbacks=[pruner],
+            verbose_eval=False,
+        )
+        record['targets'][target_col] = {
+            'best_score': float(booster.best_score),
+            'best_iteration': int(booster.best_iteration),
+            'rung_score': pruner.rung_score,
+        }
+        if pruner.pruned:
+            record['status'] = 'pruned'
+            break
+    if record['status'] == 'complete':
+        record['score'] = float(np.mean([t['best_score'] for t in record['targets'].values()]))
+    record['seconds'] = time.perf_counter() - started
+    return record
+
+
+def load_trials(path: str) -> list[dict]:
+    if not os.path.exists(path):
+        return []
+    trials = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    trials.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A partial last line from an interrupted run; the trial is re-run.
+                    break
+    return trials
+
+
+def prune_thresholds(trials: list[dict]) -> dict:
+    thresholds = {}
+    for target_col in TARGETS:
+        scores = [
+            t['targets'][target_col]['rung_score']
+            for t in trials
+            if t['status'] == 'complete' and t['targets'][target_col]['rung_score'] is not None
+        ]
+        if len(scores) >= 3:
+            thresholds[target_col] = float(np.median(scores))
+    return thresholds
+
+
+def best_config(trials: list[dict], fingerprint: str) -> dict | None:
+    complete = [t for t in trials if t['status'] == 'complete']
+    if not complete:
+        return None
+    best = min(complete, key=lambda t: t['score'])
+    return {
+        'params': best['params'],
+        'n_estimators': max(t['best_iteration'] for t in best['targets'].values()) + 1,
+        'score': best['score'],
+        'metric': 'validation logloss (mean over targets)',
+        'trial_id': best['trial_id'],
+        'data_fingerprint': fingerprint,
+    }
+
+
+def search(
+    data: str,
+    n_trials: int = 40,
+    workers: int | None = None,
+    seed: int = 0,
+    output: str = TUNED_PARAMS_PATH,
+    cache_root: str = CACHE_ROOT,
+) -> dict | None:
+    fingerprint = data_fingerprint(data)
+    cache_dir = os.path.join(cache_root, fingerprint, 'matrices')
+    if not os.path.exists(cache_dir):
+        print(f'Encoding {data} into {cache_dir}')
+        encode_dataset(data, cache_dir)
+    trials_path = os.path.join(cache_root, fingerprint, f'trials_seed{seed}.jsonl')
+    trials = load_trials(trials_path)
+    done = {t['trial_id'] for t in trials}
+    pending = [i for i in range(n_trials) if i not in done]
+    print(f'{len(done)} trials already done, {len(pending)} to run')
+
+    cores = available_cores()
+    workers = max(1, min(workers or cores, len(pending) or 1))
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    with open(trials_path, 'a') as log, ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(cache_dir, max(1, cores // workers)),
+    ) as pool:
+        in_flight = set()
+        while pending or in_flight:
+            while pending and len(in_flight) < workers:
+                trial_id = pending.pop(0)
+                in_flight.add(pool.submit(
+                    run_trial, trial_id, sample_params(seed, trial_id), prune_thresholds(trials)
+                ))
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                record = future.result()
+                trials.append(record)
+                log.write(json.dumps(record) + '\n')
+                log.flush()
+                print(f"trial {record['trial_id']}: {record['status']} "
+                      f"score={record.get('score')} ({record['seconds']:.1f}s)")
+
+    config = best_config(trials, fingerprint)
+    if config is not None:
+        with open(output, 'w') as f:
+            json.dump(config, f, indent=2)
+        print(f'Best trial {config["trial_id"]} (logloss {config["score"]:.5f}) written to {output}')
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tune XGBoost hyperparameters for both targets.')
+    parser.add_argument('--data', default=default_history_path(),
+                        help='project history: Parquet/Arrow store or CSV (default: the store if built)')
+    parser.add_argument('--trials', type=int, default=40)
+    parser.add_argument('--workers', type=int, default=None, help='parallel trials (default: all cores)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=TUNED_PARAMS_PATH)
+    args = parser.parse_args()
+    search(args.data, args.trials, args.workers, args.seed, args.output)
+
+
+if __name__ == '__main__':
+    main()
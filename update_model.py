@@ -0,0 +1,190 @@
+"""Incremental model update from newly completed projects.
+
+    python update_model.py completed_q3.csv [more.parquet ...] [--rounds 20]
+
+Instead of refitting from zero, both classifiers continue boosting from the
+saved boosters: ``--rounds`` trees are added, fitted on the new projects plus
+a replay sample of the history drawn from the reservoir in
+``artifacts/replay_buffer.parquet`` (``--replay-ratio`` replayed rows per new
+row), so the update costs O(batch) rather than O(history).
+
+Every ``HOLDOUT_EVERY``-th new project is held out. No model has seen these
+rows (buffered projects may have been trained on, so none are held out), and
+a target's updated model is published only if its holdout AUC is at least
+the previous model's on them (minus ``--tolerance``); otherwise the previous
+model is kept for that target. The new projects are then added to the replay
+buffer and the vendor statistics whether or not a model was published, so
+apply each batch once. The drift reference profile is rebuilt from the
+updated buffer, and all artifacts are published together at the end.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import roc_auc_score
+from sklearn.pipeline import Pipeline
+
+from compiled_model import compile_pipelines
+from drift_monitor import build_reference, save_reference
+from model_utils import (
+    DRIFT_REFERENCE_PATH,
+    FEATURES,
+    REPLAY_BUFFER_PATH,
+    VENDOR_STATS_PATH,
+    artifact_release,
+    load_models,
+    validate_frame,
+)
+from project_store import default_history_path, read_history
+from replay_buffer import DEFAULT_CAPACITY, ReplayBuffer, build_replay_buffer
+from train_model import HOLDOUT_EVERY, TARGETS, available_cores, save_models, write_report
+from vendor_stats import load_vendor_stats
+
+UPDATE_REPORT_PATH = 'artifacts/update_report.json'
+DEFAULT_ROUNDS = 20
+# Overrun flags are set when the actual exceeds the plan by more than this (as in generate_synthetic_data.py).
+OVERRUN_THRESHOLD = 0.10
+
+
+def completed_projects(frame: pd.DataFrame) -> tuple[pd.DataFrame, int]:
+    """Rows with valid features and known outcomes, and how many rows were dropped.
+
+    Outcome columns missing from the input are derived from ``actual_cost`` and ``actual_days``.
+    """
+    frame = frame.copy()
+    if 'cost_overrun_pct' not in frame:
+        frame['cost_overrun_pct'] = (frame['actual_cost'] - frame['planned_cost']) / frame['planned_cost']
+    if 'time_overrun_pct' not in frame:
+        frame['time_overrun_pct'] = (frame['actual_days'] - frame['planned_days']) / frame['planned_days']
+    for target_col in TARGETS:
+        if target_col not in frame:
+            pct = frame[target_col.replace('overrun', 'overrun_pct')]
+            frame[target_col] = (pct > OVERRUN_THRESHOLD).astype(np.int8).where(pct.notna())
+    keep = (validate_frame(frame) == '') & frame[list(TARGETS)].notna().all(axis=1).to_numpy()
+    return frame[keep].reset_index(drop=True), int((~keep).sum())
+
+
+def _served_booster(clf):
+    # Continuing from a model that was early-stopped must start from the trees
+    # it serves, not from the discarded rounds after its best iteration.
+    booster = clf.get_booster()
+    _, end = clf._get_iteration_range(None)
+    return booster[:end] if end else booster
+
+
+def update_pipelines(
+    pipelines: dict[str, Pipeline],
+    batch: pd.DataFrame,
+    buffer: ReplayBuffer,
+    rounds: int = DEFAULT_ROUNDS,
+    replay_ratio: float = 1.0,
+    tolerance: float = 0.0,
+    n_jobs: int | None = None,
+    seed: int = 0,
+) -> tuple[dict[str, Pipeline], dict]:
+    """Warm-start every target on ``batch`` plus replayed history; returns the pipelines to serve and a report.
+
+    ``batch`` must already be cleaned by ``completed_projects``. Pipelines
+    that fail the AUC gate are returned unchanged.
+    """
+    started = time.perf_counter()
+    in_holdout = np.arange(len(batch)) % HOLDOUT_EVERY == 0
+    new_train = batch[~in_holdout]
+    replay = buffer.sample(int(round(replay_ratio * len(new_train))), seed=seed)
+    train = pd.concat([new_train[FEATURES + list(TARGETS)], replay], ignore_index=True)
+    holdout = batch[in_holdout]
+
+    # The update keeps the fitted preprocessor, so the encoded layout (and any compiled encoder) is unchanged.
+    pre = pipelines['cost_overrun'].named_steps['pre']
+    Xt_train = pre.transform(train[FEATURES])
+    Xt_holdout = pre.transform(holdout[FEATURES])
+
+    updated = {}
+    targets = {}
+    for target_col in TARGETS:
+        previous = pipelines[target_col].named_steps['clf']
+        y_train = train[target_col].to_numpy(dtype=np.int8)
+        y_holdout = holdout[target_col].to_numpy(dtype=np.int8)
+        if np.unique(y_holdout).size < 2:
+            raise ValueError(f'{target_col}: the holdout has a single class; use a larger batch')
+
+        clf = clone(previous).set_params(
+            n_estimators=rounds, early_stopping_rounds=None, n_jobs=n_jobs or available_cores(),
+        )
+        clf.fit(Xt_train, y_train, xgb_model=_served_booster(previous))
+        previous_auc = roc_auc_score(y_holdout, previous.predict_proba(Xt_holdout)[:, 1])
+        updated_auc = roc_auc_score(y_holdout, clf.predict_proba(Xt_holdout)[:, 1])
+        published = updated_auc >= previous_auc - tolerance
+        updated[target_col] = Pipeline([('pre', pre), ('clf', clf)]) if published else pipelines[target_col]
+        targets[target_col] = {
+            'previous_auc': previous_auc,
+            'updated_auc': updated_auc,
+            'published': bool(published),
+            'trees': int(clf.get_booster().num_boosted_rounds()),
+        }
+        print(f"{target_col}: holdout AUC {previous_auc:.4f} -> {updated_auc:.4f} "
+              f"({'published' if published else 'kept previous model'})")
+
+    return updated, {
+        'new_rows': len(batch),
+        'train_rows': len(train),
+        'replay_rows': len(replay),
+        'holdout_rows': len(holdout),
+        'rounds': rounds,
+        'tolerance': tolerance,
+        'seconds': time.perf_counter() - started,
+        'targets': targets,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Continue training the overrun models on newly completed projects.')
+    parser.add_argument('files', nargs='+', help='completed projects: CSV, JSONL, Parquet or Arrow')
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS, help='trees added per model')
+    parser.add_argument('--replay-ratio', type=float, default=1.0,
+                        help='replayed history rows per new training row')
+    parser.add_argument('--tolerance', type=float, default=0.0,
+                        help='largest holdout AUC drop that still publishes')
+    parser.add_argument('--buffer', default=REPLAY_BUFFER_PATH)
+    parser.add_argument('--history', default=default_history_path(),
+                        help='used once to build the replay buffer if it does not exist')
+    parser.add_argument('--n-jobs', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--report', default=UPDATE_REPORT_PATH)
+    args = parser.parse_args()
+
+    batch, dropped = completed_projects(pd.concat([read_history(path) for path in args.files], ignore_index=True))
+    print(f'{len(batch)} completed projects ({dropped} rows without valid features or outcomes skipped)')
+    try:
+        buffer = ReplayBuffer.load(args.buffer)
+    except FileNotFoundError:
+        print(f'No replay buffer at {args.buffer}; sampling one from {args.history}')
+        buffer = build_replay_buffer(args.history, DEFAULT_CAPACITY, seed=args.seed)
+
+    model_cost, model_time = load_models()
+    pipelines, report = update_pipelines(
+        {'cost_overrun': model_cost, 'time_overrun': model_time},
+        batch, buffer, args.rounds, args.replay_ratio, args.tolerance, args.n_jobs, args.seed,
+    )
+    published = [t for t, r in report['targets'].items() if r['published']]
+    with artifact_release():
+        if published:
+            save_models(pipelines)
+        buffer.add(batch, args.seed)
+        buffer.save(args.buffer)
+        # Drift is measured against what the served models were fitted on, which now includes the batch.
+        predictors = compile_pipelines(pipelines['cost_overrun'], pipelines['time_overrun'])
+        save_reference(build_reference(buffer.frame, predictors), DRIFT_REFERENCE_PATH)
+        stats = load_vendor_stats(VENDOR_STATS_PATH)
+        stats.update(batch)
+        stats.save(VENDOR_STATS_PATH)
+    write_report(args.report, {**report, 'files': args.files, 'skipped_rows': dropped})
+    if not published:
+        raise SystemExit('No model improved on the holdout; the previous models are still served.')
+
+
+if __name__ == '__main__':
+    main()
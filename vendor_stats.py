@@ -0,0 +1,205 @@
+"""Per-vendor historical outcome statistics, precomputed for O(1) lookups.
+
+    python vendor_stats.py build [--data PATH]
+    python vendor_stats.py update NEW_PROJECTS [NEW_PROJECTS ...]
+    python vendor_stats.py show [VENDOR]
+
+The index holds running counts and sums of the outcome columns per
+vendor x project_type in small dense arrays over the fixed vocabulary. Adding
+completed projects adds their sums in place, so the index is updated
+incrementally and never rescans the history. Rates, means and the cohort risk
+derived from the sums are recomputed after each update (a few hundred cells),
+so serving a request is array indexing only.
+
+Cohorts compare a vendor's overrun rate with the portfolio's. The rate is
+shrunk towards the portfolio rate by ``PRIOR_PROJECTS`` pseudo-projects, so
+vendors with little history are not labelled on a handful of outcomes.
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from model_utils import CATEGORY_VALUES, VENDOR_STATS_PATH, replace_file
+
+VENDORS = CATEGORY_VALUES['vendor']
+PROJECT_TYPES = CATEGORY_VALUES['project_type']
+# Summed per cell; the first two are 0/1 flags, so their means are rates.
+OUTCOME_COLUMNS = ['cost_overrun', 'time_overrun', 'cost_overrun_pct', 'time_overrun_pct']
+PRIOR_PROJECTS = 20.0
+# Smoothed overrun rate relative to the portfolio's: below LOW is 'low', at or above HIGH is 'high'.
+COHORT_LOW_RATIO = 0.9
+COHORT_HIGH_RATIO = 1.1
+COHORTS = np.array(['low', 'medium', 'high', 'unknown'])
+
+_VENDOR_INDEX = {vendor: i for i, vendor in enumerate(VENDORS)}
+_TYPE_INDEX = {project_type: i for i, project_type in enumerate(PROJECT_TYPES)}
+
+
+class VendorStats:
+    def __init__(self, counts: np.ndarray | None = None, sums: np.ndarray | None = None):
+        shape = (len(VENDORS), len(PROJECT_TYPES))
+        self.counts = np.zeros(shape, dtype=np.int64) if counts is None else counts.astype(np.int64)
+        self.sums = np.zeros((len(OUTCOME_COLUMNS), *shape)) if sums is None else sums.astype(np.float64)
+        self._derive()
+
+    @property
+    def rows(self) -> int:
+        return int(self.counts.sum())
+
+    def update(self, frame: pd.DataFrame) -> int:
+        """Add completed projects (rows with every outcome column set); returns how many were added."""
+        vendor = pd.Categorical(frame['vendor'], categories=VENDORS).codes
+        project_type = pd.Categorical(frame['project_type'], categories=PROJECT_TYPES).codes
+        outcomes = np.column_stack([pd.to_numeric(frame[col], errors='coerce') for col in OUTCOME_COLUMNS])
+        keep = (vendor >= 0) & (project_type >= 0) & np.isfinite(outcomes).all(axis=1)
+        cell = vendor[keep].astype(np.int64) * len(PROJECT_TYPES) + project_type[keep]
+        size = self.counts.size
+        self.counts += np.bincount(cell, minlength=size).reshape(self.counts.shape)
+        for k in range(len(OUTCOME_COLUMNS)):
+            self.sums[k] += np.bincount(cell, weights=outcomes[keep, k], minlength=size).reshape(self.counts.shape)
+        self._derive()
+        return int(keep.sum())
+
+    def _derive(self):
+        """Recompute the lookup arrays from the running sums."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.cell_means = self.sums / self.counts                      # (outcome, vendor, type)
+            vendor_counts = self.counts.sum(axis=1)
+            vendor_sums = self.sums.sum(axis=2)
+            self.vendor_counts = vendor_counts
+            self.vendor_means = vendor_sums / vendor_counts                # (outcome, vendor)
+            total = max(int(vendor_counts.sum()), 1)
+            self.portfolio_means = vendor_sums.sum(axis=1) / total         # (outcome,)
+
+            # Mean of the cost and time overrun rates, shrunk towards the portfolio's.
+            prior = self.portfolio_means[:2, None] * PRIOR_PROJECTS
+            smoothed = (vendor_sums[:2] + prior) / (vendor_counts + PRIOR_PROJECTS)
+            self.risk_ratio = smoothed.mean(axis=0) / self.portfolio_means[:2].mean()
+        cohort = np.where(self.risk_ratio < COHORT_LOW_RATIO, 0, np.where(self.risk_ratio >= COHORT_HIGH_RATIO, 2, 1))
+        self.cohort = np.where(vendor_counts > 0, cohort, 3)
+        # Response fragments, built once per update rather than per request.
+        self._portfolio_summary = _summary(int(vendor_counts.sum()), self.portfolio_means)
+        self._vendor_summaries = [_summary(int(n), self.vendor_means[:, i]) for i, n in enumerate(vendor_counts)]
+        self._cell_summaries = [
+            [{'project_type': t, **_summary(int(self.counts[i, j]), self.cell_means[:, i, j])}
+             for j, t in enumerate(PROJECT_TYPES)]
+            for i in range(len(VENDORS))
+        ]
+        self._lookups = [
+            [{**vendor, 'project_type': cell} for cell in cells]
+            for vendor, cells in zip(self._vendor_summaries, self._cell_summaries)
+        ]
+        self._cohorts = COHORTS[self.cohort].tolist()
+        self._notes = [_note(c, v, self._portfolio_summary) for c, v in zip(self._cohorts, self._vendor_summaries)]
+
+    def cohort_risk(self, vendor: str) -> str:
+        i = _VENDOR_INDEX.get(vendor)
+        return 'unknown' if i is None else self._cohorts[i]
+
+    def note(self, vendor: str) -> str:
+        """One-line comparison of the vendor's overrun rates with the portfolio's."""
+        i = _VENDOR_INDEX.get(vendor)
+        return _note('unknown', {}, {}) if i is None else self._notes[i]
+
+    def lookup(self, vendor: str, project_type: str | None = None) -> dict:
+        """Historical outcomes for a vendor, and for the vendor on one project type."""
+        i = _VENDOR_INDEX.get(vendor)
+        if i is None:
+            return {'projects': 0}
+        j = _TYPE_INDEX.get(project_type)
+        if j is None:
+            return self._vendor_summaries[i]
+        return self._lookups[i][j]
+
+    def portfolio(self) -> dict:
+        return self._portfolio_summary
+
+    def save(self, path: str = VENDOR_STATS_PATH):
+        # Same write-then-rename as the model artifacts.
+        tmp = f'{path}.tmp.npz'
+        np.savez(tmp, counts=self.counts, sums=self.sums, vendors=np.array(VENDORS),
+                 project_types=np.array(PROJECT_TYPES), outcomes=np.array(OUTCOME_COLUMNS))
+        replace_file(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = VENDOR_STATS_PATH) -> 'VendorStats':
+        with np.load(path) as data:
+            layout = (data['vendors'].tolist(), data['project_types'].tolist(), data['outcomes'].tolist())
+            if layout != (VENDORS, PROJECT_TYPES, OUTCOME_COLUMNS):
+                raise ValueError(f'{path} was built for a different vocabulary; rebuild it')
+            return cls(data['counts'], data['sums'])
+
+
+def _summary(count: int, means: np.ndarray) -> dict:
+    if count == 0:
+        return {'projects': 0}
+    return {'projects': count, **{
+        name: float(value) for name, value in zip(
+            ('cost_overrun_rate', 'time_overrun_rate', 'mean_cost_overrun_pct', 'mean_time_overrun_pct'), means
+        )
+    }}
+
+
+def _note(cohort: str, vendor: dict, portfolio: dict) -> str:
+    if cohort == 'unknown':
+        return 'No completed projects on record for this vendor.'
+    relation = {'low': 'Below', 'medium': 'In line with', 'high': 'Above'}[cohort]
+    return (
+        f"{relation} portfolio overrun rates: cost {vendor['cost_overrun_rate']:.0%} vs "
+        f"{portfolio['cost_overrun_rate']:.0%}, schedule {vendor['time_overrun_rate']:.0%} vs "
+        f"{portfolio['time_overrun_rate']:.0%} over {vendor['projects']} projects."
+    )
+
+
+def load_vendor_stats(path: str = VENDOR_STATS_PATH) -> VendorStats:
+    """The saved index, or an empty one (every vendor 'unknown') when none has been built."""
+    return VendorStats.load(path) if os.path.exists(path) else VendorStats()
+
+
+def build_vendor_stats(data: str, chunk_size: int = 500_000) -> VendorStats:
+    from project_store import iter_data_chunks
+
+    stats = VendorStats()
+    for chunk in iter_data_chunks(data, chunk_size, ['vendor', 'project_type', *OUTCOME_COLUMNS]):
+        stats.update(chunk)
+    return stats
+
+
+def main():
+    from project_store import default_history_path, iter_data_chunks
+
+    parser = argparse.ArgumentParser(description='Build or update the vendor statistics index.')
+    parser.add_argument('--path', default=VENDOR_STATS_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='build the index from the full project history')
+    build.add_argument('--data', default=default_history_path())
+    update = sub.add_parser('update', help='add newly completed projects to the existing index')
+    update.add_argument('files', nargs='+')
+    show = sub.add_parser('show', help='print the index (or one vendor) as JSON')
+    show.add_argument('vendor', nargs='?')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        stats = build_vendor_stats(args.data)
+        stats.save(args.path)
+        print(f'Indexed {stats.rows} projects from {args.data} -> {args.path}')
+    elif args.command == 'update':
+        stats = load_vendor_stats(args.path)
+        added = sum(stats.update(chunk) for path in args.files for chunk in iter_data_chunks(path, 500_000))
+        stats.save(args.path)
+        print(f'Added {added} projects ({stats.rows} total) -> {args.path}')
+    else:
+        stats = load_vendor_stats(args.path)
+        vendors = [args.vendor] if args.vendor else VENDORS
+        print(json.dumps({
+            'portfolio': stats.portfolio(),
+            'vendors': {v: {**stats.lookup(v), 'cohort_risk': stats.cohort_risk(v)} for v in vendors},
+        }, indent=2))
+
+
+if __name__ == '__main__':
+    main()